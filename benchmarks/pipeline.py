@@ -0,0 +1,398 @@
+"""
+Benchmarks for every stage of the LowPoly pipeline on synthetic images.
+
+Run from the repository root:
+
+    python -m benchmarks.pipeline run --output benchmarks/results/current.json
+    python -m benchmarks.pipeline compare benchmarks/results/baseline.json benchmarks/results/current.json
+"""
+
+import datetime
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from functools import partial
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
+import click
+import cv2
+import numpy as np
+
+from lowpoly.edgedetection import EdgeDetection
+from lowpoly.polygon import PolygonMaker
+from lowpoly.processing import ImageProcessing
+from lowpoly.raster import RasterMaker
+from lowpoly.svg import SVGmaker
+
+# Amount of shapes per megapixel drawn on the synthetic images
+EDGE_DENSITIES = {"low": 25, "medium": 150, "high": 1000}
+
+DEPENDENCIES = ["numpy", "scipy", "shapely", "opencv-python-headless", "CairoSVG"]
+
+
+def synthetic_image(mega_pixels: float, edge_density: str, seed: int = 42):
+    """
+    Returns a synthetic 3:2 BGR image with random shapes on a gradient background.
+
+    Parameters:
+        mega_pixels (float): The size of the image in megapixels.
+        edge_density (str): The amount of shapes, one of the keys of EDGE_DENSITIES.
+        seed (int, optional): The seed for the shapes and colours.
+
+    Returns:
+        ndarray: The image.
+    """
+
+    generator = np.random.default_rng(seed)
+    width = round((mega_pixels * 1e6 * 3 / 2) ** 0.5)
+    height = round(width * 2 / 3)
+
+    gradient = np.linspace(0, 255, width, dtype=np.float32)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[..., 0] = gradient
+    image[..., 1] = gradient[::-1]
+    image[..., 2] = 128
+
+    amount_of_shapes = int(EDGE_DENSITIES[edge_density] * mega_pixels)
+    max_radius = max(4, int(min(width, height) / 20))
+    centres = generator.integers(0, [width, height], size=(amount_of_shapes, 2))
+    radii = generator.integers(2, max_radius, size=amount_of_shapes)
+    colours = generator.integers(0, 256, size=(amount_of_shapes, 3))
+    for (x, y), radius, colour in zip(
+        centres.tolist(), radii.tolist(), colours.tolist()
+    ):
+        if radius % 2:
+            cv2.circle(image, (x, y), radius, colour, -1)
+        else:
+            cv2.rectangle(image, (x, y), (x + radius, y + radius), colour, -1)
+
+    return image
+
+
+def measure(function: Callable[[], Any], repeat: int) -> tuple[dict, Any]:
+    """
+    Returns the minimum and median wall time of a function over several runs, and its last result.
+
+    Parameters:
+        function (Callable): The function to measure.
+        repeat (int): The amount of runs.
+
+    Returns:
+        tuple: The timings in seconds and the result of the last run.
+    """
+
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+
+    return {"min": min(timings), "median": statistics.median(timings)}, result
+
+
+def environment() -> dict:
+    """Returns the commit and dependency versions the benchmark ran with"""
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    versions: dict[str, str | None] = {}
+    for dependency in DEPENDENCIES:
+        try:
+            versions[dependency] = metadata.version(dependency)
+        except metadata.PackageNotFoundError:
+            versions[dependency] = None
+
+    return {
+        "commit": commit,
+        "created": datetime.datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "dependencies": versions,
+    }
+
+
+def benchmark_image(
+    image_path: Path,
+    name: str,
+    add_factors: list,
+    reduce_factors: list,
+    resolution: int,
+    repeat: int,
+    output_directory: Path,
+) -> list[dict]:
+    """
+    Benchmarks all stages for a single image and every combination of point factors and polygon types.
+
+    Parameters:
+        image_path (Path): The path to the image.
+        name (str): The name of the image used in the benchmark names.
+        add_factors (list): The values for `points.add.factor`.
+        reduce_factors (list): The values for `points.reduce.factor`.
+        resolution (int): The value for `output.resolution`.
+        repeat (int): The amount of runs per stage.
+        output_directory (Path): The directory for the outputs.
+
+    Returns:
+        list[dict]: The benchmark results.
+    """
+
+    results = []
+
+    def record(benchmark: str, function: Callable[[], Any], **parameters) -> Any:
+        timings, result = measure(function, repeat)
+        results.append({"name": f"{name}/{benchmark}", **parameters, **timings})
+        click.echo(f"{name}/{benchmark}: {timings['min']:.4f}s")
+
+        return result
+
+    # The stages that consist of more than a single call, so they are timed as a whole
+    def save_svg_png(svg_maker: SVGmaker, polygon_output, output_file: Path) -> None:
+        svg_maker.save_png(svg_maker.xml_result(polygon_output), output_file)
+
+    def save_raster_png(
+        preset: dict, dimensions: list, polygon_output, output_file: Path
+    ) -> None:
+        RasterMaker(preset, dimensions).save_png(polygon_output, output_file)
+
+    edge_detection = EdgeDetection()
+    polygon_maker = PolygonMaker()
+
+    image_processing = record(
+        "ImageProcessing.read", lambda: ImageProcessing(image_path)
+    )
+    grayscale_image = record(
+        "ImageProcessing.colour_2_grayscale",
+        lambda: image_processing.colour_2_grayscale(image_processing.user_image),
+    )
+    binary_image = record(
+        "EdgeDetection",
+        lambda: edge_detection.edge_gray_threshold(
+            edge_detection.canny(grayscale_image, 20, 100), grayscale_image, 0, 255
+        ),
+    )
+
+    for add_factor, reduce_factor in itertools.product(add_factors, reduce_factors):
+        parameters = {"add_factor": add_factor, "reduce_factor": reduce_factor}
+        suffix = f"add={add_factor},reduce={reduce_factor}"
+
+        points = record(
+            f"PolygonMaker.add_additional_points_to_polygon[{suffix}]",
+            partial(
+                polygon_maker.add_additional_points_to_polygon,
+                binary_image,
+                add_factor,
+                reduce_factor,
+                42,
+            ),
+            **parameters,
+        )
+
+        for polygon_type in ["delaunay", "voronoi"]:
+            type_suffix = f"{suffix},type={polygon_type}"
+            polygon_function = getattr(polygon_maker, polygon_type)
+            polygon_output = record(
+                f"PolygonMaker.{polygon_type}[{suffix}]",
+                partial(polygon_function, points, image_processing),
+                **parameters,
+                type=polygon_type,
+            )
+
+            preset = {"output": {"resolution": resolution}}
+            dimensions = [image_processing.width, image_processing.height]
+            svg_maker = SVGmaker(preset, dimensions)
+            record(
+                f"SVGmaker.write_svg[{type_suffix}]",
+                partial(
+                    svg_maker.write_svg,
+                    polygon_output,
+                    output_directory.joinpath("output.svg"),
+                ),
+                **parameters,
+                type=polygon_type,
+            )
+            record(
+                f"SVGmaker.save_png[{type_suffix}]",
+                partial(
+                    save_svg_png,
+                    svg_maker,
+                    polygon_output,
+                    output_directory.joinpath("output.png"),
+                ),
+                **parameters,
+                type=polygon_type,
+            )
+            record(
+                f"RasterMaker.save_png[{type_suffix}]",
+                partial(
+                    save_raster_png,
+                    preset,
+                    dimensions,
+                    polygon_output,
+                    output_directory.joinpath("output.png"),
+                ),
+                **parameters,
+                type=polygon_type,
+            )
+
+    return results
+
+
+@click.group()
+def benchmarks():
+    pass
+
+
+@benchmarks.command()
+@click.option(
+    "--size",
+    "-s",
+    type=float,
+    multiple=True,
+    show_default=True,
+    default=[1, 4, 16],
+    help="Synthetic image sizes in megapixels, e.g. 1, 4, 16, 50, 100",
+)
+@click.option(
+    "--density",
+    "-d",
+    type=click.Choice(list(EDGE_DENSITIES)),
+    multiple=True,
+    show_default=True,
+    default=["low", "high"],
+    help="Edge densities of the synthetic images",
+)
+@click.option(
+    "--add-factor",
+    type=int,
+    multiple=True,
+    show_default=True,
+    default=[1000, 10000],
+    help="Values for points.add.factor",
+)
+@click.option(
+    "--reduce-factor",
+    type=int,
+    multiple=True,
+    show_default=True,
+    default=[50, 100],
+    help="Values for points.reduce.factor",
+)
+@click.option(
+    "--resolution",
+    type=int,
+    show_default=True,
+    default=4000,
+    help="Value for output.resolution",
+)
+@click.option(
+    "--repeat",
+    "-r",
+    type=click.IntRange(min=1),
+    show_default=True,
+    default=3,
+    help="Amount of runs per stage; the minimum is used for comparisons",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=True,
+    help="Path to JSON file for the results",
+)
+def run(size, density, add_factor, reduce_factor, resolution, repeat, output):
+    """Run benchmarks and save the results"""
+
+    results = []
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        output_directory = Path(temporary_directory)
+        for mega_pixels, edge_density in itertools.product(size, density):
+            name = f"{mega_pixels:g}mp-{edge_density}"
+            image_path = output_directory.joinpath(f"{name}.jpg")
+            cv2.imwrite(str(image_path), synthetic_image(mega_pixels, edge_density))
+
+            for result in benchmark_image(
+                image_path,
+                name,
+                list(add_factor),
+                list(reduce_factor),
+                resolution,
+                repeat,
+                output_directory,
+            ):
+                results.append({"size": mega_pixels, "density": edge_density, **result})
+
+            image_path.unlink()
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("w") as file:
+        json.dump({"environment": environment(), "results": results}, file, indent=4)
+
+    click.echo(f"Saved benchmark results to `{output!s}`.")
+
+
+@benchmarks.command()
+@click.argument(
+    "baseline", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.argument("current", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option(
+    "--threshold",
+    "-t",
+    type=float,
+    show_default=True,
+    default=10.0,
+    help="Allowed slowdown in percent before a benchmark counts as a regression",
+)
+@click.option(
+    "--min-seconds",
+    type=float,
+    show_default=True,
+    default=0.005,
+    help="Ignore slowdowns smaller than this amount of seconds",
+)
+def compare(baseline, current, threshold, min_seconds):
+    """Compare results against a baseline and fail on regressions"""
+
+    with baseline.open() as file:
+        baseline_results = {r["name"]: r for r in json.load(file)["results"]}
+    with current.open() as file:
+        current_results = {r["name"]: r for r in json.load(file)["results"]}
+
+    regressions = []
+    for name, current_result in current_results.items():
+        baseline_result = baseline_results.get(name)
+        if baseline_result is None:
+            continue
+
+        difference = current_result["min"] - baseline_result["min"]
+        change = difference / baseline_result["min"] * 100
+        regression = change > threshold and difference > min_seconds
+        click.echo(
+            f"{'REGRESSION' if regression else 'ok':<10} {change:>+8.1f}% "
+            f"{baseline_result['min']:>9.4f}s → {current_result['min']:>9.4f}s  {name}"
+        )
+        if regression:
+            regressions.append(name)
+
+    if regressions:
+        raise click.ClickException(
+            f"{len(regressions)} benchmark(s) regressed more than {threshold}%."
+        )
+
+
+if __name__ == "__main__":
+    benchmarks()
@@ -0,0 +1,106 @@
+"""
+Benchmark for the startup time of the LowPoly CLI.
+
+Run from the repository root:
+
+    python -m benchmarks.startup --max-seconds 0.5
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import click
+
+# Modules that should only be imported by the stages that need them
+HEAVY_MODULES = ["numpy", "cv2", "scipy", "shapely", "cairosvg", "cairocffi"]
+
+
+def imported_heavy_modules() -> list[str]:
+    """Returns the heavy modules that are imported on startup of the CLI"""
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            (
+                "import json, sys, lowpoly.cli; "
+                f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+            ),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    return json.loads(result.stdout)
+
+
+def startup_time(repeat: int) -> dict:
+    """Returns the minimum and median wall time of `lowpoly --help` over several runs"""
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "lowpoly", "--help"],
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        timings.append(time.perf_counter() - start)
+
+    return {"min": min(timings), "median": statistics.median(timings)}
+
+
+@click.command()
+@click.option(
+    "--repeat",
+    "-r",
+    type=click.IntRange(min=1),
+    show_default=True,
+    default=10,
+    help="Amount of runs; the minimum is used for the maximum",
+)
+@click.option(
+    "--max-seconds",
+    type=float,
+    required=False,
+    help="Fail if the startup time exceeds this amount of seconds",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=False,
+    help="Path to JSON file for the results",
+)
+def startup(repeat, max_seconds, output):
+    """Measure startup time of the CLI and fail if it imports heavy modules"""
+
+    heavy_modules = imported_heavy_modules()
+    timings = startup_time(repeat)
+    click.echo(
+        f"lowpoly --help: {timings['min']:.4f}s (median {timings['median']:.4f}s)"
+    )
+
+    if output is not None:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with output.open("w") as file:
+            json.dump({"startup": timings, "imported": heavy_modules}, file, indent=4)
+
+    if heavy_modules:
+        raise click.ClickException(
+            f"CLI imports heavy modules on startup: {', '.join(heavy_modules)}."
+        )
+
+    if max_seconds is not None and timings["min"] > max_seconds:
+        raise click.ClickException(
+            f"Startup time of {timings['min']:.4f}s exceeds {max_seconds}s."
+        )
+
+
+if __name__ == "__main__":
+    startup()
@@ -0,0 +1,11 @@
+__all__ = ["convert"]
+
+
+def __getattr__(name):
+    # Import the API lazily, so the CLI does not load the conversion dependencies on startup
+    if name == "convert":
+        from lowpoly.api import convert
+
+        return convert
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
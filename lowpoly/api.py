@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import numpy as np
+
+from lowpoly.helper import flatten_polygons, get_svg_precision
+from lowpoly.pipeline import Pipeline
+from lowpoly.processing import ImageProcessing
+
+# Name of in-memory images in the pipeline
+MEMORY_SOURCE = Path("<memory>")
+
+
+def convert(
+    image: np.ndarray | bytes,
+    preset: dict,
+    svg: bool = False,
+    png: bool = False,
+) -> dict:
+    """
+    Converts an in-memory image to low polygon variants, without reading or writing files.
+
+    Parameters:
+        image (ndarray | bytes): A decoded BGR(A) or grayscale image array of `uint8` values, or the bytes of an encoded image (e.g. JPEG or PNG).
+        preset (dict): The preset options, the same as the options of a preset JSON file.
+        svg (bool, optional): Whether to include the SVG document as bytes. Defaults to False.
+        png (bool, optional): Whether to include the PNG image as bytes. Defaults to False.
+
+    Returns:
+        dict: The result for each polygon type of the preset, with the keys:
+            - `polygons` (ndarray): Coordinates of all polygons in input image pixels, of shape (m, 2).
+            - `offsets` (ndarray): Start of each polygon in `polygons`, of shape (n + 1,).
+            - `colours` (ndarray): BGR colour of each polygon, of shape (n, 3).
+            - `width` and `height` (int): The dimensions of the input image.
+            - `svg` and `png` (bytes): The rendered outputs, if requested.
+    """
+
+    pipeline = Pipeline()
+    pipeline.provide_image(MEMORY_SOURCE, ImageProcessing(image))
+
+    # Fail on an invalid backend, colour mode or precision before doing any work
+    if png:
+        pipeline.png_backend(preset)
+    pipeline.colour_mode(preset)
+    get_svg_precision(preset)
+
+    width, height = pipeline.dimensions(MEMORY_SOURCE)
+
+    results = {}
+    for polygon_type in preset.get("type", ["voronoi"]):
+        polygon_output = pipeline.triangulate(MEMORY_SOURCE, preset, polygon_type)
+        coordinates, offsets = flatten_polygons(
+            polygon_output["polygons"], polygon_output.get("offsets")
+        )
+
+        result = {
+            "polygons": coordinates,
+            "offsets": offsets,
+            "colours": polygon_output["colours"],
+            "width": width,
+            "height": height,
+        }
+        if svg:
+            result["svg"] = pipeline.encode(MEMORY_SOURCE, preset, polygon_type, "svg")
+        if png:
+            result["png"] = pipeline.encode(MEMORY_SOURCE, preset, polygon_type, "png")
+
+        results[polygon_type] = result
+
+    return results
@@ -1,9 +1,10 @@
 import ast
+import itertools
 from pathlib import Path
 
 import click
 
-from lowpoly.helper import read_json, files_in_dir
+from lowpoly.helper import IMAGE_SUFFIXES, VIDEO_SUFFIXES, files_in_dir, read_json
 
 
 class InputPathChecker:
@@ -25,17 +26,29 @@ class InputPathChecker:
                         },
                     }
                 elif p.is_dir():
-                    files = files_in_dir(p)
-                    amount_of_files_in_directory = len(files)
-                    if amount_of_files_in_directory == 0:
+                    # Files are found while converting; only look for the first one here
+                    files = files_in_dir(
+                        p,
+                        # Videos are converted as sequences of frames
+                        file_types=(
+                            IMAGE_SUFFIXES | VIDEO_SUFFIXES
+                            if ctx.params.get("sequence")
+                            else IMAGE_SUFFIXES
+                        ),
+                        include=ctx.params.get("include") or (),
+                        exclude=ctx.params.get("exclude") or (),
+                        max_depth=ctx.params.get("max_depth"),
+                    )
+                    first_file = next(files, None)
+                    if first_file is None:
                         raise click.BadParameter("No files found in directory")
 
-                    for current_file_index, current_file_path in enumerate(files):
-                        files[current_file_index] = current_file_path
-
                     current_batch = {
                         **current_batch,
-                        "input": {"given": path, "resolved": files},
+                        "input": {
+                            "given": path,
+                            "resolved": itertools.chain([first_file], files),
+                        },
                     }
                 else:
                     raise click.BadParameter("Not a file or directory")
@@ -79,8 +92,8 @@ class OutputPathChecker:
             if p.suffix:
                 if not p.parent.is_dir():
                     raise FileNotFoundError(
-                        f"The parent directory `{str(p.parent)}` "
-                        f"for output argument `{str(p)}` does not exist."
+                        f"The parent directory `{p.parent!s}` "
+                        f"for output argument `{p!s}` does not exist."
                     )
                 else:
                     current_batch = {
@@ -173,3 +186,35 @@ class OptionalValueChecker:
             results.append(current_batch)
 
         return results
+
+
+class DefaultCommandGroup(click.Group):
+    """Runs the default command when no command is given, so `lowpoly -i input` keeps working"""
+
+    def __init__(self, *args, default_command: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        if not args or (
+            args[0] not in self.commands and args[0] not in ctx.help_option_names
+        ):
+            args = [self.default_command, *args]
+
+        return super().parse_args(ctx, args)
+
+
+class ShardChecker:
+    def __call__(self, ctx, param, value):
+        if value is None:
+            return None
+
+        try:
+            index, count = (int(part) for part in value.split("/"))
+        except ValueError:
+            raise click.BadParameter("Expected INDEX/COUNT, e.g. `1/4`")
+
+        if count < 1 or not 1 <= index <= count:
+            raise click.BadParameter(f"Expected an index from 1 to {count}")
+
+        return index, count
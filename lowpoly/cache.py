@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+
+class StageCache:
+    """
+    Persistent cache of stage results as memory-mappable `.npy` files.
+
+    Every entry is a directory with one `.npy` file per array. Entries are keyed by the stage name and
+    the stage key, in which input files are identified by their content hash. When the total size
+    exceeds the maximum size, the least recently used entries are evicted.
+
+    The total size is scanned once and then kept up to date with the stored entries, so the cache directory is only
+    scanned again when it is full. Entries stored by other processes are not counted until the next scan.
+    """
+
+    hash_chunk_size = 1024 * 1024
+
+    # Fraction of the maximum size to evict down to, so a full cache is not scanned again on every store
+    eviction_target = 0.9
+
+    def __init__(self, directory: Path, max_size: int = 1024 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self._file_hashes: dict[tuple, str] = {}
+        self._total_size: int | None = None
+
+    def file_hash(self, file_path: Path) -> str:
+        """Content hash of file, memoised by path, size and modification time"""
+
+        stat = os.stat(file_path)
+        file_key = (str(file_path), stat.st_size, stat.st_mtime_ns)
+        if file_key not in self._file_hashes:
+            digest = hashlib.sha256()
+            with open(file_path, "rb") as file:
+                while chunk := file.read(self.hash_chunk_size):
+                    digest.update(chunk)
+            self._file_hashes[file_key] = digest.hexdigest()
+
+        return self._file_hashes[file_key]
+
+    def key(self, stage: str, key: Any) -> str:
+        return hashlib.sha256(
+            json.dumps([stage, key], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def load(self, cache_key: str) -> dict[str, np.ndarray] | None:
+        """Load arrays of entry as memory maps, or None if there is no such entry"""
+
+        entry = self._entry_path(cache_key)
+        try:
+            arrays = {
+                array_path.stem: np.load(array_path, mmap_mode="r")
+                for array_path in entry.glob("*.npy")
+            }
+            # Mark as recently used
+            os.utime(entry)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if not arrays:
+            return None
+
+        return arrays
+
+    def store(self, cache_key: str, arrays: dict[str, np.ndarray]) -> None:
+        """Store arrays of entry and evict least recently used entries if needed"""
+
+        entry = self._entry_path(cache_key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary directory first, so concurrent readers never see partial entries
+        temporary_entry = Path(tempfile.mkdtemp(dir=entry.parent, prefix=".tmp-"))
+        entry_size = 0
+        for name, array in arrays.items():
+            array_path = temporary_entry.joinpath(name + ".npy")
+            np.save(array_path, np.asarray(array))
+            entry_size += array_path.stat().st_size
+
+        try:
+            os.replace(temporary_entry, entry)
+        except OSError:
+            # Entry was stored by another process in the meantime
+            shutil.rmtree(temporary_entry, ignore_errors=True)
+            return
+
+        if self._total_size is not None:
+            self._total_size += entry_size
+        if self._total_size is None or self._total_size > self.max_size:
+            self.evict()
+
+    def evict(self) -> None:
+        """Scan the cache, and remove least recently used entries if it exceeds the maximum size"""
+
+        if not self.directory.is_dir():
+            self._total_size = 0
+            return
+
+        entries = []
+        total_size = 0
+        for entry_group in os.scandir(self.directory):
+            if not entry_group.is_dir():
+                continue
+
+            for entry in os.scandir(entry_group.path):
+                if entry.name.startswith(".tmp-") or not entry.is_dir():
+                    continue
+
+                try:
+                    entry_size = sum(
+                        array_file.stat().st_size
+                        for array_file in os.scandir(entry.path)
+                    )
+                    entries.append((entry.stat().st_mtime, entry_size, entry.path))
+                except FileNotFoundError:
+                    continue
+
+                total_size += entry_size
+
+        if total_size > self.max_size:
+            for _, entry_size, entry_path in sorted(entries):
+                if total_size <= self.max_size * self.eviction_target:
+                    break
+
+                shutil.rmtree(entry_path, ignore_errors=True)
+                total_size -= entry_size
+
+        self._total_size = total_size
+
+    def _entry_path(self, cache_key: str) -> Path:
+        return self.directory.joinpath(cache_key[:2], cache_key)
@@ -1,25 +1,47 @@
-import click
+import collections
+import itertools
+import json
+import sys
+from pathlib import Path
 
+import click
+from click.core import ParameterSource
 from loguru import logger
 
 from lowpoly.args import (
-    OutputPathChecker,
+    DefaultCommandGroup,
     InputPathChecker,
-    PresetPathChecker,
     OptionalValueChecker,
+    OutputPathChecker,
+    PresetPathChecker,
+    ShardChecker,
 )
 from lowpoly.exception import (
-    InvalidPolygonOutputError,
+    FileProcessingError,
+)
+from lowpoly.helper import combine_arguments_by_batch, mark_first_last, read_json
+from lowpoly.manifest import Manifest
+from lowpoly.profiler import summarize_profile, write_profile
+from lowpoly.shard import (
+    MERGED_FILE_NAME,
+    ShardManifest,
+    merge_shard_manifests,
+    relative_input_path,
+)
+
+
+@click.group(
+    cls=DefaultCommandGroup,
+    default_command="convert",
+    context_settings={"help_option_names": ["-h", "--help"]},
+    epilog="Repository: https://github.com/ToshY/lowpoly",
 )
-from lowpoly.helper import combine_arguments_by_batch
-from lowpoly.polygon import PolygonMaker
-from lowpoly.processing import ImageProcessing
-from lowpoly.edgedetection import EdgeDetection
-from lowpoly.svg import SVGmaker
+def cli():
+    """Convert images to low polygon variants; runs `convert` when no command is given."""
 
 
-@logger.catch
-@click.command(
+@cli.command(
+    "convert",
     context_settings={"help_option_names": ["-h", "--help"]},
     epilog="Repository: https://github.com/ToshY/lowpoly",
 )
@@ -34,6 +56,30 @@ from lowpoly.svg import SVGmaker
     default=["./input"],
     help="Path to input file or directory",
 )
+@click.option(
+    "--include",
+    type=str,
+    required=False,
+    multiple=True,
+    is_eager=True,
+    help="Case-insensitive glob pattern of files to convert in input directories, relative to the input directory, e.g. `*.jpg`",
+)
+@click.option(
+    "--exclude",
+    type=str,
+    required=False,
+    multiple=True,
+    is_eager=True,
+    help="Case-insensitive glob pattern of files and subdirectories to skip in input directories, relative to the input directory",
+)
+@click.option(
+    "--max-depth",
+    type=click.IntRange(min=0),
+    required=False,
+    default=None,
+    is_eager=True,
+    help="Maximum depth of subdirectories to search in input directories; 0 only searches the input directory",
+)
 @click.option(
     "--output-path",
     "-o",
@@ -74,114 +120,564 @@ from lowpoly.svg import SVGmaker
     default=True,
     help="Create files with unique filenames by using current datetime suffix",
 )
-def cli(
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    required=False,
+    show_default=True,
+    default=1,
+    help="Amount of worker processes used for converting files in parallel",
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(min=0),
+    required=False,
+    show_default=True,
+    default=2,
+    help="Amount of input files to read and decode ahead while converting",
+)
+@click.option(
+    "--writers",
+    type=click.IntRange(min=0),
+    required=False,
+    show_default=True,
+    default=2,
+    help="Amount of threads writing outputs in the background; 0 writes outputs before converting the next file",
+)
+@click.option(
+    "--write-queue",
+    type=click.IntRange(min=1),
+    required=False,
+    show_default=True,
+    default=4,
+    help="Amount of outputs that may wait to be written before converting pauses",
+)
+@click.option(
+    "--fail-fast/--no-fail-fast",
+    is_flag=True,
+    show_default=True,
+    default=True,
+    help="Stop at the first failed file or continue and report all failed files at the end",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, dir_okay=True, resolve_path=True, path_type=Path),
+    required=False,
+    default=None,
+    help="Directory for caching edge images, points and polygons across runs",
+)
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=0),
+    required=False,
+    show_default=True,
+    default=1024,
+    help="Maximum size of the cache directory in megabytes",
+)
+@click.option(
+    "--incremental/--no-incremental",
+    is_flag=True,
+    show_default=True,
+    default=False,
+    help="Skip files of which the outputs are up to date, according to the manifest in the output directory",
+)
+@click.option(
+    "--sequence/--no-sequence",
+    is_flag=True,
+    show_default=True,
+    default=False,
+    is_eager=True,
+    help="Convert each input as a sequence of frames (directory of frames or video), reusing the points of the previous frame where the edges did not change",
+)
+@click.option(
+    "--shard",
+    type=str,
+    required=False,
+    default=None,
+    callback=ShardChecker(),
+    metavar="INDEX/COUNT",
+    help="Only convert the files of shard INDEX (from 1 to COUNT), e.g. `1/4`, to convert the same inputs on several machines; results are recorded in a shard manifest in the output directory",
+)
+@click.option(
+    "--profile",
+    type=click.Path(file_okay=True, dir_okay=False, resolve_path=True, path_type=Path),
+    required=False,
+    default=None,
+    help="Write wall time, CPU time and peak memory per stage to JSON (or CSV with .csv suffix) file",
+)
+@click.option(
+    "--profile-memory/--no-profile-memory",
+    is_flag=True,
+    show_default=True,
+    default=False,
+    help="Trace allocations for the peak memory per stage in the profile; slows down the stages and decodes and writes files in the foreground, so do not compare its times with other runs",
+)
+# Below the command, as the group calls the registered callback; usage errors are left to Click
+@logger.catch(exclude=click.ClickException)
+def convert(
     input_path,
+    include,
+    exclude,
+    max_depth,
     output_path,
     preset,
     extension,
     unique_filename,
+    workers,
+    prefetch,
+    writers,
+    write_queue,
+    fail_fast,
+    cache_dir,
+    cache_size,
+    incremental,
+    sequence,
+    shard,
+    profile,
+    profile_memory,
 ):
+    """Convert input files to low polygon SVG and PNG files."""
+
+    # Heavy dependencies (e.g. OpenCV, SciPy) are only imported once there is work to do
+    from lowpoly.cache import StageCache
+    from lowpoly.worker import execute_sequence, execute_units
+
     combined_result = combine_arguments_by_batch(
         input_path, output_path, preset, extension
     )
 
-    polygon_maker = PolygonMaker()
+    if sequence and incremental:
+        raise click.UsageError(
+            "Sequences cannot be converted incrementally, as every frame depends on the previous frames."
+        )
+
+    if sequence and any(
+        item.get("output").get("resolved").suffix for item in combined_result
+    ):
+        raise click.UsageError(
+            "Sequences need an output directory, as every frame has its own outputs."
+        )
 
-    for item in combined_result:
-        current_batch = item.get("batch")
-        current_preset = item.get("preset")
-        current_preset_type = current_preset.get("type", ["voronoi"])
-        current_preset_canny = current_preset.get(
-            "canny", {"threshold": {"min": 20, "max": 100}}
+    if sequence and shard is not None:
+        raise click.UsageError(
+            "Sequences cannot be sharded, as every frame depends on the previous frames."
         )
-        current_preset_grayscale = current_preset.get(
-            "grayscale", {"threshold": {"min": 0, "max": 255}}
+
+    if sequence and workers > 1:
+        raise click.UsageError(
+            "Sequences are converted in a single process, as every frame depends on the previous frames; pass `--workers 1`."
+        )
+
+    if (
+        workers > 1
+        and prefetch > 0
+        and click.get_current_context().get_parameter_source("prefetch")
+        != ParameterSource.DEFAULT
+    ):
+        raise click.UsageError(
+            "Worker processes do not decode files ahead, as they already overlap reading and converting; remove `--prefetch` or pass `--workers 1`."
         )
-        current_preset_points = current_preset.get(
-            "points", {"add": {"factor": 10000}, "reduce": {"factor": 50}}
+
+    if profile_memory and profile is None:
+        raise click.UsageError(
+            "Tracing memory requires a profile report; pass `--profile` as well."
         )
 
-        current_output_extension = item.get("extension")
-        current_output = item.get("output").get("resolved")
-        current_input_original_batch_name = item.get("input").get("given")
-        current_input_files = item.get("input").get("resolved")
-        total_current_input_files = len(current_input_files)
+    manifests: dict[Path, Manifest] = {}
+    shard_manifests: dict[Path, ShardManifest] = {}
+
+    def iterate_shard_files(files, batch: int, given: str, output_directory: Path):
+        """Files of the batch in this shard; files of other shards are counted, so merging can tell what is missing"""
+
+        if output_directory not in shard_manifests:
+            shard_manifests[output_directory] = ShardManifest(output_directory, *shard)
+
+        for file_path in files:
+            if shard_manifests[output_directory].assign(
+                batch, relative_input_path(file_path, given)
+            ):
+                yield file_path
+
+    def iterate_units():
+        """Units are created while the input directories are searched"""
+
+        for item in combined_result:
+            output_directory = item.get("output").get("resolved")
+            if output_directory.suffix:
+                output_directory = output_directory.parent
+
+            files = item.get("input").get("resolved")
+            if shard is not None:
+                files = iterate_shard_files(
+                    files,
+                    item.get("batch"),
+                    item.get("input").get("given"),
+                    output_directory,
+                )
+
+            for first, last, current_file_path in mark_first_last(files):
+                unit = {
+                    "batch": item.get("batch"),
+                    "given": item.get("input").get("given"),
+                    "first": first,
+                    "last": last,
+                    "arguments": {
+                        "file_path": current_file_path,
+                        "preset": item.get("preset"),
+                        "output_path": item.get("output").get("resolved"),
+                        "extensions": item.get("extension"),
+                        "unique_filename": unique_filename,
+                    },
+                    "manifest": None,
+                    "shard_manifest": shard_manifests.get(output_directory),
+                    "skip": False,
+                }
+
+                # Skip units for which the manifest of the output directory has up to date outputs
+                if incremental:
+                    if output_directory not in manifests:
+                        manifests[output_directory] = Manifest(output_directory)
+
+                    unit["manifest"] = manifests[output_directory]
+                    unit["skip"] = unit["manifest"].is_up_to_date(
+                        current_file_path,
+                        item.get("preset"),
+                        item.get("extension"),
+                    )
+
+                yield unit
+
+    # Units of which the result has not been reported yet, in order
+    pending_units: collections.deque[dict] = collections.deque()
+
+    def iterate_arguments():
+        for unit in iterate_units():
+            pending_units.append(unit)
+            if not unit.get("skip"):
+                yield unit.get("arguments")
+
+    def iterate_sequence_results():
+        """Every batch is a sequence, of which the frames are converted in order"""
 
-        for current_file_path_index, current_file_path in enumerate(
-            current_input_files
+        for _, batch_units in itertools.groupby(
+            iterate_units(), key=lambda unit: unit.get("batch")
         ):
-            if current_file_path_index == 0:
-                logger.info(
-                    f"LowPoly batch `{current_batch}` for `{current_input_original_batch_name}` started."
+            units_of_batch = list(batch_units)
+
+            for result in execute_sequence(
+                [unit.get("arguments") for unit in units_of_batch],
+                profile is not None,
+                writers,
+                write_queue,
+                profile_memory,
+            ):
+                unit = units_of_batch[result.pop("unit")]
+                frame = result.pop("frame")
+
+                # Every frame of a video is reported as a unit; its first and last frame start and finish the batch
+                pending_units.append(
+                    {
+                        **unit,
+                        "first": unit.get("first") and frame["first"],
+                        "last": unit.get("last") and frame["last"],
+                        "arguments": {
+                            **unit["arguments"],
+                            "file_path": frame["file_path"],
+                        },
+                    }
                 )
+                yield result
 
-            # %% grayscale
-            image_processing = ImageProcessing(current_file_path)
-            grayscale_image = image_processing.colour_2_grayscale(
-                image_processing.user_image
-            )
+    failed_units = []
+    skipped_units = 0
+    cache = None
+    if cache_dir is not None:
+        cache = StageCache(cache_dir, cache_size * 1024 * 1024)
+        cache.evict()
 
-            # %% edge detection
-            edge_detection = EdgeDetection()
-            canny_edge_detected_image = edge_detection.canny(
-                grayscale_image,
-                current_preset_canny["threshold"]["min"],
-                current_preset_canny["threshold"]["max"],
-            )
-            canny_binary_image = edge_detection.edge_gray_threshold(
-                canny_edge_detected_image,
-                grayscale_image,
-                current_preset_grayscale["threshold"]["min"],
-                current_preset_grayscale["threshold"]["max"],
+    profile_records: list[dict] = []
+    if sequence:
+        results = iterate_sequence_results()
+    else:
+        arguments = iterate_arguments()
+        if len(combined_result) > 1:
+            # Find all files first, so files in several batches are converted together and share stages
+            arguments = list(arguments)
+
+        results = execute_units(
+            arguments,
+            workers,
+            cache,
+            profile is not None,
+            prefetch,
+            writers,
+            write_queue,
+            profile_memory,
+        )
+
+    def report_unit(unit: dict, result: dict | None) -> None:
+        nonlocal skipped_units, profile_records
+
+        current_batch = unit.get("batch")
+        current_input_original_batch_name = unit.get("given")
+        current_file_path = unit["arguments"]["file_path"]
+
+        if unit.get("shard_manifest") is not None:
+            # Record before a failed file stops the conversion
+            unit["shard_manifest"].record(
+                current_batch,
+                relative_input_path(current_file_path, unit["given"]),
+                current_file_path,
+                result,
             )
 
-            # %% binary image points
-            binary_image_points = polygon_maker.add_additional_points_to_polygon(
-                canny_binary_image,
-                current_preset_points["add"]["factor"],
-                current_preset_points["reduce"]["factor"],
-                current_preset.get("seed", None),
+        if unit.get("first"):
+            logger.info(
+                f"LowPoly batch `{current_batch}` for `{current_input_original_batch_name}` started."
             )
 
-            # %% create polygons
-            for preset_type in current_preset_type:
-                polygon_output = {}
-                if preset_type == "delaunay":
-                    polygon_output = polygon_maker.delaunay(
-                        binary_image_points, image_processing
-                    )
+        if result is None:
+            logger.info(f"Skipped `{current_file_path!s}`, outputs are up to date.")
+            skipped_units += 1
+        else:
+            profile_records += result.get("profile", [])
 
-                if preset_type == "voronoi":
-                    polygon_output = polygon_maker.voronoi(
-                        binary_image_points, image_processing
-                    )
+            for output_file in result["outputs"]:
+                logger.info(f"Saved LowPoly output to `{output_file!s}`.")
 
-                if polygon_output == {}:
-                    raise InvalidPolygonOutputError
+            if result.get("error") is not None:
+                logger.error(result.get("traceback"))
+                if fail_fast:
+                    results.close()
+                    raise FileProcessingError(current_file_path, result.get("error"))
 
-                svg_maker = SVGmaker(
-                    current_preset, [image_processing.width, image_processing.height]
+                logger.warning(
+                    f"LowPoly failed for `{current_file_path!s}`. Continuing with next file."
                 )
-                xml_result = svg_maker.xml_result(polygon_output)
-                for output_extension in current_output_extension:
-                    output_path = svg_maker.prepare_output_path(
-                        current_file_path,
-                        current_output,
-                        output_extension,
-                        unique_filename,
-                        preset_type,
-                    )
-                    if output_extension == "svg":
-                        svg_maker.save_svg(xml_result, output_path)
+                failed_units.append((current_file_path, result.get("error")))
+            elif unit.get("manifest") is not None:
+                unit["manifest"].record(
+                    current_file_path,
+                    unit["arguments"]["preset"],
+                    unit["arguments"]["extensions"],
+                    result["outputs"],
+                )
+
+        if unit.get("last"):
+            logger.info(
+                f"LowPoly batch `{current_batch}` for `{current_input_original_batch_name}` finished."
+            )
+
+    completed = False
+    try:
+        for result in results:
+            while pending_units[0].get("skip"):
+                report_unit(pending_units.popleft(), None)
+            report_unit(pending_units.popleft(), result)
+
+        while pending_units:
+            report_unit(pending_units.popleft(), None)
+
+        completed = True
+    finally:
+        # Keep the outputs of converted files, even if the conversion stopped early
+        for manifest in manifests.values():
+            manifest.save()
+
+        for shard_manifest in shard_manifests.values():
+            shard_manifest.save(complete=completed)
+            logger.info(f"Saved LowPoly shard manifest to `{shard_manifest.path!s}`.")
+
+        # Worker processes only count the cache entries they stored themselves
+        if cache is not None:
+            cache.evict()
 
-                    if output_extension == "png":
-                        svg_maker.save_png(xml_result, output_path)
+    if skipped_units:
+        logger.info(f"Skipped {skipped_units} file(s) with up to date outputs.")
 
-                    logger.info(f"Saved LowPoly output to `{str(output_path)}`.")
+    if profile is not None:
+        write_profile(profile_records, profile)
+        for profile_summary_line in summarize_profile(profile_records):
+            logger.info(profile_summary_line)
+        logger.info(f"Saved LowPoly profile to `{profile!s}`.")
 
-            if current_file_path_index != total_current_input_files - 1:
+    if not failed_units:
+        return
+
+    logger.error(f"LowPoly failed for {len(failed_units)} file(s):")
+    for failed_file_path, failed_reason in failed_units:
+        logger.error(f"- `{failed_file_path!s}`: {failed_reason}")
+
+    sys.exit(1)
+
+
+@cli.command(
+    "serve",
+    context_settings={"help_option_names": ["-h", "--help"]},
+    epilog="Repository: https://github.com/ToshY/lowpoly",
+)
+@click.option(
+    "--host",
+    type=str,
+    show_default=True,
+    default="127.0.0.1",
+    help="Host to listen on",
+)
+@click.option(
+    "--port",
+    type=click.IntRange(min=0, max=65535),
+    show_default=True,
+    default=8080,
+    help="Port to listen on",
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(file_okay=True, dir_okay=False, resolve_path=True, path_type=Path),
+    required=False,
+    default=None,
+    help="Path to Unix socket to listen on, instead of host and port",
+)
+@click.option(
+    "--preset",
+    "-p",
+    type=click.Path(
+        exists=True, dir_okay=False, file_okay=True, resolve_path=True, path_type=Path
+    ),
+    required=False,
+    multiple=True,
+    show_default=True,
+    default=["./preset/default.json"],
+    help="Path to JSON file with preset options; requests select a preset by its file name without suffix, and use the first preset by default",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    show_default=True,
+    default=1,
+    help="Amount of worker processes, started before the first request",
+)
+@click.option(
+    "--queue-size",
+    type=click.IntRange(min=0),
+    show_default=True,
+    default=8,
+    help="Amount of requests waiting for a worker, before new requests are rejected with status 503",
+)
+@click.option(
+    "--timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    show_default=True,
+    default=60.0,
+    help="Seconds after which a conversion is answered with status 504",
+)
+@click.option(
+    "--max-request-size",
+    type=click.IntRange(min=1),
+    show_default=True,
+    default=50,
+    help="Maximum size of uploaded images in megabytes",
+)
+@logger.catch(exclude=click.ClickException)
+def serve(
+    host, port, socket_path, preset, workers, queue_size, timeout, max_request_size
+):
+    """Serve conversions over HTTP from warm worker processes."""
+
+    from lowpoly.server import RenderServer
+
+    presets = {path.stem: read_json(path) for path in preset}
+    if len(presets) != len(preset):
+        raise click.BadParameter(
+            "Preset file names must be unique", param_hint="preset"
+        )
+
+    RenderServer(
+        presets,
+        workers=workers,
+        queue_size=queue_size,
+        timeout=timeout,
+        max_request_size=max_request_size * 1024 * 1024,
+    ).serve(host, port, socket_path)
+
+
+@cli.command(
+    "merge",
+    context_settings={"help_option_names": ["-h", "--help"]},
+    epilog="Repository: https://github.com/ToshY/lowpoly",
+)
+@click.option(
+    "--output-path",
+    "-o",
+    type=click.Path(
+        exists=True, dir_okay=True, file_okay=False, resolve_path=True, path_type=Path
+    ),
+    required=False,
+    multiple=True,
+    show_default=True,
+    default=["./output"],
+    help="Path to output directory with shard manifests",
+)
+@logger.catch(exclude=click.ClickException)
+def merge(output_path):
+    """Merge the shard manifests of output directories, and report missing and failed files."""
+
+    incomplete = False
+    for directory in output_path:
+        merged = merge_shard_manifests(directory)
+        merged_path = directory.joinpath(MERGED_FILE_NAME)
+        with merged_path.open("w") as file:
+            json.dump(merged, file)
+
+        count = merged["count"]
+        for index, shard_summary in merged["shards"].items():
+            if index in merged["missing_shards"]:
+                expected = shard_summary["expected"]
+                logger.error(
+                    f"LowPoly shard {index}/{count} has no manifest"
+                    + (
+                        f"; {expected} file(s) missing."
+                        if expected is not None
+                        else "."
+                    )
+                )
                 continue
 
-            logger.info(
-                f"LowPoly batch `{current_batch}` for `{current_input_original_batch_name}` finished."
+            message = (
+                f"LowPoly shard {index}/{count} on `{shard_summary['host']}`: {shard_summary['items']} file(s) "
+                f"in {shard_summary['seconds']:.1f}s"
+            )
+            if shard_summary["complete"]:
+                logger.info(f"{message}.")
+            else:
+                logger.warning(f"{message}, stopped before all files were converted.")
+
+        if merged["failed"]:
+            logger.error(f"LowPoly failed for {len(merged['failed'])} file(s):")
+            for failed in merged["failed"]:
+                logger.error(
+                    f"- `{failed['path']}` of batch `{failed['batch']}`: {failed['error']}"
+                )
+
+        if merged["missing"] is None:
+            logger.warning(
+                f"No shard of `{directory!s}` finished, so missing files are unknown."
             )
+        elif merged["missing"]:
+            logger.error(
+                f"{merged['missing']} file(s) of `{directory!s}` have no result."
+            )
+
+        logger.info(f"Saved merged LowPoly shard manifest to `{merged_path!s}`.")
+
+        incomplete = (
+            incomplete
+            or bool(merged["failed"])
+            or bool(merged["incomplete_shards"])
+            or merged["missing"] != 0
+        )
+
+    if incomplete:
+        sys.exit(1)
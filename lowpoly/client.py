@@ -0,0 +1,98 @@
+import http.client
+import json
+import socket
+from urllib.parse import urlencode, urlsplit
+
+from lowpoly.exception import ServerResponseError
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix socket"""
+
+    def __init__(self, socket_path: str, timeout: float | None = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class LowpolyClient:
+    """
+    Minimal client of `lowpoly serve`, e.g. for tests and scripts on the same machine.
+
+    Every request uses a new connection, so a client can be shared between threads.
+    """
+
+    def __init__(
+        self,
+        url: str = "http://127.0.0.1:8080",
+        socket_path: str | None = None,
+        timeout: float | None = None,
+    ):
+        self.url = urlsplit(url)
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def convert(
+        self,
+        image: bytes,
+        polygon_type: str | None = None,
+        output_format: str = "svg",
+        preset: str | None = None,
+    ) -> bytes:
+        """
+        Converts an encoded image on the server.
+
+        Parameters:
+            image (bytes): The bytes of an encoded image (e.g. JPEG or PNG).
+            polygon_type (str, optional): Either `delaunay` or `voronoi`. Defaults to the first type of the preset.
+            output_format (str, optional): Either `svg` or `png`. Defaults to `svg`.
+            preset (str, optional): Name of a preset of the server. Defaults to the first preset of the server.
+
+        Returns:
+            bytes: The SVG document or PNG image.
+        """
+
+        query = {"format": output_format}
+        if polygon_type is not None:
+            query["type"] = polygon_type
+        if preset is not None:
+            query["preset"] = preset
+
+        return self._request("POST", f"/convert?{urlencode(query)}", image)
+
+    def health(self) -> dict:
+        return json.loads(self._request("GET", "/health"))
+
+    def metrics(self) -> str:
+        return self._request("GET", "/metrics").decode("utf-8")
+
+    def _request(self, method: str, path: str, body: bytes | None = None) -> bytes:
+        connection: http.client.HTTPConnection
+        if self.socket_path is not None:
+            connection = UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+        else:
+            connection = http.client.HTTPConnection(
+                self.url.hostname or "127.0.0.1",
+                self.url.port or 80,
+                timeout=self.timeout,
+            )
+
+        try:
+            connection.request(method, path, body=body)
+            response = connection.getresponse()
+            data = response.read()
+        finally:
+            connection.close()
+
+        if response.status != 200:
+            try:
+                message = json.loads(data)["error"]
+            except (ValueError, KeyError):
+                message = data.decode("utf-8", errors="replace")
+            raise ServerResponseError(response.status, message)
+
+        return data
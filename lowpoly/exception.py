@@ -42,6 +42,17 @@ class InvalidViewBoxError(Exception):
         return self.message
 
 
+class InvalidImageError(Exception):
+    ERROR_MESSAGE = "Cannot read image. Expected a path, encoded bytes or a BGR(A) or grayscale array of a supported image."
+
+    def __init__(self):
+        self.message = self.ERROR_MESSAGE
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
 class InvalidColourImageError(Exception):
     ERROR_MESSAGE = (
         "Cannot convert colour to grayscale image: given image is already grayscale."
@@ -64,3 +75,119 @@ class SvgToPngImageError(Exception):
 
     def __str__(self):
         return self.message
+
+
+class RasterImageError(Exception):
+    ERROR_MESSAGE = "Cannot render PNG image. Reason: {message}."
+
+    def __init__(self, message):
+        self.message = self.ERROR_MESSAGE.format(message=message)
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidRasterBackendError(Exception):
+    ERROR_MESSAGE = "Invalid PNG backend `{backend}`. Expected one of: {backends}."
+
+    def __init__(self, backend, backends):
+        self.message = self.ERROR_MESSAGE.format(
+            backend=backend, backends=", ".join(backends)
+        )
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidTileHeightError(Exception):
+    ERROR_MESSAGE = "Invalid tile height `{tile_height}` for `{option}`. Expected a positive integer or null."
+
+    def __init__(self, option, tile_height):
+        self.message = self.ERROR_MESSAGE.format(option=option, tile_height=tile_height)
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidSvgPrecisionError(Exception):
+    ERROR_MESSAGE = "Invalid precision `{precision}` for `output.svg.precision`. Expected a non-negative integer or null."
+
+    def __init__(self, precision):
+        self.message = self.ERROR_MESSAGE.format(precision=precision)
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidColourModeError(Exception):
+    ERROR_MESSAGE = "Invalid colour mode `{mode}`. Expected one of: {modes}."
+
+    def __init__(self, mode, modes):
+        self.message = self.ERROR_MESSAGE.format(mode=mode, modes=", ".join(modes))
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidAnalysisResolutionError(Exception):
+    ERROR_MESSAGE = "Invalid analysis resolution `{resolution}`. Expected a positive number, `auto` or null."
+
+    def __init__(self, resolution):
+        self.message = self.ERROR_MESSAGE.format(resolution=resolution)
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class InvalidImageArrayError(Exception):
+    ERROR_MESSAGE = (
+        "Invalid image array `{path}` of type `{dtype}` and shape {shape}. Expected `uint8` values of shape "
+        "(height, width), (height, width, 3) in BGR order or (height, width, 4) in BGRA order."
+    )
+
+    def __init__(self, path, dtype, shape):
+        self.message = self.ERROR_MESSAGE.format(path=path, dtype=dtype, shape=shape)
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class FileProcessingError(Exception):
+    ERROR_MESSAGE = "Failed to process file `{path}`. Reason: {message}."
+
+    def __init__(self, path, message):
+        self.message = self.ERROR_MESSAGE.format(path=path, message=message)
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class ServerResponseError(Exception):
+    ERROR_MESSAGE = "Server responded with status {status}. Reason: {message}"
+
+    def __init__(self, status, message):
+        self.status = status
+        self.message = self.ERROR_MESSAGE.format(status=status, message=message)
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class ShardManifestError(Exception):
+    ERROR_MESSAGE = "Cannot merge shard manifests of `{path}`. Reason: {message}."
+
+    def __init__(self, path, message):
+        self.message = self.ERROR_MESSAGE.format(path=path, message=message)
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
@@ -1,33 +1,112 @@
 import collections
 import fnmatch
 import json
+import os
+from collections.abc import Iterable, Iterator
 from pathlib import Path
+from typing import Any
+
+from lowpoly.exception import InvalidSvgPrecisionError
+
+# Lowercase suffixes of input images found in input directories; NumPy arrays (`.npy`) are only read when given as
+# input file, as other arrays in an input tree are not images
+IMAGE_SUFFIXES = frozenset(
+    {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tif", ".tiff"}
+)
+
+# Lowercase suffixes of videos, of which the frames are converted in sequence mode
+VIDEO_SUFFIXES = frozenset({".mp4", ".m4v", ".mov", ".avi", ".mkv", ".webm"})
 
 
 def files_in_dir(
     path: Path,
-    file_types=["*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.bmp", ".tiff"],
-):
+    file_types=IMAGE_SUFFIXES,
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+    max_depth: int | None = None,
+) -> Iterator[Path]:
     """
-    Returns a list of files in the given directory that match the specified file types.
+    Yields the files in the given directory that match the specified file types, while walking the directory.
+
+    Entries are yielded sorted by name per directory, files before subdirectories. Symbolic links to directories are
+    not followed.
 
     Parameters:
         path (Path): The path to the directory.
-        file_types (List[str], optional): A list of file types to match. Defaults to ["*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.bmp", ".tiff"].
+        file_types (Set[str], optional): The lowercase file suffixes to match. Defaults to IMAGE_SUFFIXES.
+        include (Iterable[str], optional): Glob patterns of which the relative path of a file must match at least one,
+            case-insensitive.
+        exclude (Iterable[str], optional): Glob patterns of relative paths of files and directories to skip,
+            case-insensitive.
+        max_depth (int, optional): The maximum depth of subdirectories to walk, where 0 only walks the directory itself.
+
+    Returns:
+        Iterator[Path]: The paths to the files in the directory that match the specified file types.
+    """
+
+    # Match case-insensitive, as the file types, so `*.jpg` also matches `x.JPG`
+    include = [pattern.lower() for pattern in include]
+    exclude = [pattern.lower() for pattern in exclude]
+    directories = [(str(path), "", 0)]
+    while directories:
+        directory, relative_directory, depth = directories.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except (FileNotFoundError, PermissionError, NotADirectoryError):
+            # Directory was removed or is not readable
+            continue
+
+        subdirectories = []
+        for entry in entries:
+            relative_path = relative_directory + entry.name.lower()
+            if any(fnmatch.fnmatchcase(relative_path, pattern) for pattern in exclude):
+                continue
+
+            if entry.is_dir(follow_symlinks=False):
+                if max_depth is None or depth < max_depth:
+                    subdirectories.append((entry.path, relative_path + "/", depth + 1))
+                continue
+
+            if os.path.splitext(entry.name)[1].lower() not in file_types:
+                continue
+
+            if include and not any(
+                fnmatch.fnmatchcase(relative_path, pattern) for pattern in include
+            ):
+                continue
+
+            if entry.is_file():
+                yield Path(entry.path)
+
+        # Walk subdirectories in order of their names
+        directories.extend(reversed(subdirectories))
+
+
+def mark_first_last(iterable: Iterable) -> Iterator[tuple[bool, bool, Any]]:
+    """
+    Yields the items of an iterable with whether each item is the first and the last item, looking one item ahead.
+
+    Parameters:
+        iterable (Iterable): The items.
 
     Returns:
-        List[Path]: A list of paths to the files in the directory that match the specified file types.
+        Iterator[tuple]: Whether the item is the first item, whether it is the last item, and the item.
     """
 
-    file_list = [
-        f
-        for f in path.rglob("*")
-        if any(
-            fnmatch.fnmatch(f.name.lower(), pattern.lower()) for pattern in file_types
-        )
-    ]
+    iterator = iter(iterable)
+    try:
+        current = next(iterator)
+    except StopIteration:
+        return
 
-    return file_list
+    first = True
+    for upcoming in iterator:
+        yield first, False, current
+        first = False
+        current = upcoming
+
+    yield first, True, current
 
 
 def read_json(path: Path) -> dict:
@@ -68,3 +147,129 @@ def combine_arguments_by_batch(*lists):
     result = [value for key, value in combined.items()]
 
     return result
+
+
+def get_output_scale(user_preset: dict, image_dimensions: list) -> float:
+    """
+    Returns the scale of the output image based on the output settings of the preset.
+
+    The "resolution" denotes max pixels the width OR height of output image can be and the scale
+    for both width and height will be calculated and applied based on this setting. If the scaled
+    image exceeds the "mega_pixel_constraint", the scale is reduced to comply with the constraint.
+
+    Parameters:
+        user_preset (dict): The preset options.
+        image_dimensions (list): The width and height of the input image.
+
+    Returns:
+        float: The scale to apply to the width and height of the input image.
+    """
+
+    width, height = image_dimensions
+
+    scale = user_preset.get("output", {}).get("resolution", 1)
+    if scale != 1:
+        scale = scale / max(image_dimensions)
+
+    # Check scale does not exceed constraint and solve if needed
+    user_mega_pixel_constraint = user_preset.get("output", {}).get(
+        "mega_pixel_constraint", None
+    )
+    if user_mega_pixel_constraint is not None:
+        mega_pixel_constraint = ((width * height) * scale**2) / 1e6
+        if mega_pixel_constraint >= user_mega_pixel_constraint:
+            scale = ((round(user_mega_pixel_constraint) * 1e6) / (width * height)) ** (
+                1 / 2
+            )
+
+    return scale
+
+
+def get_svg_precision(user_preset: dict) -> int | None:
+    """
+    Returns the amount of decimals for the polygon coordinates of SVG outputs.
+
+    Parameters:
+        user_preset (dict): The preset options.
+
+    Returns:
+        int | None: The amount of decimals, or None to keep the coordinates as is.
+    """
+
+    precision = user_preset.get("output", {}).get("svg", {}).get("precision")
+    if precision is not None and (
+        not isinstance(precision, int) or isinstance(precision, bool) or precision < 0
+    ):
+        raise InvalidSvgPrecisionError(precision)
+
+    return precision
+
+
+def flatten_polygons(polygon, offsets=None):
+    """
+    Returns polygons as flat coordinates with offsets.
+
+    Parameters:
+        polygon (ndarray): Either flat coordinates of shape (m, 2) when offsets are given, or polygons with the same
+            amount of points of shape (n, k, 2).
+        offsets (ndarray, optional): Start of each polygon in the flat coordinates, of shape (n + 1,).
+
+    Returns:
+        tuple: The flat coordinates of shape (m, 2) and the offsets of shape (n + 1,).
+    """
+
+    # Imported here, as the CLI imports this module on startup
+    import numpy as np
+
+    if offsets is not None:
+        return np.asarray(polygon), np.asarray(offsets)
+
+    polygon = np.asarray(polygon)
+    amount_of_polygons, amount_of_points = polygon.shape[:2]
+
+    return (
+        polygon.reshape(-1, 2),
+        np.arange(amount_of_polygons + 1) * amount_of_points,
+    )
+
+
+def polygon_bounding_boxes(
+    fixed_point_coordinates, offsets, fractional_bits, margin, width, height
+):
+    """
+    Returns the bounding boxes in whole pixels of the polygons with points.
+
+    Parameters:
+        fixed_point_coordinates (ndarray): Flat fixed-point coordinates of all polygons, of shape (m, 2).
+        offsets (ndarray): Start of each polygon in the flat coordinates, of shape (n + 1,).
+        fractional_bits (int): The fractional bits of the fixed-point coordinates.
+        margin (int): The pixels to add around each bounding box.
+        width (int): The width of the image to clip the bounding boxes to.
+        height (int): The height of the image to clip the bounding boxes to.
+
+    Returns:
+        tuple: The indices of the polygons with points, of shape (k,), and their bounding boxes as left, top, right
+            and bottom (exclusive), of shape (k, 4).
+    """
+
+    # Imported here, as the CLI imports this module on startup
+    import numpy as np
+
+    polygon_indices = np.flatnonzero(offsets[1:] > offsets[:-1])
+    starts = offsets[polygon_indices]
+    boxes = (
+        np.stack(
+            [
+                np.minimum.reduceat(fixed_point_coordinates[:, 0], starts),
+                np.minimum.reduceat(fixed_point_coordinates[:, 1], starts),
+                np.maximum.reduceat(fixed_point_coordinates[:, 0], starts),
+                np.maximum.reduceat(fixed_point_coordinates[:, 1], starts),
+            ],
+            axis=1,
+        ).astype(np.int64)
+        >> fractional_bits
+    )
+    boxes[:, :2] -= margin
+    boxes[:, 2:] += margin + 1
+
+    return polygon_indices, np.clip(boxes, 0, [width, height, width, height])
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+
+class Manifest:
+    """
+    Record of the inputs converted to an output directory, for skipping inputs of which the outputs are up to date.
+
+    Every entry records the size, modification time and content hash of an input file, and the output files that
+    were written for it per preset. An input is up to date when all its recorded outputs for the same preset and
+    extensions still exist, and the input file is unchanged. Unchanged size and modification time are trusted
+    without hashing the file again.
+    """
+
+    file_name = ".lowpoly-manifest.json"
+    hash_chunk_size = 1024 * 1024
+
+    def __init__(self, directory: Path):
+        self.path = Path(directory).joinpath(self.file_name)
+        self.entries: dict[str, dict] = {}
+        self.changed = False
+        self._load()
+
+    def is_up_to_date(self, file_path: Path, preset: dict, extensions: list) -> bool:
+        """Whether the input has outputs for the preset and extensions, and did not change since"""
+
+        entry = self.entries.get(str(file_path))
+        if entry is None:
+            return False
+
+        outputs = entry["presets"].get(self.preset_hash(preset, extensions))
+        if outputs is None or not all(Path(output).exists() for output in outputs):
+            return False
+
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return False
+
+        if stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime"]:
+            return True
+
+        if stat.st_size != entry["size"] or self.file_hash(file_path) != entry["hash"]:
+            return False
+
+        # Same content with a new modification time, e.g. after copying
+        entry["mtime"] = stat.st_mtime_ns
+        self.changed = True
+
+        return True
+
+    def record(
+        self, file_path: Path, preset: dict, extensions: list, outputs: list
+    ) -> None:
+        """Record the outputs of a converted input"""
+
+        stat = os.stat(file_path)
+        entry = self.entries.get(str(file_path))
+        if (
+            entry is None
+            or stat.st_size != entry["size"]
+            or stat.st_mtime_ns != entry["mtime"]
+        ):
+            entry = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+                "hash": self.file_hash(file_path),
+                "presets": {},
+            }
+            self.entries[str(file_path)] = entry
+
+        entry["presets"][self.preset_hash(preset, extensions)] = [
+            str(output) for output in outputs
+        ]
+        self.changed = True
+
+    def save(self) -> None:
+        """Write the manifest, if it changed, without leaving a partial file behind"""
+
+        if not self.changed:
+            return
+
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.path.parent, prefix=".tmp-", suffix=".json"
+        )
+        try:
+            with os.fdopen(file_descriptor, "w") as file:
+                json.dump({"version": 1, "entries": self.entries}, file)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            Path(temporary_path).unlink(missing_ok=True)
+            raise
+
+        self.changed = False
+
+    def file_hash(self, file_path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            while chunk := file.read(self.hash_chunk_size):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def preset_hash(self, preset: dict, extensions: list) -> str:
+        return hashlib.sha256(
+            json.dumps([preset, sorted(extensions)], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def _load(self) -> None:
+        try:
+            with self.path.open("r") as file:
+                data = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return
+
+        if isinstance(data, dict) and data.get("version") == 1:
+            self.entries = data.get("entries", {})
@@ -0,0 +1,586 @@
+from functools import partial
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from lowpoly.edgedetection import EdgeDetection
+from lowpoly.exception import (
+    InvalidAnalysisResolutionError,
+    InvalidColourImageError,
+    InvalidColourModeError,
+    InvalidImageArrayError,
+    InvalidImageError,
+    InvalidPolygonError,
+    InvalidPolygonGeometryError,
+    InvalidPolygonOutputError,
+    InvalidRasterBackendError,
+    InvalidSvgPrecisionError,
+    InvalidTileHeightError,
+    InvalidViewBoxError,
+    RasterImageError,
+    SvgToPngImageError,
+)
+from lowpoly.helper import get_output_scale, get_svg_precision
+from lowpoly.polygon import PolygonMaker
+from lowpoly.processing import ImageProcessing
+from lowpoly.raster import RasterMaker
+from lowpoly.sequence import SequencePoints
+from lowpoly.stage import StageGraph
+from lowpoly.svg import SVGmaker
+from lowpoly.writer import OutputWriter
+
+PNG_BACKENDS = ["cairosvg", "opencv"]
+
+COLOUR_MODES = ["point", "mean", "median"]
+
+# Errors of converting a single input, recorded as its failure; any other exception is a bug and is raised
+CONVERSION_ERRORS = (
+    InvalidAnalysisResolutionError,
+    InvalidColourImageError,
+    InvalidColourModeError,
+    InvalidImageArrayError,
+    InvalidImageError,
+    InvalidPolygonError,
+    InvalidPolygonGeometryError,
+    InvalidPolygonOutputError,
+    InvalidRasterBackendError,
+    InvalidSvgPrecisionError,
+    InvalidTileHeightError,
+    InvalidViewBoxError,
+    RasterImageError,
+    SvgToPngImageError,
+    # Reading inputs and writing outputs, invalid presets, Qhull and OpenCV failures, and images too large to convert
+    OSError,
+    ValueError,
+    RuntimeError,
+    cv2.error,
+    MemoryError,
+)
+
+
+class Pipeline:
+    """
+    Stage graph of the conversion: decode → grayscale → canny → threshold → points → triangulation → triangulate → render.
+
+    Stages are keyed by the preset options they depend on, so converting the same input file with
+    presets that only differ in e.g. the `output` or `type` options reuses the upstream results. Both
+    polygon types are derived from the same Delaunay triangulation of the points.
+
+    With an analysis tile height, edge detection runs on overlapping strips of the image instead, and the points
+    sampled per strip are merged; see `_tiled_edge_points`. Frames of a sequence take their points and triangulation
+    from the sequence instead, which reuses them from the previous frame; see `SequencePoints`.
+    """
+
+    # Rows added above and below each strip for edge detection, so edges at the strip borders are detected as well
+    analysis_tile_overlap = 8
+
+    def __init__(
+        self,
+        stage_graph: StageGraph | None = None,
+        writer: OutputWriter | None = None,
+        sequence: SequencePoints | None = None,
+    ):
+        self.stage_graph = stage_graph if stage_graph is not None else StageGraph()
+        self.writer = writer
+        self.sequence = sequence
+        self.edge_detection = EdgeDetection()
+        self.polygon_maker = PolygonMaker()
+
+    def decode(self, file_path: Path) -> ImageProcessing:
+        return self.stage_graph.run(
+            "decode",
+            self._decode_key(file_path),
+            lambda: ImageProcessing(file_path),
+        )
+
+    def provide_image(self, file_path: Path, image_processing: ImageProcessing) -> None:
+        """Provide decoded image, e.g. for images that are not read from disk"""
+
+        self.stage_graph.provide(
+            "decode", self._decode_key(file_path), image_processing
+        )
+
+    def dimensions(self, file_path: Path) -> list:
+        return self.stage_graph.run(
+            "dimensions",
+            self._decode_key(file_path),
+            lambda: self._dimensions(file_path),
+            persistent=True,
+        ).tolist()
+
+    def analysis_dimensions(self, file_path: Path, preset: dict) -> list | None:
+        """Dimensions of the image for edge detection, or None to use the input image as is"""
+
+        preset_resolution = preset.get("analysis", {}).get("resolution")
+        if preset_resolution is None:
+            return None
+
+        image_dimensions = self.dimensions(file_path)
+        if preset_resolution == "auto":
+            scale = get_output_scale(preset, image_dimensions)
+        elif (
+            isinstance(preset_resolution, (int, float))
+            and not isinstance(preset_resolution, bool)
+            and preset_resolution > 0
+        ):
+            scale = preset_resolution / max(image_dimensions)
+        else:
+            raise InvalidAnalysisResolutionError(preset_resolution)
+
+        # Never upscale
+        if scale >= 1:
+            return None
+
+        return [max(1, round(dimension * scale)) for dimension in image_dimensions]
+
+    def analysis_tile_height(self, preset: dict) -> int | None:
+        preset_tile_height = preset.get("analysis", {}).get("tile_height")
+        if preset_tile_height is not None and (
+            not isinstance(preset_tile_height, int)
+            or isinstance(preset_tile_height, bool)
+            or preset_tile_height < 1
+        ):
+            raise InvalidTileHeightError("analysis.tile_height", preset_tile_height)
+
+        return preset_tile_height
+
+    def grayscale(self, file_path: Path, preset: dict):
+        return self.stage_graph.run(
+            "grayscale",
+            self._grayscale_key(file_path, preset),
+            lambda: self._grayscale(file_path, preset),
+        )
+
+    def canny(self, file_path: Path, preset: dict):
+        preset_canny = self._preset_canny(preset)
+
+        return self.stage_graph.run(
+            "canny",
+            self._canny_key(file_path, preset),
+            lambda: self.edge_detection.canny(
+                self.grayscale(file_path, preset),
+                preset_canny["threshold"]["min"],
+                preset_canny["threshold"]["max"],
+            ),
+        )
+
+    def threshold(self, file_path: Path, preset: dict):
+        preset_grayscale = self._preset_grayscale(preset)
+
+        return self.stage_graph.run(
+            "threshold",
+            self._threshold_key(file_path, preset),
+            lambda: self.edge_detection.edge_gray_threshold(
+                self.canny(file_path, preset),
+                self.grayscale(file_path, preset),
+                preset_grayscale["threshold"]["min"],
+                preset_grayscale["threshold"]["max"],
+            ),
+            persistent=True,
+        )
+
+    def points(self, file_path: Path, preset: dict):
+        return self.stage_graph.run(
+            "points",
+            self._points_key(file_path, preset),
+            lambda: (
+                self._points(file_path, preset)
+                if self.sequence is None
+                else self.sequence.points(self, file_path, preset)
+            ),
+            persistent=True,
+            counts=lambda points: {"points": len(points)},
+        )
+
+    def triangulation(self, file_path: Path, preset: dict):
+        return self.stage_graph.run(
+            "triangulation",
+            self._points_key(file_path, preset),
+            lambda: (
+                self.polygon_maker.triangulation(self.points(file_path, preset))
+                if self.sequence is None
+                else self._sequence_triangulation(self.sequence, file_path, preset)
+            ),
+        )
+
+    def triangulate(self, file_path: Path, preset: dict, polygon_type: str) -> dict:
+        return self.stage_graph.run(
+            "triangulate",
+            [
+                self._points_key(file_path, preset),
+                polygon_type,
+                self.colour_mode(preset),
+            ],
+            lambda: self._triangulate(file_path, preset, polygon_type),
+            persistent=True,
+            counts=lambda polygon_output: {"polygons": len(polygon_output["colours"])},
+        )
+
+    def render(
+        self,
+        file_path: Path,
+        preset: dict,
+        polygon_type: str,
+        output_path: Path,
+        extensions: list,
+        unique_filename: bool,
+    ) -> list[Path]:
+        """
+        Write outputs; unlike the other stages this always runs.
+
+        With a writer the outputs are written in the background, and the returned paths are written once the
+        futures of the writer are done.
+        """
+
+        polygon_output = self.triangulate(file_path, preset, polygon_type)
+        image_dimensions = self.dimensions(file_path)
+
+        svg_maker = SVGmaker(preset, image_dimensions)
+
+        output_files = []
+        for output_extension in extensions:
+            output_file = svg_maker.prepare_output_path(
+                file_path,
+                output_path,
+                output_extension,
+                unique_filename,
+                polygon_type,
+            )
+            render = partial(
+                self._write_output,
+                svg_maker,
+                polygon_output,
+                image_dimensions,
+                preset,
+                output_extension,
+                Path(output_file),
+            )
+            profiler = self.stage_graph.profiler
+            if profiler is not None:
+                # Bound to the records of this file, as outputs written in the background finish later
+                render = partial(
+                    profiler.measure,
+                    "render:" + output_extension,
+                    render,
+                    lambda written_output_file: {
+                        "output_bytes": written_output_file.stat().st_size
+                    },
+                    False,
+                    profiler.file,
+                    profiler.records,
+                )
+
+            if self.writer is not None:
+                self.writer.submit(render)
+            else:
+                render()
+
+            output_files.append(Path(output_file))
+
+        return output_files
+
+    def encode(
+        self, file_path: Path, preset: dict, polygon_type: str, output_extension: str
+    ) -> bytes:
+        """Render output to bytes instead of a file"""
+
+        polygon_output = self.triangulate(file_path, preset, polygon_type)
+        image_dimensions = self.dimensions(file_path)
+        svg_maker = SVGmaker(preset, image_dimensions)
+
+        if output_extension == "png" and self.png_backend(preset) == "opencv":
+            return RasterMaker(preset, image_dimensions).render_png(polygon_output)
+
+        xml_result = svg_maker.xml_result(polygon_output)
+        if output_extension == "png":
+            return svg_maker.render_png(xml_result)
+
+        return xml_result.encode("utf-8")
+
+    def edges_reduction_factor(self, file_path: Path, preset: dict) -> float:
+        edges_reduction_factor = self._preset_points(preset)["reduce"]["factor"]
+
+        analysis_dimensions = self.analysis_dimensions(file_path, preset)
+        if analysis_dimensions is not None:
+            # Edges are shorter at a lower resolution; reduce them less for a similar amount of points
+            edges_reduction_factor = max(
+                1,
+                edges_reduction_factor
+                * analysis_dimensions[0]
+                / self.dimensions(file_path)[0],
+            )
+
+        return edges_reduction_factor
+
+    def middle_addition_factor(self, preset: dict) -> int:
+        return self._preset_points(preset)["add"]["factor"]
+
+    def colour_mode(self, preset: dict) -> str:
+        preset_colour_mode = preset.get("colour", {}).get("mode", "point")
+        if preset_colour_mode not in COLOUR_MODES:
+            raise InvalidColourModeError(preset_colour_mode, COLOUR_MODES)
+
+        return preset_colour_mode
+
+    def png_backend(self, preset: dict) -> str:
+        preset_png_backend = (
+            preset.get("output", {}).get("png", {}).get("backend", "cairosvg")
+        )
+        if preset_png_backend not in PNG_BACKENDS:
+            raise InvalidRasterBackendError(preset_png_backend, PNG_BACKENDS)
+
+        return preset_png_backend
+
+    def _write_output(
+        self,
+        svg_maker: SVGmaker,
+        polygon_output: dict,
+        image_dimensions: list,
+        preset: dict,
+        output_extension: str,
+        output_file: Path,
+    ) -> Path:
+        preset_png_backend = self.png_backend(preset)
+
+        if output_extension == "svg":
+            svg_maker.write_svg(polygon_output, output_file)
+
+        if output_extension == "png" and preset_png_backend == "opencv":
+            raster_maker = RasterMaker(preset, image_dimensions)
+            raster_maker.save_png(polygon_output, output_file)
+
+        if output_extension == "png" and preset_png_backend == "cairosvg":
+            svg_maker.save_png(svg_maker.xml_result(polygon_output), output_file)
+
+        return output_file
+
+    def _triangulate(self, file_path: Path, preset: dict, polygon_type: str) -> dict:
+        binary_image_points = self.points(file_path, preset)
+        image_processing = self.decode(file_path)
+
+        polygon_output = {}
+        if polygon_type == "delaunay":
+            polygon_output = self.polygon_maker.delaunay(
+                binary_image_points,
+                image_processing,
+                self.triangulation(file_path, preset),
+                self.colour_mode(preset),
+                self.analysis_tile_height(preset),
+            )
+
+        if polygon_type == "voronoi":
+            polygon_output = self.polygon_maker.voronoi(
+                binary_image_points,
+                image_processing,
+                self.triangulation(file_path, preset),
+                self.colour_mode(preset),
+                self.analysis_tile_height(preset),
+            )
+
+        if polygon_output == {}:
+            raise InvalidPolygonOutputError
+
+        return polygon_output
+
+    def _grayscale(self, file_path: Path, preset: dict):
+        image_processing = self.decode(file_path)
+        image = image_processing.user_image
+
+        analysis_dimensions = self.analysis_dimensions(file_path, preset)
+        if analysis_dimensions is not None:
+            image = image_processing.downscale(image, *analysis_dimensions)
+
+        return image_processing.colour_2_grayscale(image)
+
+    def _points(self, file_path: Path, preset: dict):
+        edges_reduction_factor = self.edges_reduction_factor(file_path, preset)
+        analysis_dimensions = self.analysis_dimensions(file_path, preset)
+
+        analysis_tile_height = self.analysis_tile_height(preset)
+        if analysis_dimensions is None and analysis_tile_height is not None:
+            generator = np.random.default_rng(seed=preset.get("seed", None))
+            image_width, image_height = self.dimensions(file_path)
+
+            return self.polygon_maker.complete_points(
+                self._tiled_edge_points(
+                    file_path,
+                    preset,
+                    analysis_tile_height,
+                    edges_reduction_factor,
+                    generator,
+                ),
+                image_width,
+                image_height,
+                self.middle_addition_factor(preset),
+                generator,
+            )
+
+        points = self.polygon_maker.add_additional_points_to_polygon(
+            self.threshold(file_path, preset),
+            self.middle_addition_factor(preset),
+            edges_reduction_factor,
+            preset.get("seed", None),
+        )
+
+        if analysis_dimensions is None:
+            return points
+
+        return self.polygon_maker.scale_points(
+            points, analysis_dimensions, self.dimensions(file_path)
+        )
+
+    def _sequence_triangulation(
+        self, sequence: SequencePoints, file_path: Path, preset: dict
+    ):
+        # The points of the frame update the triangulation of the sequence
+        self.points(file_path, preset)
+
+        return sequence.triangulation
+
+    def _tiled_edge_points(
+        self,
+        file_path: Path,
+        preset: dict,
+        tile_height: int,
+        edges_reduction_factor: float,
+        generator: np.random.Generator,
+    ) -> np.ndarray:
+        """Detect edges per overlapping strip of the image, and sample points of the edges within each strip"""
+
+        preset_canny = self._preset_canny(preset)
+        preset_grayscale = self._preset_grayscale(preset)
+        image_processing = self.decode(file_path)
+
+        # Draw the amount of points of the edges up to each strip, so rounding per strip does not add up
+        edge_points = []
+        amount_of_edges = 0
+        amount_of_points = 0
+        for top, bottom, overlap_top, strip in image_processing.strips(
+            tile_height, self.analysis_tile_overlap
+        ):
+            strip_grayscale = image_processing.colour_2_grayscale(strip)
+            strip_threshold = self.edge_detection.edge_gray_threshold(
+                self.edge_detection.canny(
+                    strip_grayscale,
+                    preset_canny["threshold"]["min"],
+                    preset_canny["threshold"]["max"],
+                ),
+                strip_grayscale,
+                preset_grayscale["threshold"]["min"],
+                preset_grayscale["threshold"]["max"],
+            )
+
+            strip_threshold = strip_threshold[top - overlap_top : bottom - overlap_top]
+            amount_of_edges += int(np.count_nonzero(strip_threshold))
+            strip_amount_of_points = (
+                int(np.round(amount_of_edges / edges_reduction_factor))
+                - amount_of_points
+            )
+            amount_of_points += strip_amount_of_points
+
+            strip_points = self.polygon_maker.sample_edge_points(
+                strip_threshold,
+                edges_reduction_factor,
+                generator,
+                strip_amount_of_points,
+            )
+            strip_points[:, 1] += top
+            edge_points.append(strip_points)
+
+        return np.concatenate(edge_points)
+
+    def _dimensions(self, file_path: Path) -> np.ndarray:
+        image_processing = self.decode(file_path)
+
+        return np.array([image_processing.width, image_processing.height])
+
+    def _decode_key(self, file_path: Path) -> list:
+        # Identify input files by content when results are cached across runs
+        if self.stage_graph.cache is not None:
+            return [self.stage_graph.cache.file_hash(file_path)]
+
+        return [str(file_path)]
+
+    def _grayscale_key(self, file_path: Path, preset: dict) -> list:
+        analysis_dimensions = self.analysis_dimensions(file_path, preset)
+        if analysis_dimensions is None:
+            analysis_tile_height = self.analysis_tile_height(preset)
+            if analysis_tile_height is None:
+                return self._decode_key(file_path)
+
+            return [self._decode_key(file_path), {"tile_height": analysis_tile_height}]
+
+        return [self._decode_key(file_path), analysis_dimensions]
+
+    def _canny_key(self, file_path: Path, preset: dict) -> list:
+        return [self._grayscale_key(file_path, preset), self._preset_canny(preset)]
+
+    def _threshold_key(self, file_path: Path, preset: dict) -> list:
+        return [self._canny_key(file_path, preset), self._preset_grayscale(preset)]
+
+    def _points_key(self, file_path: Path, preset: dict) -> list:
+        return [
+            self._threshold_key(file_path, preset),
+            self._preset_points(preset),
+            preset.get("seed", None),
+        ]
+
+    def _preset_canny(self, preset: dict) -> dict:
+        return preset.get("canny", {"threshold": {"min": 20, "max": 100}})
+
+    def _preset_grayscale(self, preset: dict) -> dict:
+        return preset.get("grayscale", {"threshold": {"min": 0, "max": 255}})
+
+    def _preset_points(self, preset: dict) -> dict:
+        return preset.get(
+            "points", {"add": {"factor": 10000}, "reduce": {"factor": 50}}
+        )
+
+
+def process_file(
+    file_path: Path,
+    preset: dict,
+    output_path: Path,
+    extensions: list,
+    unique_filename: bool,
+    stage_graph: StageGraph | None = None,
+    writer: OutputWriter | None = None,
+    sequence: SequencePoints | None = None,
+) -> list[Path]:
+    """
+    Converts a single input file with the given preset and writes the requested outputs.
+
+    Parameters:
+        file_path (Path): The path to the input image.
+        preset (dict): The preset options.
+        output_path (Path): The output file or directory.
+        extensions (list): The output file extensions, e.g. ["svg", "png"].
+        unique_filename (bool): Whether to suffix output files with the current datetime.
+        stage_graph (StageGraph, optional): Stage results to share with other conversions of the same file.
+        writer (OutputWriter, optional): Writes the outputs in the background instead of before returning.
+        sequence (SequencePoints, optional): The points of the sequence of which the input file is the next frame.
+
+    Returns:
+        list[Path]: The paths of the written output files, in the order they were written.
+    """
+
+    pipeline = Pipeline(stage_graph, writer, sequence)
+
+    # Fail on an invalid backend, colour mode or precision before doing any work
+    pipeline.png_backend(preset)
+    pipeline.colour_mode(preset)
+    get_svg_precision(preset)
+
+    output_files = []
+    for polygon_type in preset.get("type", ["voronoi"]):
+        output_files += pipeline.render(
+            file_path,
+            preset,
+            polygon_type,
+            output_path,
+            extensions,
+            unique_filename,
+        )
+
+    return output_files
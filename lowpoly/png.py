@@ -0,0 +1,80 @@
+import struct
+import zlib
+from typing import BinaryIO
+
+import numpy as np
+
+from lowpoly.exception import RasterImageError
+
+
+class PNGWriter:
+    """
+    Streams rows of an RGBA image into a PNG file, so the image does not have to be in memory as a whole.
+
+    Rows are filtered with the PNG `Up` filter, which leaves only the changes between rows to compress; flat
+    coloured polygons compress well that way. The rows of the previous band are carried over to the next band.
+    """
+
+    signature = b"\x89PNG\r\n\x1a\n"
+
+    # PNG filter type of each row
+    up_filter = 2
+
+    # Fast compression, like the default of OpenCV
+    compression_level = 1
+
+    def __init__(self, file: BinaryIO, width: int, height: int):
+        self.file = file
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.compressor = zlib.compressobj(self.compression_level)
+        self.previous_row = np.zeros(width * 4, dtype=np.uint8)
+
+        self.file.write(self.signature)
+        # 8 bits per channel, RGBA, default compression, filtering and no interlacing
+        self._write_chunk(
+            b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+        )
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        """Write the next rows, as uint8 array of shape (n, width, 4)"""
+
+        if len(rows) == 0:
+            return
+
+        if self.rows_written + len(rows) > self.height:
+            raise RasterImageError("more rows than the image height")
+
+        flat_rows = rows.reshape(len(rows), self.width * 4)
+        previous_rows = np.concatenate([self.previous_row[None], flat_rows[:-1]])
+
+        filtered_rows = np.empty((len(rows), self.width * 4 + 1), dtype=np.uint8)
+        filtered_rows[:, 0] = self.up_filter
+        np.subtract(flat_rows, previous_rows, out=filtered_rows[:, 1:])
+
+        compressed = self.compressor.compress(filtered_rows.tobytes())
+        if compressed:
+            self._write_chunk(b"IDAT", compressed)
+
+        self.previous_row = flat_rows[-1].copy()
+        self.rows_written += len(rows)
+
+    def close(self) -> None:
+        """Finish the PNG file; all rows must have been written"""
+
+        if self.rows_written != self.height:
+            raise RasterImageError(
+                f"{self.rows_written} of {self.height} rows were written"
+            )
+
+        self._write_chunk(b"IDAT", self.compressor.flush())
+        self._write_chunk(b"IEND", b"")
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes) -> None:
+        self.file.write(struct.pack(">I", len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(
+            struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type)) & 0xFFFFFFFF)
+        )
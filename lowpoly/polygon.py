@@ -1,184 +1,441 @@
+from types import SimpleNamespace
+
+import cv2
 import numpy as np
-from scipy.spatial import Delaunay, Voronoi  # type: ignore[import-untyped]
-from shapely.geometry import Polygon  # type: ignore[import-untyped]
 
 from lowpoly.exception import (
-    InvalidPolygonGeometryError,
     InvalidPolygonError,
+    InvalidPolygonGeometryError,
 )
+from lowpoly.helper import polygon_bounding_boxes
 
 
 class PolygonMaker:
-    def voronoi(self, binary_image_points, image_processing):
-        voronoi = Voronoi(binary_image_points)
-        regions, vertices = self._get_voronoi_finite_polygons(voronoi)
 
-        # Clip box from image dimensions
-        box = Polygon(
-            [
-                (0, 0),
-                (image_processing.width, 0),
-                (image_processing.width, image_processing.height),
-                (0, image_processing.height),
-            ]
-        )
+    # Fractional bits of the fixed-point polygon coordinates of the label image
+    fractional_bits = 8
+
+    # Pixels around the bounding box of a polygon that its edges may cover
+    polygon_margin = 2
 
-        voronoi_polygons = []
-        for idx, region in enumerate(regions):
-            polygon = Polygon(vertices[region])
+    def triangulation(self, binary_image_points):
+        from scipy.spatial import Delaunay  # type: ignore[import-untyped]
 
-            if not polygon.is_valid:
-                try:
-                    polygon = polygon.buffer(0)
-                except TypeError | ValueError:
-                    raise InvalidPolygonGeometryError
+        return Delaunay(binary_image_points)
 
-            # Clipping polygon to image dimensions
-            poly = polygon.intersection(box)
+    def voronoi(
+        self,
+        binary_image_points,
+        image_processing,
+        triangulation=None,
+        colour_mode="point",
+        tile_height=None,
+    ):
+        if triangulation is None:
+            triangulation = self.triangulation(binary_image_points)
+
+        voronoi = self._get_voronoi_from_delaunay(triangulation)
+        regions, region_offsets, vertices = self._get_voronoi_finite_polygons(voronoi)
+
+        # Clipping polygons to image dimensions
+        voronoi_polygons, voronoi_offsets = self._clip_polygons(
+            regions,
+            region_offsets,
+            vertices,
+            image_processing.width,
+            image_processing.height,
+        )
 
-            # Append to list
-            voronoi_polygons.append(
-                list(map(list, np.array([p for p in poly.exterior.coords])))
+        colours = self._get_colours(image_processing.user_image, binary_image_points)
+        if colour_mode != "point":
+            colours = self._get_polygon_colours(
+                image_processing.user_image,
+                voronoi_polygons,
+                voronoi_offsets,
+                colour_mode,
+                colours,
+                tile_height,
             )
 
         return {
-            "colours": self._get_colours(
-                image_processing.user_image, binary_image_points
-            ),
+            "colours": colours,
             "polygons": voronoi_polygons,
+            "offsets": voronoi_offsets,
         }
 
-    def delaunay(self, binary_image_points, image_processing):
-        tri = Delaunay(binary_image_points)
-        aot = binary_image_points[tri.simplices].shape[0]
-        triangle_centre = np.empty([aot, 2], dtype=int)
-
-        for idx, s in enumerate(binary_image_points[tri.simplices]):
-            triangle_centre[idx] = self._get_polygon_centre(s)
+    def delaunay(
+        self,
+        binary_image_points,
+        image_processing,
+        triangulation=None,
+        colour_mode="point",
+        tile_height=None,
+    ):
+        if triangulation is None:
+            triangulation = self.triangulation(binary_image_points)
+
+        tri = triangulation
+        triangles = binary_image_points[tri.simplices]
+        coordinates = triangles.reshape(-1, 2)
+        offsets = np.arange(len(triangles) + 1) * 3
+        triangle_centre = self._get_polygon_centres(coordinates, offsets).astype(int)
+
+        colours = self._get_colours(image_processing.user_image, triangle_centre)
+        if colour_mode != "point":
+            colours = self._get_polygon_colours(
+                image_processing.user_image,
+                coordinates,
+                offsets,
+                colour_mode,
+                colours,
+                tile_height,
+            )
 
         return {
-            "colours": self._get_colours(image_processing.user_image, triangle_centre),
-            "polygons": binary_image_points[tri.simplices],
+            "colours": colours,
+            "polygons": triangles,
         }
 
-    def _get_polygon_centre(self, poly, rounded=True):
-        """Get polygon center"""
-
-        # Amount of points
-        amount_of_points = poly.shape[0]
-
-        if amount_of_points == 3:
-            # Triangle
-            ply = poly.mean(axis=0)
-            if rounded:
-                return np.round(ply)
-            else:
-                return ply
-        elif amount_of_points > 3:
-            # Polygons
-            Cx = Cy = A = 0.0
-            for i in range(len(poly)):
-                # If at last entry, the i+1 entry should be first: poly[j]=poly[0]
-                if i != len(poly) - 1:
-                    j = i + 1
-                else:
-                    j = 0
-
-                # Factor
-                f = poly[i][0] * poly[j][1] - poly[j][0] * poly[i][1]
-                # Centre
-                Cx += (poly[i][0] + poly[j][0]) * f
-                Cy += (poly[i][1] + poly[j][1]) * f
-                # Area
-                A += f
-
-            Af = np.absolute(A)
-            ply = np.abs(np.array([(Cx / (3 * Af)), (Cy / (3 * Af))]))
-
-            if rounded:
-                return np.round(ply)
-            else:
-                return ply
-        else:
+    def _clip_polygons(self, regions, region_offsets, vertices, width, height):
+        """
+        Clip all polygons to the image dimensions at once.
+        Parameters
+        ----------
+        regions : ndarray
+            Indices of vertices of all polygons.
+        region_offsets : ndarray
+            Start of each polygon in regions, shape (n + 1,).
+        vertices : ndarray
+            Coordinates of the vertices.
+        width : int
+            Width of the clip box.
+        height : int
+            Height of the clip box.
+        Returns
+        -------
+        coordinates : ndarray
+            Exterior coordinates of all clipped polygons, shape (m, 2).
+        offsets : ndarray
+            Start of each polygon in coordinates, shape (n + 1,). Polygon i
+            consists of coordinates[offsets[i]:offsets[i + 1]].
+        """
+
+        import shapely  # type: ignore[import-untyped]
+
+        amount_of_regions = len(region_offsets) - 1
+        rings = shapely.linearrings(
+            vertices[regions],
+            indices=np.repeat(np.arange(amount_of_regions), np.diff(region_offsets)),
+        )
+        polygons = shapely.polygons(rings)
+
+        invalid = ~shapely.is_valid(polygons)
+        if invalid.any():
+            try:
+                polygons[invalid] = shapely.buffer(polygons[invalid], 0)
+            except (TypeError, ValueError):
+                raise InvalidPolygonGeometryError
+
+        # Clip box from image dimensions
+        box = shapely.Polygon([(0, 0), (width, 0), (width, height), (0, height)])
+        exteriors = shapely.get_exterior_ring(shapely.intersection(polygons, box))
+        if shapely.is_missing(exteriors).any():
+            raise InvalidPolygonGeometryError
+
+        coordinates, index = shapely.get_coordinates(exteriors, return_index=True)
+        return coordinates, self._get_offsets(index, amount_of_regions)
+
+    def _get_polygon_centres(self, coordinates, offsets, rounded=True):
+        """
+        Get polygon centres for many polygons at once.
+        Parameters
+        ----------
+        coordinates : ndarray
+            Coordinates of all polygons, shape (m, 2).
+        offsets : ndarray
+            Start of each polygon in coordinates, shape (n + 1,).
+        rounded : bool, optional
+            Round the centres to whole pixels.
+        Returns
+        -------
+        centres : ndarray
+            Centre of each polygon, shape (n, 2). Triangles use the mean of
+            their points, other polygons the centroid from the shoelace formula.
+        """
+
+        offsets = np.asarray(offsets)
+        amount_of_points = np.diff(offsets)
+        if (amount_of_points < 3).any():
             # <3 points = no center
-            raise InvalidPolygonError(amount_of_points)
+            raise InvalidPolygonError(amount_of_points[amount_of_points < 3][0])
+
+        coordinates = np.asarray(coordinates, dtype=float)
+        starts = offsets[:-1]
+
+        # Next point of each point, where the last point wraps around to the first
+        following = np.arange(1, coordinates.shape[0] + 1)
+        following[offsets[1:] - 1] = starts
+
+        x, y = coordinates[:, 0], coordinates[:, 1]
+        x_next, y_next = x[following], y[following]
+
+        # Factor
+        f = x * y_next - x_next * y
+        # Centre
+        cx = np.add.reduceat((x + x_next) * f, starts)
+        cy = np.add.reduceat((y + y_next) * f, starts)
+        # Area
+        a = np.add.reduceat(f, starts)
+
+        centres = np.add.reduceat(coordinates, starts) / amount_of_points[:, None]
+        shoelace = (amount_of_points > 3) & (a != 0)
+        af = np.absolute(a[shoelace])
+        centres[shoelace] = np.abs(
+            np.column_stack((cx[shoelace] / (3 * af), cy[shoelace] / (3 * af)))
+        )
+
+        if rounded:
+            return np.round(centres)
+
+        return centres
 
     def add_additional_points_to_polygon(
         self,
         binary_image,
         middle_addition_factor: int = 10,
-        edges_reduction_factor: int = 50,
+        edges_reduction_factor: float = 50,
         seed: int | None = None,
     ):
         """Add more corner, edge, and middle points"""
 
         image_height, image_width = binary_image.shape
-        image_y, image_x = np.nonzero(binary_image)
 
-        image_coordinates = np.column_stack((image_x, image_y))
-        image_coordinates_len = image_coordinates.shape[0]
+        # Generator based on seed
+        generator = np.random.default_rng(seed=seed)
 
-        # Corners
-        image_corner_points = np.array(
-            [
-                [0, 0],
-                [0, image_height - 1],
-                [image_width - 1, 0],
-                [image_width - 1, image_height - 1],
-            ]
+        return self.complete_points(
+            self.sample_edge_points(binary_image, edges_reduction_factor, generator),
+            image_width,
+            image_height,
+            middle_addition_factor,
+            generator,
         )
 
-        # Generator based on seed
-        generator = np.random.default_rng(seed=seed)
+    def sample_edge_points(
+        self,
+        binary_image,
+        edges_reduction_factor,
+        generator: np.random.Generator,
+        amount: int | None = None,
+    ):
+        """Sample a fraction, or the given amount, of the edge pixels as (x, y) points, as int32 unless the image has too many pixels"""
+
+        image_width = binary_image.shape[1]
+
+        # Flat (row-major) indices of edge pixels
+        image_edge_indices = np.flatnonzero(binary_image)
+        image_edge_indices_len = image_edge_indices.size
+        if amount is None:
+            amount = int(np.round(image_edge_indices_len / edges_reduction_factor))
+
+        # Get fraction of the points of the edge image; sampling without replacement only draws
+        # the requested amount of indices instead of permuting all edge pixels
+        image_edge_indices = image_edge_indices[
+            generator.choice(
+                image_edge_indices_len,
+                size=amount,
+                replace=False,
+                shuffle=False,
+            )
+        ].astype(np.int32 if binary_image.size <= np.iinfo(np.int32).max else np.int64)
+        image_edge_y, image_edge_x = np.divmod(image_edge_indices, image_width)
 
-        # Get fraction of the points of the edge image
-        image_edge_points = image_coordinates[
-            generator.permutation(image_coordinates_len)[
-                : (int(np.round(image_coordinates_len / edges_reduction_factor)))
-            ]
-        ]
+        return np.column_stack((image_edge_x, image_edge_y))
+
+    def complete_points(
+        self,
+        edge_points,
+        image_width: int,
+        image_height: int,
+        middle_addition_factor: int,
+        generator: np.random.Generator,
+    ):
+        """Add random middle points and corners to edge points, as unique points sorted by x and then y"""
+
+        image_edge_x, image_edge_y = edge_points[:, 0], edge_points[:, 1]
 
         # Addition of random points
         random_points = generator.random((middle_addition_factor, 2))
-        random_points[:, 0] = np.round(random_points[:, 0] * image_width)
-        random_points[:, 1] = np.round(random_points[:, 1] * image_height)
+        random_x = np.round(random_points[:, 0] * image_width).astype(np.int64)
+        random_y = np.round(random_points[:, 1] * image_height).astype(np.int64)
 
-        # Complete (unique_output_file_name) point set
-        image_point_set = np.unique(
-            np.vstack((image_edge_points, random_points, image_corner_points)), axis=0
-        ).astype(int)
+        # Corners
+        corner_x = np.array([0, 0, image_width - 1, image_width - 1])
+        corner_y = np.array([0, image_height - 1, 0, image_height - 1])
 
         # Replace points if do not comply with image height/width
-        point_set_width = image_point_set[:, 0]
-        point_set_height = image_point_set[:, 1]
-        point_set_height[point_set_height >= image_height] = image_height - 1
-        point_set_width[point_set_width >= image_width] = image_width - 1
+        point_set_width = np.minimum(
+            np.concatenate((image_edge_x, random_x, corner_x)), image_width - 1
+        )
+        point_set_height = np.minimum(
+            np.concatenate((image_edge_y, random_y, corner_y)), image_height - 1
+        )
 
-        return np.fliplr(
-            np.concatenate(
-                (
-                    self._numpy_transpose(self._shape2_d(point_set_height)),
-                    self._numpy_transpose(self._shape2_d(point_set_width)),
-                ),
-                axis=1,
+        # Complete unique point set, sorted by x and then y, by deduplicating a single
+        # integer per point instead of comparing rows
+        unique_point_set = np.unique(point_set_width * image_height + point_set_height)
+        point_set_width, point_set_height = np.divmod(unique_point_set, image_height)
+
+        return np.column_stack((point_set_width, point_set_height))
+
+    def scale_points(self, points, source_dimensions, target_dimensions):
+        """Map points to an image with other dimensions, keeping corners at the corners"""
+
+        source = np.maximum(np.asarray(source_dimensions) - 1, 1)
+        target = np.asarray(target_dimensions) - 1
+
+        return np.round(points * (target / source)).astype(np.int64)
+
+    def _get_voronoi_from_delaunay(self, triangulation):
+        """
+        Derive the Voronoi diagram from its dual Delaunay triangulation,
+        instead of running Qhull a second time.
+
+        Voronoi vertices are the circumcenters of the triangles, every
+        triangle edge is a ridge between its two points, and the region of
+        a point consists of the circumcenters of the triangles around it.
+        Parameters
+        ----------
+        triangulation : Delaunay
+            Triangulation of the points.
+        Returns
+        -------
+        voronoi : SimpleNamespace
+            Diagram with the `points`, `vertices`, `ridge_points` and
+            `ridge_vertices` of `scipy.spatial.Voronoi`, and the unordered
+            vertices of the region of each point as `regions` with
+            `region_offsets`. Infinite regions contain vertex -1.
+        """
+
+        points = triangulation.points
+        simplices = triangulation.simplices
+        neighbors = triangulation.neighbors
+
+        a, b, c = (points[simplices[:, i]] for i in range(3))
+        d = 2 * (
+            a[:, 0] * (b[:, 1] - c[:, 1])
+            + b[:, 0] * (c[:, 1] - a[:, 1])
+            + c[:, 0] * (a[:, 1] - b[:, 1])
+        )
+        if not np.all(d):
+            # Triangles without area have no circumcenter
+            return self._get_voronoi_from_qhull(points)
+
+        a2, b2, c2 = ((p**2).sum(axis=1) for p in (a, b, c))
+        circumcenters = np.column_stack(
+            (
+                (a2 * (b[:, 1] - c[:, 1]) + b2 * (c[:, 1] - a[:, 1]))
+                + c2 * (a[:, 1] - b[:, 1]),
+                (a2 * (c[:, 0] - b[:, 0]) + b2 * (a[:, 0] - c[:, 0]))
+                + c2 * (b[:, 0] - a[:, 0]),
+            )
+        ) / d[:, None].astype(float)
+
+        # Triangles of cocircular points share their circumcenter
+        vertices, triangle_vertex = np.unique(
+            circumcenters, axis=0, return_inverse=True
+        )
+        triangle_vertex = triangle_vertex.reshape(-1)
+
+        # Edge i of a triangle is opposite of its point i
+        triangle_index = np.repeat(np.arange(len(simplices)), 3)
+        edge_points = np.column_stack(
+            (
+                np.roll(simplices, -1, axis=1).ravel(),
+                np.roll(simplices, -2, axis=1).ravel(),
             )
         )
+        edge_neighbors = neighbors.ravel()
+
+        # Every interior edge is shared by two triangles; hull edges are infinite ridges
+        ridge_vertex = triangle_vertex[triangle_index]
+        ridge_neighbor_vertex = np.where(
+            edge_neighbors >= 0, triangle_vertex[edge_neighbors], -1
+        )
+        keep = (edge_neighbors < 0) | (
+            (triangle_index < edge_neighbors) & (ridge_vertex != ridge_neighbor_vertex)
+        )
+        ridge_points = edge_points[keep]
+        ridge_vertices = np.column_stack(
+            (ridge_neighbor_vertex[keep], ridge_vertex[keep])
+        )
+
+        # Region of a point: circumcenters of the triangles around it, and -1 for points on the hull
+        hull_points = np.unique(triangulation.convex_hull)
+        region_point = np.concatenate((simplices.ravel(), hull_points))
+        region_vertex = np.concatenate(
+            (ridge_vertex, np.full(len(hull_points), -1, dtype=ridge_vertex.dtype))
+        )
+        order = np.lexsort((region_vertex, region_point))
+        region_point = region_point[order]
+        region_vertex = region_vertex[order]
+        unique = np.ones(len(order), dtype=bool)
+        unique[1:] = (region_point[1:] != region_point[:-1]) | (
+            region_vertex[1:] != region_vertex[:-1]
+        )
+
+        return SimpleNamespace(
+            points=points,
+            vertices=vertices,
+            ridge_points=ridge_points,
+            ridge_vertices=ridge_vertices,
+            regions=region_vertex[unique],
+            region_offsets=self._get_offsets(region_point[unique], len(points)),
+        )
+
+    def _get_voronoi_from_qhull(self, points):
+        """Voronoi diagram of Qhull, with the regions of `_get_voronoi_from_delaunay`"""
+
+        from scipy.spatial import Voronoi  # type: ignore[import-untyped]
+
+        voronoi = Voronoi(points)
+        regions = [voronoi.regions[region] for region in voronoi.point_region]
+        region_lengths = np.fromiter(
+            (len(region) for region in regions), dtype=np.intp, count=len(regions)
+        )
+
+        return SimpleNamespace(
+            points=voronoi.points,
+            vertices=voronoi.vertices,
+            ridge_points=voronoi.ridge_points,
+            ridge_vertices=np.asarray(voronoi.ridge_vertices),
+            regions=np.concatenate(regions).astype(np.intp),
+            region_offsets=self._get_offsets(
+                np.repeat(np.arange(len(regions)), region_lengths), len(regions)
+            ),
+        )
 
     def _get_voronoi_finite_polygons(self, voronoi, radius=None):
         """
         Reconstruct infinite voronoi regions in a 2D diagram to finite
         regions.
+
+        The missing endpoints of all infinite ridges are computed at once,
+        and the vertices of all regions are ordered counterclockwise in a
+        single sort.
         Parameters
         ----------
-        voronoi : Voronoi
-            Input diagram
+        voronoi : SimpleNamespace
+            Input diagram, see `_get_voronoi_from_delaunay`.
         radius : float, optional
             Distance to 'points at infinity'.
         Returns
         -------
-        regions : list of tuples
-            Indices of vertices in each revised Voronoi regions.
-        vertices : list of tuples
+        regions : ndarray
+            Indices of vertices of all revised Voronoi regions.
+        region_offsets : ndarray
+            Start of the region of each point in regions, shape (n + 1,).
+        vertices : ndarray
             Coordinates for revised Voronoi vertices. Same as coordinates
             of input vertices, with 'points at infinity' appended to the
             end.
@@ -186,67 +443,71 @@ class PolygonMaker:
         Sklavit/e05f0b61cb12ac781c93442fbea4fb55
         """
 
-        if voronoi.points.shape[1] != 2:
+        points = voronoi.points
+        if points.shape[1] != 2:
             raise ValueError("Requires 2D input")
 
-        new_regions = []
-        new_vertices = voronoi.vertices.tolist()
-
-        center = voronoi.points.mean(axis=0)
+        center = points.mean(axis=0)
         if radius is None:
-            radius = np.ptp(voronoi.points).max() * 2
+            radius = np.ptp(points).max() * 2
 
-        # Construct a map containing all ridges for a given point
-        all_ridges = {}
-        for (p1, p2), (v1, v2) in zip(voronoi.ridge_points, voronoi.ridge_vertices):
-            all_ridges.setdefault(p1, []).append((p2, v1, v2))
-            all_ridges.setdefault(p2, []).append((p1, v1, v2))
+        # Compute the missing endpoints of all infinite ridges
+        ridge_points = np.asarray(voronoi.ridge_points)
+        ridge_vertices = np.asarray(voronoi.ridge_vertices)
+        infinite = (ridge_vertices < 0).any(axis=1)
+        p1, p2 = ridge_points[infinite].T
+        finite_vertex = ridge_vertices[infinite].max(axis=1)
 
-        # Reconstruct infinite regions
-        for p1, region in enumerate(voronoi.point_region):
-            vertices = voronoi.regions[region]
+        t = points[p2] - points[p1]  # tangent
+        t /= np.linalg.norm(t, axis=1)[:, None]
+        n = np.column_stack((-t[:, 1], t[:, 0]))  # normal
 
-            if all(v >= 0 for v in vertices):
-                # finite region
-                new_regions.append(vertices)
-                continue
-
-            # reconstruct a non-finite region
-            ridges = []
-            if p1 in all_ridges:
-                ridges = all_ridges[p1]
+        midpoint = (points[p1] + points[p2]) / 2
+        direction = np.sign(((midpoint - center) * n).sum(axis=1))[:, None] * n
+        far_points = voronoi.vertices[finite_vertex] + direction * radius
 
-            new_region = [v for v in vertices if v >= 0]
+        # Both regions of an infinite ridge share its far point
+        vertices = np.concatenate((voronoi.vertices, far_points))
+        far_vertex = len(voronoi.vertices) + np.arange(len(far_points))
 
-            for p2, v1, v2 in ridges:
-                if v2 < 0:
-                    v1, v2 = v2, v1
-                if v1 >= 0:
-                    # finite ridge: already in the region
-                    continue
+        region_point = np.repeat(
+            np.arange(len(points)), np.diff(voronoi.region_offsets)
+        )
+        finite = voronoi.regions >= 0
+        region_point = np.concatenate((region_point[finite], p1, p2))
+        region_vertex = np.concatenate(
+            (voronoi.regions[finite], far_vertex, far_vertex)
+        )
 
-                # Compute the missing endpoint of an infinite ridge
-                t = voronoi.points[p2] - voronoi.points[p1]  # tangent
-                t /= np.linalg.norm(t)
-                n = np.array([-t[1], t[0]])  # normal
+        # sort regions counterclockwise
+        amount_of_vertices = np.bincount(region_point, minlength=len(points))
+        region_center = (
+            np.column_stack(
+                (
+                    np.bincount(region_point, vertices[region_vertex, 0], len(points)),
+                    np.bincount(region_point, vertices[region_vertex, 1], len(points)),
+                )
+            )
+            / amount_of_vertices[:, None]
+        )
+        angles = np.arctan2(
+            vertices[region_vertex, 1] - region_center[region_point, 1],
+            vertices[region_vertex, 0] - region_center[region_point, 0],
+        )
+        order = np.lexsort((angles, region_point))
 
-                midpoint = voronoi.points[[p1, p2]].mean(axis=0)
-                direction = np.sign(np.dot(midpoint - center, n)) * n
-                far_point = voronoi.vertices[v2] + direction * radius
+        region_offsets = np.zeros(len(points) + 1, dtype=np.intp)
+        np.cumsum(amount_of_vertices, out=region_offsets[1:])
 
-                new_region.append(len(new_vertices))
-                new_vertices.append(far_point.tolist())
+        return region_vertex[order], region_offsets, vertices
 
-            # sort region counterclockwise
-            vs = np.asarray([new_vertices[v] for v in new_region])
-            c = vs.mean(axis=0)
-            angles = np.arctan2(vs[:, 1] - c[1], vs[:, 0] - c[0])
-            new_region = np.array(new_region)[np.argsort(angles)]
+    def _get_offsets(self, index, amount):
+        """Offsets of groups in an array sorted by group index"""
 
-            # finish
-            new_regions.append(new_region.tolist())
+        offsets = np.zeros(amount + 1, dtype=np.intp)
+        np.cumsum(np.bincount(index, minlength=amount), out=offsets[1:])
 
-        return new_regions, np.asarray(new_vertices)
+        return offsets
 
     def _get_colours(self, image, points):
         return image[
@@ -255,6 +516,264 @@ class PolygonMaker:
             :,
         ].reshape(-1, 3)
 
+    def _get_polygon_colours(
+        self, image, coordinates, offsets, mode, fallback, tile_height=None
+    ):
+        """
+        Reduce the colours of all pixels covered by each polygon at once.
+
+        All polygons are filled into a single label image, of which the
+        pixel colours are aggregated per label. With a tile height, the label
+        image is filled in strips instead; see `_get_tiled_polygon_colours`.
+        Parameters
+        ----------
+        image : ndarray
+            BGR image of which the polygons have the same dimensions.
+        coordinates : ndarray
+            Coordinates of all polygons, shape (m, 2).
+        offsets : ndarray
+            Start of each polygon in coordinates, shape (n + 1,).
+        mode : str
+            Either "mean" or "median".
+        fallback : ndarray
+            Colours for polygons that do not cover a pixel centre, shape
+            (n, 3).
+        tile_height : int, optional
+            Amount of rows of the label image strips.
+        Returns
+        -------
+        colours : ndarray
+            Colour of each polygon, shape (n, 3).
+        """
+
+        height, width = image.shape[:2]
+        amount_of_polygons = len(offsets) - 1
+
+        # Pixel centres are at whole coordinates, as for the rendered image
+        fixed_point_coordinates = np.round(
+            (np.asarray(coordinates) - 0.5) * (1 << self.fractional_bits)
+        ).astype(np.int32)
+
+        if tile_height is not None:
+            return self._get_tiled_polygon_colours(
+                image, fixed_point_coordinates, offsets, mode, fallback, tile_height
+            )
+
+        # OpenCV fills all polygons of a call with the same value, so every polygon needs a call for its own label;
+        # later polygons overwrite the pixels they share with earlier ones, which the tiled label image relies on too
+        labels = np.full((height, width), -1, dtype=np.int32)
+        for label, (start, stop) in enumerate(
+            zip(offsets[:-1].tolist(), offsets[1:].tolist())
+        ):
+            if start == stop:
+                continue
+
+            cv2.fillPoly(
+                labels,
+                [fixed_point_coordinates[start:stop]],
+                label,
+                cv2.LINE_8,
+                self.fractional_bits,
+            )
+
+        labels = labels.reshape(-1)
+        covered = labels >= 0
+        labels = labels[covered]
+        pixels = image.reshape(-1, 3)[covered]
+        amount_of_pixels = np.bincount(labels, minlength=amount_of_polygons)
+
+        colours = np.array(fallback, dtype=image.dtype)
+        has_pixels = amount_of_pixels > 0
+        if mode == "mean":
+            for channel in range(3):
+                channel_sum = np.bincount(
+                    labels, pixels[:, channel], minlength=amount_of_polygons
+                )
+                colours[has_pixels, channel] = np.round(
+                    channel_sum[has_pixels] / amount_of_pixels[has_pixels]
+                )
+
+        if mode == "median":
+            # Sort pixel values per label, and take the (lower) middle value of each label
+            starts = np.cumsum(amount_of_pixels) - amount_of_pixels
+            middle = (starts + (amount_of_pixels - 1) // 2)[has_pixels]
+            label_keys = labels.astype(np.int64) << 8
+            for channel in range(3):
+                keys = np.sort(label_keys | pixels[:, channel])
+                colours[has_pixels, channel] = keys[middle] & 0xFF
+
+        return colours
+
+    def _get_tiled_polygon_colours(
+        self, image, fixed_point_coordinates, offsets, mode, fallback, tile_height
+    ):
+        """
+        Reduce the colours of all pixels covered by each polygon, strip by strip.
+
+        Only the label image of a single strip is in memory, and only the
+        rows of the (memory-mapped) image within the strip are read. The
+        colours are identical to those of a single label image: OpenCV clips
+        polygon edges at the image border, so each polygon is filled in a
+        window around its bounding box instead, which it is never clipped by.
+        For the median, the pixels of each strip are sorted per label, as for
+        a single label image; only polygons that span several strips
+        accumulate a histogram per channel.
+        Parameters
+        ----------
+        image : ndarray
+            BGR image of which the polygons have the same dimensions.
+        fixed_point_coordinates : ndarray
+            Fixed-point coordinates of all polygons, shape (m, 2).
+        offsets : ndarray
+            Start of each polygon in coordinates, shape (n + 1,).
+        mode : str
+            Either "mean" or "median".
+        fallback : ndarray
+            Colours for polygons that do not cover a pixel centre, shape
+            (n, 3).
+        tile_height : int
+            Amount of rows of the label image strips.
+        Returns
+        -------
+        colours : ndarray
+            Colour of each polygon, shape (n, 3).
+        """
+
+        height, width = image.shape[:2]
+        amount_of_polygons = len(offsets) - 1
+
+        polygon_indices, boxes = polygon_bounding_boxes(
+            fixed_point_coordinates,
+            offsets,
+            self.fractional_bits,
+            self.polygon_margin,
+            width,
+            height,
+        )
+
+        amount_of_pixels = np.zeros(amount_of_polygons, dtype=np.int64)
+        channel_sums = np.zeros((3, amount_of_polygons))
+        colours = np.array(fallback, dtype=image.dtype)
+
+        histograms = None
+        if mode == "median":
+            # Polygons within a single strip have all their pixels in that strip; the others get a compact index
+            spanning = polygon_indices[
+                boxes[:, 1] // tile_height < (boxes[:, 3] - 1) // tile_height
+            ]
+            histogram_indices = np.full(amount_of_polygons, -1, dtype=np.int64)
+            histogram_indices[spanning] = np.arange(len(spanning))
+            histograms = np.zeros((3, len(spanning) << 8), dtype=np.uint32)
+
+        for top in range(0, height, tile_height):
+            bottom = min(top + tile_height, height)
+            overlapping = (boxes[:, 3] > top) & (boxes[:, 1] < bottom)
+
+            labels = np.full((bottom - top, width), -1, dtype=np.int32)
+            for label, box in zip(
+                polygon_indices[overlapping].tolist(), boxes[overlapping].tolist()
+            ):
+                self._fill_label_window(
+                    labels,
+                    top,
+                    box,
+                    fixed_point_coordinates[offsets[label] : offsets[label + 1]],
+                    label,
+                )
+
+            labels = labels.reshape(-1)
+            covered = labels >= 0
+            labels = labels[covered]
+            pixels = np.asarray(image[top:bottom]).reshape(-1, 3)[covered]
+            amount_of_pixels += np.bincount(labels, minlength=amount_of_polygons)
+
+            for channel in range(3):
+                if histograms is None:
+                    channel_sums[channel] += np.bincount(
+                        labels, pixels[:, channel], minlength=amount_of_polygons
+                    )
+                else:
+                    self._add_strip_medians(
+                        colours[:, channel],
+                        histograms[channel],
+                        histogram_indices,
+                        np.sort((labels.astype(np.int64) << 8) | pixels[:, channel]),
+                    )
+
+        has_pixels = amount_of_pixels > 0
+        if mode == "mean":
+            for channel in range(3):
+                colours[has_pixels, channel] = np.round(
+                    channel_sums[channel, has_pixels] / amount_of_pixels[has_pixels]
+                )
+
+        if histograms is not None:
+            # The (lower) middle value is the first value of which the cumulative count exceeds the middle index
+            spanning_has_pixels = has_pixels[spanning]
+            middle = ((amount_of_pixels[spanning] - 1) // 2)[spanning_has_pixels]
+            for channel in range(3):
+                cumulative_counts = np.cumsum(
+                    histograms[channel].reshape(len(spanning), 256)[
+                        spanning_has_pixels
+                    ],
+                    axis=1,
+                )
+                colours[spanning[spanning_has_pixels], channel] = np.sum(
+                    cumulative_counts <= middle[:, None], axis=1
+                )
+
+        return colours
+
+    def _add_strip_medians(self, colours, histogram, histogram_indices, keys):
+        """
+        Take the medians of the polygons within a strip, and count the values of the polygons that span strips.
+
+        `keys` are the sorted label and value of every labelled pixel of the
+        strip for a single channel, as `label << 8 | value`.
+        """
+
+        if len(keys) == 0:
+            return
+
+        # Runs of equal keys are the counts per value, runs of equal labels the pixels per polygon
+        key_starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        key_counts = np.diff(np.r_[key_starts, len(keys)])
+        run_keys = keys[key_starts]
+        run_histogram_indices = histogram_indices[run_keys >> 8]
+        in_histogram = run_histogram_indices >= 0
+        histogram[
+            (run_histogram_indices[in_histogram] << 8) | (run_keys[in_histogram] & 0xFF)
+        ] += key_counts[in_histogram].astype(histogram.dtype)
+
+        labels = keys >> 8
+        label_starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+        label_counts = np.diff(np.r_[label_starts, len(keys)])
+        within = histogram_indices[labels[label_starts]] < 0
+        colours[labels[label_starts[within]]] = (
+            keys[(label_starts + (label_counts - 1) // 2)[within]] & 0xFF
+        )
+
+    def _fill_label_window(self, labels, top, box, fixed_point_coordinates, label):
+        """Fill polygon in window `box` of the image, and label its pixels within the strip starting at `top`"""
+
+        left, window_top, right, window_bottom = box
+        rows = slice(max(window_top, top), min(window_bottom, top + len(labels)))
+
+        window = np.zeros((window_bottom - window_top, right - left), np.uint8)
+        cv2.fillPoly(
+            window,
+            [fixed_point_coordinates],
+            1,
+            cv2.LINE_8,
+            self.fractional_bits,
+            # Shift by whole pixels, so the polygon is rasterized exactly as in the whole image
+            (-(left << self.fractional_bits), -(window_top << self.fractional_bits)),
+        )
+
+        labels[rows.start - top : rows.stop - top, left:right][
+            window[rows.start - window_top : rows.stop - window_top] > 0
+        ] = label
+
     def _shape2_d(self, element):
         return np.reshape(element, (1, element.size))
 
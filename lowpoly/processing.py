@@ -1,20 +1,98 @@
+from collections.abc import Iterator
 from pathlib import Path
 
 import cv2
+import numpy as np
 
-from lowpoly.exception import InvalidColourImageError
+from lowpoly.exception import (
+    InvalidColourImageError,
+    InvalidImageArrayError,
+    InvalidImageError,
+)
 
 
 class ImageProcessing:
 
-    def __init__(self, image_path: Path):
-        self.user_image = self._read_image(image_path)
+    def __init__(self, image: Path | np.ndarray | bytes):
+        self.user_image = self._read_image(image)
         self.height, self.width, _ = self.user_image.shape
 
-    def _read_image(self, path: Path):
-        """Read in image"""
+    def _read_image(self, image: Path | np.ndarray | bytes):
+        """Read in image from path, encoded bytes or decoded array"""
 
-        return cv2.imread(str(path))
+        if isinstance(image, np.ndarray):
+            user_image = self._to_bgr(image)
+        elif isinstance(image, (bytes, bytearray, memoryview)):
+            user_image = cv2.imdecode(
+                np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR
+            )
+        elif Path(image).suffix.lower() == ".npy":
+            user_image = self._read_array(Path(image))
+        else:
+            user_image = cv2.imread(str(image))
+
+        if user_image is None:
+            raise InvalidImageError
+
+        return user_image
+
+    def _read_array(self, path: Path):
+        """Memory-map NumPy array, so only the parts that are used are read; BGR arrays are not copied"""
+
+        try:
+            image = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+        return self._to_bgr(image, path)
+
+    def _to_bgr(self, image, source: Path | str = "<memory>"):
+        """Convert grayscale or BGRA array to BGR, after checking that it is an 8-bit image"""
+
+        if (
+            image.dtype != np.uint8
+            or image.ndim not in (2, 3)
+            or (image.ndim == 3 and image.shape[2] not in (3, 4))
+            or 0 in image.shape
+        ):
+            raise InvalidImageArrayError(source, image.dtype, image.shape)
+
+        if image.ndim == 2:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+        if image.ndim == 3 and image.shape[2] == 4:
+            return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+
+        return image
+
+    def strips(
+        self, height: int, overlap: int = 0
+    ) -> Iterator[tuple[int, int, int, np.ndarray]]:
+        """
+        Yields horizontal strips of the image from top to bottom, which overlap the adjacent strips.
+
+        Parameters:
+            height (int): The amount of rows of each strip, without the overlap.
+            overlap (int, optional): The amount of rows to add above and below each strip.
+
+        Returns:
+            Iterator[tuple[int, int, int, ndarray]]: The first and last (exclusive) row of the strip without the
+                overlap, the first row with the overlap, and the rows of the strip with the overlap.
+        """
+
+        for top in range(0, self.height, height):
+            bottom = min(top + height, self.height)
+            overlap_top = max(top - overlap, 0)
+            overlap_bottom = min(bottom + overlap, self.height)
+
+            yield top, bottom, overlap_top, np.ascontiguousarray(
+                self.user_image[overlap_top:overlap_bottom]
+            )
+
+    def downscale(self, image, width: int, height: int):
+        """Downscale image by averaging pixels"""
+
+        return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
 
     def colour_2_grayscale(self, image, flg=cv2.COLOR_BGR2GRAY):
         """Convert colourspace to grayscale"""
@@ -0,0 +1,201 @@
+import csv
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None  # type: ignore[assignment]
+
+PROFILE_FIELDS = [
+    "file",
+    "stage",
+    "cached",
+    "wall_time",
+    "cpu_time",
+    "peak_memory",
+    "points",
+    "polygons",
+    "output_bytes",
+]
+
+
+class Profiler:
+    """
+    Records wall time, CPU time and peak memory of pipeline stages.
+
+    Stages resolve their upstream stages lazily, so stages are nested. Times are recorded exclusive of
+    nested stages. By default, the peak memory is how much the peak resident set size of the process grew during the
+    stage, including nested stages, which costs nothing to measure but is 0 for stages that stay below an earlier
+    peak. With `trace_memory`, it is the highest amount of memory traced by `tracemalloc` (which includes NumPy and
+    OpenCV arrays) during the stage, relative to the start of the stage; tracing slows down the stages, so their
+    times are not representative.
+
+    Stages may be measured in several threads at once, e.g. outputs that are written in the background; the CPU time
+    of a stage includes the CPU time of other threads in the meantime.
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.file: str | None = None
+        self.records: list[dict] = []
+        self.trace_memory = trace_memory
+        self._local = threading.local()
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def measure(
+        self,
+        stage: str,
+        function: Callable[[], Any],
+        counts: Callable[[Any], dict] | None = None,
+        cached: bool = False,
+        file: str | None = None,
+        records: list[dict] | None = None,
+    ) -> Any:
+        """
+        Run function and record its measurements.
+
+        The record is added to `records` for `file`, which default to the current records and file; stages that run
+        in the background pass those of the file they belong to.
+        """
+
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        stack: list[dict[str, float]] = self._local.stack
+
+        start_memory = self._start_memory(stack)
+        frame: dict[str, float] = {
+            "peak": start_memory,
+            "nested_wall": 0.0,
+            "nested_cpu": 0.0,
+        }
+        stack.append(frame)
+
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            result = function()
+        finally:
+            wall_time = time.perf_counter() - start_wall
+            cpu_time = time.process_time() - start_cpu
+            stack.pop()
+
+        peak_memory = self._peak_memory(stack, frame, start_memory)
+        if stack:
+            stack[-1]["nested_wall"] += wall_time
+            stack[-1]["nested_cpu"] += cpu_time
+
+        record: dict[str, Any] = dict.fromkeys(PROFILE_FIELDS)
+        record.update(
+            {
+                "file": self.file if file is None else file,
+                "stage": stage,
+                "cached": cached,
+                "wall_time": wall_time - frame["nested_wall"],
+                "cpu_time": cpu_time - frame["nested_cpu"],
+                "peak_memory": peak_memory,
+            }
+        )
+        if counts is not None:
+            record.update(counts(result))
+        (self.records if records is None else records).append(record)
+
+        return result
+
+    def _start_memory(self, stack: list[dict[str, float]]) -> int:
+        if not self.trace_memory:
+            return peak_resident_memory()
+
+        # Keep peak memory of enclosing stage, as it is reset for this stage
+        current_memory, peak_memory = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], peak_memory)
+        tracemalloc.reset_peak()
+
+        return current_memory
+
+    def _peak_memory(
+        self, stack: list[dict[str, float]], frame: dict[str, float], start_memory: int
+    ) -> int:
+        if not self.trace_memory:
+            return max(peak_resident_memory() - start_memory, 0)
+
+        stage_peak_memory = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], stage_peak_memory)
+
+        return int(stage_peak_memory - start_memory)
+
+
+def peak_resident_memory() -> int:
+    """Peak resident set size of the process in bytes, or 0 where it is not available"""
+
+    if resource is None:
+        return 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Reported in kilobytes, except on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def write_profile(records: list[dict], path: Path) -> None:
+    """
+    Writes profile records to a JSON file, or to a CSV file if the path has a `.csv` suffix.
+
+    Parameters:
+        records (list[dict]): The profile records.
+        path (Path): The path to the report file.
+    """
+
+    with open(path, "w", newline="") as file:
+        if path.suffix.lower() == ".csv":
+            writer = csv.DictWriter(file, fieldnames=PROFILE_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+            return
+
+        json.dump(records, file, indent=4)
+
+
+def summarize_profile(records: list[dict]) -> list[str]:
+    """
+    Returns a summary table of profile records per stage.
+
+    Parameters:
+        records (list[dict]): The profile records.
+
+    Returns:
+        list[str]: The lines of the summary table.
+    """
+
+    stages: dict[str, dict] = {}
+    for record in records:
+        stage = stages.setdefault(
+            record["stage"],
+            {"runs": 0, "cached": 0, "wall": 0.0, "cpu": 0.0, "peak": 0},
+        )
+        stage["runs"] += 1
+        stage["cached"] += int(record["cached"])
+        stage["wall"] += record["wall_time"]
+        stage["cpu"] += record["cpu_time"]
+        stage["peak"] = max(stage["peak"], record["peak_memory"])
+
+    lines = [
+        f"{'Stage':<12} {'Runs':>6} {'Cached':>6} {'Wall (s)':>10} {'CPU (s)':>10} {'Peak (MB)':>10}"
+    ]
+    for stage_name, stage in stages.items():
+        lines.append(
+            f"{stage_name:<12} {stage['runs']:>6} {stage['cached']:>6} {stage['wall']:>10.3f} "
+            f"{stage['cpu']:>10.3f} {stage['peak'] / 1e6:>10.1f}"
+        )
+
+    return lines
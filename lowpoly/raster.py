@@ -0,0 +1,221 @@
+import io
+from collections.abc import Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+import cv2
+import numpy as np
+
+from lowpoly.exception import InvalidTileHeightError, RasterImageError
+from lowpoly.helper import (
+    flatten_polygons,
+    get_output_scale,
+    polygon_bounding_boxes,
+)
+from lowpoly.png import PNGWriter
+
+
+class RasterMaker:
+    """
+    Fills the polygons of the output directly, either as a whole or in horizontal tiles.
+
+    OpenCV clips polygon edges at the image border, which shifts the edge pixels of clipped polygons. Therefore each
+    polygon overlapping a tile is filled in a window around its bounding box, which it is never clipped by, and
+    only the rows of the window within the tile are copied back. Tiles are identical to the rows of the whole image.
+    """
+
+    # Fractional bits of the fixed-point polygon coordinates
+    fractional_bits = 8
+
+    # Pixels around the bounding box of a polygon that its (anti-aliased) edges may cover
+    polygon_margin = 4
+
+    def __init__(
+        self,
+        user_preset: dict,
+        image_dimensions: list,
+    ):
+        self.preset = user_preset
+
+        # Same output scale as the SVG, so both outputs have equal dimensions
+        self.scale = get_output_scale(user_preset, image_dimensions)
+        self.width = int(image_dimensions[0] * self.scale)
+        self.height = int(image_dimensions[1] * self.scale)
+
+        # Anti-aliasing as CairoSVG would apply for the SVG shape rendering style
+        shape_rendering = (
+            user_preset.get("output", {})
+            .get("svg", {})
+            .get("style", {})
+            .get("shape-rendering", "geometricPrecision")
+        )
+        self.line_type = (
+            cv2.LINE_8
+            if shape_rendering in ["crispEdges", "optimizeSpeed"]
+            else cv2.LINE_AA
+        )
+
+        self.tile_height = (
+            user_preset.get("output", {}).get("png", {}).get("tile_height")
+        )
+        if self.tile_height is not None and (
+            not isinstance(self.tile_height, int)
+            or isinstance(self.tile_height, bool)
+            or self.tile_height < 1
+        ):
+            raise InvalidTileHeightError("output.png.tile_height", self.tile_height)
+
+    def render(self, polygon_output) -> np.ndarray:
+        """Fill polygons on transparent BGRA image"""
+
+        fixed_point_coordinates, offsets, colours = self._prepare(polygon_output)
+
+        image = np.zeros((self.height, self.width, 4), dtype=np.uint8)
+        self._fill(image, fixed_point_coordinates, offsets, colours)
+
+        return image
+
+    def render_tiles(self, polygon_output) -> Iterator[np.ndarray]:
+        """Fill polygons on transparent BGRA tiles of `tile_height` rows, from top to bottom"""
+
+        fixed_point_coordinates, offsets, colours = self._prepare(polygon_output)
+        tile_height = self.tile_height or self.height
+
+        polygon_indices, boxes = polygon_bounding_boxes(
+            fixed_point_coordinates,
+            offsets,
+            self.fractional_bits,
+            self.polygon_margin,
+            self.width,
+            self.height,
+        )
+
+        for top in range(0, self.height, tile_height):
+            bottom = min(top + tile_height, self.height)
+            overlapping = (boxes[:, 3] > top) & (boxes[:, 1] < bottom)
+
+            tile = np.zeros((bottom - top, self.width, 4), dtype=np.uint8)
+            for index, box in zip(
+                polygon_indices[overlapping].tolist(), boxes[overlapping].tolist()
+            ):
+                self._fill_window(
+                    tile,
+                    top,
+                    box,
+                    fixed_point_coordinates[offsets[index] : offsets[index + 1]],
+                    colours[index],
+                )
+
+            yield tile
+
+    def render_png(self, polygon_output) -> bytes:
+        if self.tile_height is not None:
+            png_file = io.BytesIO()
+            self._write_tiles(polygon_output, png_file)
+
+            return png_file.getvalue()
+
+        try:
+            encoded, png_image = cv2.imencode(".png", self.render(polygon_output))
+        except cv2.error as e:
+            raise RasterImageError(str(e))
+
+        if not encoded:
+            raise RasterImageError("could not encode PNG")
+
+        return png_image.tobytes()
+
+    def save_png(self, polygon_output, output_path: Path) -> None:
+        if self.tile_height is not None:
+            try:
+                with open(output_path, "wb") as png_file:
+                    self._write_tiles(polygon_output, png_file)
+            except OSError as e:
+                raise RasterImageError(str(e))
+
+            return
+
+        try:
+            saved = cv2.imwrite(str(output_path), self.render(polygon_output))
+        except cv2.error as e:
+            raise RasterImageError(str(e))
+
+        if not saved:
+            raise RasterImageError(f"could not write `{output_path!s}`")
+
+    def _write_tiles(self, polygon_output, png_file: BinaryIO) -> None:
+        png_writer = PNGWriter(png_file, self.width, self.height)
+        for tile in self.render_tiles(polygon_output):
+            png_writer.write_rows(cv2.cvtColor(tile, cv2.COLOR_BGRA2RGBA))
+
+        png_writer.close()
+
+    def _prepare(self, polygon_output) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        coordinates, offsets = flatten_polygons(
+            polygon_output["polygons"], polygon_output.get("offsets")
+        )
+
+        # Scale to output dimensions; OpenCV pixel centres are at whole coordinates
+        fixed_point_coordinates = np.round(
+            (coordinates * self.scale - 0.5) * (1 << self.fractional_bits)
+        ).astype(np.int32)
+
+        colours = np.clip(np.asarray(polygon_output["colours"]), 0, 255).astype(
+            np.uint8
+        )
+
+        return fixed_point_coordinates, offsets, colours
+
+    def _fill(
+        self,
+        image: np.ndarray,
+        fixed_point_coordinates: np.ndarray,
+        offsets: np.ndarray,
+        colours: np.ndarray,
+    ) -> None:
+        for start, stop, colour in zip(
+            offsets[:-1].tolist(), offsets[1:].tolist(), colours.tolist()
+        ):
+            if start == stop:
+                continue
+
+            cv2.fillPoly(
+                image,
+                [fixed_point_coordinates[start:stop]],
+                (*colour, 255),
+                self.line_type,
+                self.fractional_bits,
+            )
+
+    def _fill_window(
+        self,
+        tile: np.ndarray,
+        top: int,
+        box: list,
+        fixed_point_coordinates: np.ndarray,
+        colour: np.ndarray,
+    ) -> None:
+        """Fill polygon in window `box` of the image, and copy the window rows within the tile starting at `top`"""
+
+        left, window_top, right, window_bottom = box
+        rows = slice(max(window_top, top), min(window_bottom, top + len(tile)))
+
+        # Anti-aliased edges are blended with the pixels below them
+        window = np.zeros((window_bottom - window_top, right - left, 4), np.uint8)
+        window[rows.start - window_top : rows.stop - window_top] = tile[
+            rows.start - top : rows.stop - top, left:right
+        ]
+
+        cv2.fillPoly(
+            window,
+            [fixed_point_coordinates],
+            (*colour.tolist(), 255),
+            self.line_type,
+            self.fractional_bits,
+            # Shift by whole pixels, so the polygon is rasterized exactly as in the whole image
+            (-(left << self.fractional_bits), -(window_top << self.fractional_bits)),
+        )
+
+        tile[rows.start - top : rows.stop - top, left:right] = window[
+            rows.start - window_top : rows.stop - window_top
+        ]
@@ -0,0 +1,199 @@
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+
+from lowpoly.helper import VIDEO_SUFFIXES
+from lowpoly.processing import ImageProcessing
+
+
+def read_frames(file_path: Path) -> Iterator[tuple[Path, ImageProcessing | None]]:
+    """
+    Yields the frames of a video, or the image itself for other files.
+
+    Parameters:
+        file_path (Path): The path to the video or image.
+
+    Returns:
+        Iterator[tuple[Path, ImageProcessing | None]]: The path of each frame, of which the name is numbered for videos,
+            and the decoded frame. Images, and videos that cannot be opened, are yielded as is without decoded frame, to
+            be decoded (or fail) as any other input file.
+    """
+
+    if file_path.suffix.lower() not in VIDEO_SUFFIXES:
+        yield file_path, None
+        return
+
+    capture = cv2.VideoCapture(str(file_path))
+    if not capture.isOpened():
+        yield file_path, None
+        return
+
+    try:
+        frame_number = 0
+        while True:
+            read, frame = capture.read()
+            if not read:
+                break
+
+            yield file_path.with_name(
+                f"{file_path.stem}_{frame_number:06d}{file_path.suffix}"
+            ), ImageProcessing(frame)
+            frame_number += 1
+    finally:
+        capture.release()
+
+
+class SequencePoints:
+    """
+    Points and triangulation of a sequence of frames, reused from the previous frame where the edges did not change.
+
+    Frames are divided into square cells. Cells of which the fraction of edge pixels changed by more than `threshold`
+    since the cell was last sampled are sampled again: the new points are added to the Delaunay triangulation
+    incrementally, and the previous points of the cell become stale. As Qhull cannot remove points, stale points stay
+    in the triangulation until their fraction exceeds `rebuild`; then the triangulation is built again from the current
+    points. Unchanged cells keep their points, so they do not flicker, and the work per frame follows the motion.
+    """
+
+    def __init__(self, preset: dict):
+        preset_sequence = preset.get("sequence", {})
+        self.cell_size = preset_sequence.get("cell_size", 32)
+        self.threshold = preset_sequence.get("threshold", 0.02)
+        self.rebuild_fraction = preset_sequence.get("rebuild", 0.25)
+
+        self.generator = np.random.default_rng(seed=preset.get("seed", None))
+        self.triangulation: Any = None
+        self.dimensions: list = []
+
+        # Whether each point of the triangulation is current, and the edge density per cell when it was last sampled
+        self.current = np.zeros(0, dtype=bool)
+        self.edge_density = np.zeros((0, 0))
+
+    def points(self, pipeline, file_path: Path, preset: dict) -> np.ndarray:
+        """Update points for the frame, and return all points of the triangulation, including stale points"""
+
+        threshold = pipeline.threshold(file_path, preset)
+        dimensions = pipeline.dimensions(file_path)
+        edge_density = self._edge_density(threshold)
+
+        if self.triangulation is None or dimensions != self.dimensions:
+            self.dimensions = dimensions
+            self.edge_density = edge_density
+            self._rebuild(
+                self._sample(
+                    pipeline,
+                    file_path,
+                    preset,
+                    threshold,
+                    np.ones(edge_density.shape, dtype=bool),
+                )
+            )
+
+            return self.triangulation.points.astype(np.int64)
+
+        changed = np.abs(edge_density - self.edge_density) > self.threshold
+        if not changed.any():
+            return self.triangulation.points.astype(np.int64)
+
+        self.edge_density[changed] = edge_density[changed]
+
+        # Points of changed cells become stale, except the corners, which keep the whole frame covered
+        points = self.triangulation.points.astype(np.int64)
+        corners = np.isin(points[:, 0], [0, dimensions[0] - 1]) & np.isin(
+            points[:, 1], [0, dimensions[1] - 1]
+        )
+        self.current[self._in_cells(points, changed, threshold.shape) & ~corners] = (
+            False
+        )
+
+        new_points = self._sample(pipeline, file_path, preset, threshold, changed)
+        new_points = new_points[
+            ~np.isin(
+                new_points[:, 0] * dimensions[1] + new_points[:, 1],
+                points[:, 0] * dimensions[1] + points[:, 1],
+            )
+        ]
+
+        stale = np.count_nonzero(~self.current)
+        if stale > self.rebuild_fraction * (len(self.current) + len(new_points)):
+            self._rebuild(np.concatenate([points[self.current], new_points]))
+        elif len(new_points):
+            self.triangulation.add_points(new_points)
+            self.current = np.concatenate(
+                [self.current, np.ones(len(new_points), dtype=bool)]
+            )
+
+        return self.triangulation.points.astype(np.int64)
+
+    def _sample(
+        self,
+        pipeline,
+        file_path: Path,
+        preset: dict,
+        threshold: np.ndarray,
+        changed: np.ndarray,
+    ) -> np.ndarray:
+        """Sample edge, random and corner points within the changed cells, as for a single image"""
+
+        image_width, image_height = pipeline.dimensions(file_path)
+
+        edge_points = pipeline.polygon_maker.sample_edge_points(
+            np.where(self._cell_mask(changed, threshold.shape), threshold, 0),
+            pipeline.edges_reduction_factor(file_path, preset),
+            self.generator,
+        )
+        edge_points = pipeline.polygon_maker.scale_points(
+            edge_points, threshold.shape[::-1], [image_width, image_height]
+        )
+
+        points = pipeline.polygon_maker.complete_points(
+            edge_points,
+            image_width,
+            image_height,
+            pipeline.middle_addition_factor(preset),
+            self.generator,
+        )
+
+        return points[self._in_cells(points, changed, threshold.shape)]
+
+    def _rebuild(self, points: np.ndarray) -> None:
+        from scipy.spatial import Delaunay  # type: ignore[import-untyped]
+
+        self.triangulation = Delaunay(points, incremental=True)
+        self.current = np.ones(len(points), dtype=bool)
+
+    def _edge_density(self, threshold: np.ndarray) -> np.ndarray:
+        """Fraction of edge pixels per cell"""
+
+        height, width = threshold.shape
+        rows = np.arange(0, height, self.cell_size)
+        columns = np.arange(0, width, self.cell_size)
+        edge_pixels = np.add.reduceat(
+            np.add.reduceat(threshold > 0, rows, axis=0, dtype=np.int64),
+            columns,
+            axis=1,
+        )
+        cell_pixels = np.outer(
+            np.diff(rows, append=height), np.diff(columns, append=width)
+        )
+
+        return edge_pixels / cell_pixels
+
+    def _cell_mask(self, cells: np.ndarray, shape: tuple) -> np.ndarray:
+        """Cells per pixel of the edge image"""
+
+        return np.repeat(
+            np.repeat(cells, self.cell_size, axis=0), self.cell_size, axis=1
+        )[: shape[0], : shape[1]]
+
+    def _in_cells(self, points: np.ndarray, cells: np.ndarray, shape: tuple):
+        """Whether points of the frame are within the cells of the edge image, which may be downscaled"""
+
+        scale = np.asarray(shape[::-1]) / np.asarray(self.dimensions)
+        cell_indices = np.minimum(
+            (points * scale).astype(np.int64), np.asarray(shape[::-1]) - 1
+        ) // (self.cell_size)
+
+        return cells[cell_indices[:, 1], cell_indices[:, 0]]
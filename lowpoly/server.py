@@ -0,0 +1,416 @@
+import http.server
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Callable
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from loguru import logger
+
+from lowpoly.exception import (
+    InvalidAnalysisResolutionError,
+    InvalidColourImageError,
+    InvalidColourModeError,
+    InvalidImageError,
+    InvalidRasterBackendError,
+    InvalidSvgPrecisionError,
+    InvalidTileHeightError,
+)
+
+POLYGON_TYPES = ["delaunay", "voronoi"]
+
+CONTENT_TYPES = {"svg": "image/svg+xml", "png": "image/png"}
+
+# Errors caused by the uploaded image or the preset, rather than by the server
+INVALID_REQUEST_ERRORS = (
+    InvalidAnalysisResolutionError,
+    InvalidColourImageError,
+    InvalidColourModeError,
+    InvalidImageError,
+    InvalidRasterBackendError,
+    InvalidSvgPrecisionError,
+    InvalidTileHeightError,
+)
+
+
+def warm_up() -> None:
+    """Imports the heavy dependencies once per worker process, before the first request arrives"""
+
+    import scipy.spatial  # type: ignore[import-untyped] # noqa: F401
+    import shapely  # type: ignore[import-untyped] # noqa: F401
+
+    import lowpoly.api  # noqa: F401
+
+
+def render_image(
+    image: bytes, preset: dict, polygon_type: str, output_format: str
+) -> dict:
+    """
+    Converts an encoded image in a worker process, and captures its failure instead of raising it.
+
+    Parameters:
+        image (bytes): The bytes of an encoded image (e.g. JPEG or PNG).
+        preset (dict): The preset options.
+        polygon_type (str): Either `delaunay` or `voronoi`.
+        output_format (str): Either `svg` or `png`.
+
+    Returns:
+        dict: The output as bytes, and the error message and whether the request was invalid if the conversion failed.
+    """
+
+    from lowpoly.api import MEMORY_SOURCE
+    from lowpoly.helper import get_svg_precision
+    from lowpoly.pipeline import CONVERSION_ERRORS, Pipeline
+    from lowpoly.processing import ImageProcessing
+
+    try:
+        pipeline = Pipeline()
+        pipeline.provide_image(MEMORY_SOURCE, ImageProcessing(image))
+
+        # Fail on an invalid backend, colour mode or precision before doing any work
+        if output_format == "png":
+            pipeline.png_backend(preset)
+        pipeline.colour_mode(preset)
+        get_svg_precision(preset)
+
+        return {
+            "output": pipeline.encode(
+                MEMORY_SOURCE, preset, polygon_type, output_format
+            ),
+            "error": None,
+            "invalid": False,
+        }
+    except INVALID_REQUEST_ERRORS as e:
+        return {"output": None, "error": str(e), "invalid": True}
+    except CONVERSION_ERRORS as e:
+        return {
+            "output": None,
+            "error": "".join(traceback.format_exception(e)),
+            "invalid": False,
+        }
+
+
+class ServerMetrics:
+    """Counters of the requests of a server, in the Prometheus text format"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.responses: dict[int, int] = {}
+        self.conversions = 0
+        self.conversion_seconds = 0.0
+
+    def record(self, status: int, conversion_seconds: float | None = None) -> None:
+        with self.lock:
+            self.responses[status] = self.responses.get(status, 0) + 1
+            if conversion_seconds is not None:
+                self.conversions += 1
+                self.conversion_seconds += conversion_seconds
+
+    def render(self, gauges: dict[str, int]) -> str:
+        with self.lock:
+            lines = [
+                "# TYPE lowpoly_responses_total counter",
+                *(
+                    f'lowpoly_responses_total{{status="{status}"}} {amount}'
+                    for status, amount in sorted(self.responses.items())
+                ),
+                "# TYPE lowpoly_conversion_seconds summary",
+                f"lowpoly_conversion_seconds_sum {self.conversion_seconds:.6f}",
+                f"lowpoly_conversion_seconds_count {self.conversions}",
+            ]
+
+        for name, value in gauges.items():
+            lines += [f"# TYPE lowpoly_{name} gauge", f"lowpoly_{name} {value}"]
+
+        return "\n".join(lines) + "\n"
+
+
+class RenderServer:
+    """
+    Serves conversions over HTTP or a Unix socket from a pool of warm worker processes.
+
+    The worker processes are started and import the heavy dependencies before the server accepts requests, and
+    presets are read once, so requests only pay for the conversion itself. Requests are admitted while fewer than
+    `workers + queue_size` conversions are running or waiting; other requests are rejected with 503 right away, so
+    clients back off instead of piling up. Conversions that take longer than `timeout` are answered with 504, but keep
+    their slot until the worker is done, so the amount of work stays bounded.
+
+    Endpoints:
+        POST /convert: Converts the image in the request body. Query parameters `preset` (name of the preset file
+            without suffix; defaults to the first preset), `type` (defaults to the first type of the preset) and
+            `format` (`svg` or `png`; defaults to `svg`).
+        GET /health: Status of the server as JSON.
+        GET /metrics: Response counters, conversion time and capacity in the Prometheus text format.
+    """
+
+    def __init__(
+        self,
+        presets: dict[str, dict],
+        workers: int = 1,
+        queue_size: int = 8,
+        timeout: float = 60.0,
+        max_request_size: int = 50 * 1024 * 1024,
+    ):
+        self.presets = presets
+        self.default_preset = next(iter(presets))
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.timeout = timeout
+        self.max_request_size = max_request_size
+
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self.in_progress = 0
+        self.metrics = ServerMetrics()
+        self.counter_lock = threading.Lock()
+        self.pool_lock = threading.Lock()
+        self.executor = self._start_pool()
+
+    def serve(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        socket_path: Path | None = None,
+    ) -> None:
+        """Serve requests until interrupted"""
+
+        http_server, address = self._bind(host, port, socket_path)
+
+        # Stop as on an interrupt when stopped by e.g. Docker
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        logger.info(
+            f"LowPoly server listening on `{address}` with {self.workers} worker(s)."
+        )
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            http_server.server_close()
+            if socket_path is not None:
+                socket_path.unlink(missing_ok=True)
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            logger.info("LowPoly server stopped.")
+
+    def _bind(
+        self, host: str, port: int, socket_path: Path | None
+    ) -> tuple[socketserver.BaseServer, str]:
+        """Create the HTTP server on the address or Unix socket, and return it with its address"""
+
+        if socket_path is not None:
+            # Replace the socket of an earlier server, but never another kind of file
+            if socket_path.exists() and stat.S_ISSOCK(socket_path.stat().st_mode):
+                socket_path.unlink()
+            return (
+                ThreadingUnixHTTPServer(str(socket_path), self._handler()),
+                f"unix:{socket_path}",
+            )
+
+        http_server = http.server.ThreadingHTTPServer((host, port), self._handler())
+
+        return http_server, "http://{}:{}".format(*http_server.server_address[:2])
+
+    def convert(self, image: bytes, query: dict) -> tuple[int, str, bytes]:
+        """Convert image for request; returns the status, content type and body of the response"""
+
+        preset_name = query.get("preset", self.default_preset)
+        if preset_name not in self.presets:
+            return self._error(404, f"Unknown preset `{preset_name}`.")
+
+        preset = self.presets[preset_name]
+        polygon_type = query.get("type", preset.get("type", ["voronoi"])[0])
+        output_format = query.get("format", "svg")
+        if polygon_type not in POLYGON_TYPES:
+            return self._error(400, f"Invalid type `{polygon_type}`.")
+        if output_format not in CONTENT_TYPES:
+            return self._error(400, f"Invalid format `{output_format}`.")
+
+        if not self.slots.acquire(blocking=False):
+            return self._error(503, "Too many requests.")
+
+        start = time.perf_counter()
+        try:
+            executor, future = self._submit(
+                render_image, image, preset, polygon_type, output_format
+            )
+        except BaseException:
+            self.slots.release()
+            raise
+
+        with self.counter_lock:
+            self.in_progress += 1
+        future.add_done_callback(self._release)
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            return self._error(504, f"Conversion took longer than {self.timeout}s.")
+        except BrokenProcessPool:
+            # Only the first request of the broken pool restarts it; other requests find it replaced already
+            self._restart_pool(executor)
+            return self._error(500, "Worker process stopped unexpectedly.")
+        except CancelledError:
+            # Cancelled as the server stops
+            return self._error(503, "Server is stopping.")
+
+        if result["error"] is not None:
+            if result["invalid"]:
+                return self._error(400, result["error"])
+
+            logger.error(result["error"])
+            return self._error(500, "Conversion failed.")
+
+        self.metrics.record(200, time.perf_counter() - start)
+
+        return 200, CONTENT_TYPES[output_format], result["output"]
+
+    def health(self) -> tuple[int, str, bytes]:
+        return self._json(
+            200,
+            {
+                "status": "ok",
+                "workers": self.workers,
+                "in_progress": self.in_progress,
+                "capacity": self.capacity,
+            },
+        )
+
+    def render_metrics(self) -> tuple[int, str, bytes]:
+        return (
+            200,
+            "text/plain; version=0.0.4",
+            self.metrics.render(
+                {
+                    "workers": self.workers,
+                    "capacity": self.capacity,
+                    "in_progress": self.in_progress,
+                }
+            ).encode("utf-8"),
+        )
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up)
+
+        # Start all workers and wait for their imports, so the first requests do not pay for them
+        for future in [executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+        return executor
+
+    def _submit(self, function: Callable, *args) -> tuple[ProcessPoolExecutor, Future]:
+        """Submit to the current pool; returns the pool as well, to restart only that pool if it breaks"""
+
+        with self.pool_lock:
+            executor = self.executor
+
+        try:
+            return executor, executor.submit(function, *args)
+        except BrokenProcessPool:
+            executor = self._restart_pool(executor)
+            return executor, executor.submit(function, *args)
+
+    def _restart_pool(
+        self, broken_executor: ProcessPoolExecutor
+    ) -> ProcessPoolExecutor:
+        """Replace a pool of which a worker process stopped, e.g. when it ran out of memory, unless it was replaced"""
+
+        with self.pool_lock:
+            if self.executor is broken_executor:
+                logger.warning("Restarting LowPoly worker processes.")
+                # All futures of a broken pool have failed already, so there is nothing left to cancel
+                broken_executor.shutdown(wait=False)
+                self.executor = self._start_pool()
+
+            return self.executor
+
+    def _release(self, _: Future) -> None:
+        with self.counter_lock:
+            self.in_progress -= 1
+        self.slots.release()
+
+    def _error(self, status: int, message: str) -> tuple[int, str, bytes]:
+        return self._json(status, {"error": message})
+
+    def _json(self, status: int, data: dict) -> tuple[int, str, bytes]:
+        return status, "application/json", json.dumps(data).encode("utf-8")
+
+    def _handler(self) -> type[http.server.BaseHTTPRequestHandler]:
+        render_server = self
+
+        class RequestHandler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                if path == "/health":
+                    self._respond(*render_server.health())
+                elif path == "/metrics":
+                    self._respond(*render_server.render_metrics())
+                else:
+                    self._respond(*render_server._error(404, "Not found."))
+
+            def do_POST(self):
+                url = urlsplit(self.path)
+                if url.path != "/convert":
+                    self._respond(*render_server._error(404, "Not found."))
+                    return
+
+                content_length = self.headers.get("Content-Length")
+                if content_length is None or not content_length.isdigit():
+                    self._respond(*render_server._error(411, "Length required."))
+                    return
+
+                if int(content_length) > render_server.max_request_size:
+                    self.close_connection = True
+                    self._respond(*render_server._error(413, "Image too large."))
+                    return
+
+                image = self.rfile.read(int(content_length))
+                query = {
+                    name: values[-1] for name, values in parse_qs(url.query).items()
+                }
+                self._respond(*render_server.convert(image, query))
+
+            def _respond(self, status: int, content_type: str, body: bytes) -> None:
+                if status != 200:
+                    render_server.metrics.record(status)
+
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if status == 503:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def address_string(self):
+                # Clients of Unix sockets have no address
+                return self.client_address[0] if self.client_address else "unix"
+
+            def log_message(self, format, *args):
+                logger.info(f"{self.address_string()} - {format % args}")
+
+        return RequestHandler
+
+
+class ThreadingUnixHTTPServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        # Used in the environment of CGI handlers by the base class of HTTP servers
+        self.server_name = socket.gethostname()
+        self.server_port = 0
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import re
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+from lowpoly.exception import ShardManifestError
+
+# Name of the combined manifest of all shards, written by `lowpoly merge`
+MERGED_FILE_NAME = ".lowpoly-shards.json"
+
+
+def shard_of(relative_path: str, count: int) -> int:
+    """
+    Returns the shard of an input file, from 1 to `count`.
+
+    The shard follows from a hash of the path relative to the input directory, so every machine assigns the same
+    files to the same shard, regardless of where the input tree is mounted, and shards are balanced for large trees.
+
+    Parameters:
+        relative_path (str): The path of the input file relative to the given input directory, with `/` separators.
+        count (int): The amount of shards.
+
+    Returns:
+        int: The shard of the input file.
+    """
+
+    digest = hashlib.sha256(relative_path.encode("utf-8")).digest()
+
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def relative_input_path(file_path: Path, given: str) -> str:
+    """Path of an input file relative to the given input directory, or its name if the file itself was given"""
+
+    if file_path == Path(given):
+        return file_path.name
+
+    return file_path.relative_to(given).as_posix()
+
+
+class ShardManifest:
+    """
+    Record of the results of one shard of the inputs converted to an output directory.
+
+    Every entry records the status (`converted`, `skipped` or `failed`), conversion time and outputs of an input of
+    the shard, per batch, as the same input may be converted to the same output directory in several batches (e.g.
+    with different presets). The files of all shards are counted per batch while the input directories are walked, so
+    merging the manifests of all shards can tell which shards are missing results, even when the manifest of a shard
+    was never written.
+    """
+
+    file_name = ".lowpoly-shard-{index}-of-{count}.json"
+    file_pattern = re.compile(r"^\.lowpoly-shard-(\d+)-of-(\d+)\.json$")
+
+    def __init__(self, directory: Path, index: int, count: int):
+        self.path = Path(directory).joinpath(
+            self.file_name.format(index=index, count=count)
+        )
+        self.index = index
+        self.count = count
+        self.items: dict[str, dict[str, dict]] = {}
+        self.counts: dict[str, list[int]] = {}
+        self.started = time.time()
+        self.complete = False
+
+    def assign(self, batch: int, relative_path: str) -> bool:
+        """Count an input file of a batch, and return whether it belongs to this shard"""
+
+        shard = shard_of(relative_path, self.count)
+        self.counts.setdefault(str(batch), [0] * self.count)[shard - 1] += 1
+
+        return shard == self.index
+
+    def record(
+        self, batch: int, relative_path: str, file_path: Path, result: dict | None
+    ) -> None:
+        """Record the result of a converted input, or None for an input that was skipped as up to date"""
+
+        items = self.items.setdefault(str(batch), {})
+        if result is None:
+            items[relative_path] = {
+                "input": str(file_path),
+                "status": "skipped",
+                "seconds": 0.0,
+                "outputs": [],
+                "error": None,
+            }
+            return
+
+        items[relative_path] = {
+            "input": str(file_path),
+            "status": "failed" if result.get("error") is not None else "converted",
+            "seconds": round(result.get("seconds", 0.0), 6),
+            "outputs": [str(output) for output in result["outputs"]],
+            "error": result.get("error"),
+        }
+
+    def save(self, complete: bool = False) -> None:
+        """Write the manifest without leaving a partial file behind; counts are only final for a complete shard"""
+
+        self.complete = complete
+        data = {
+            "version": 1,
+            "index": self.index,
+            "count": self.count,
+            "host": socket.gethostname(),
+            "started": self.started,
+            "finished": time.time(),
+            "complete": self.complete,
+            "counts": self.counts if self.complete else None,
+            "items": self.items,
+        }
+
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.path.parent, prefix=".tmp-", suffix=".json"
+        )
+        try:
+            with os.fdopen(file_descriptor, "w") as file:
+                json.dump(data, file)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            Path(temporary_path).unlink(missing_ok=True)
+            raise
+
+
+def merge_shard_manifests(directory: Path) -> dict:
+    """
+    Combines the shard manifests of an output directory.
+
+    Parameters:
+        directory (Path): The output directory with the manifests of the shards.
+
+    Returns:
+        dict: The combined manifest, with the keys:
+            - `count` (int): The amount of shards.
+            - `shards` (dict): Per shard, the host, whether it completed, the amount of expected items if known, the
+              amount of items with a result and their total conversion time in seconds.
+            - `missing_shards` (list[int]): Shards without manifest.
+            - `incomplete_shards` (list[int]): Shards that stopped before all their inputs were converted.
+            - `missing` (int | None): Amount of inputs without result, if known from a complete shard.
+            - `failed` (list[dict]): The batch, relative path and error of every failed input.
+            - `items` (dict): The entries of all shards per batch and relative path, with the shard of each entry.
+    """
+
+    manifests: dict[int, dict] = {}
+    counts = set()
+    for path in sorted(Path(directory).iterdir()):
+        if ShardManifest.file_pattern.match(path.name) is None:
+            continue
+
+        try:
+            with path.open("r") as file:
+                data = json.load(file)
+        except ValueError:
+            raise ShardManifestError(path, "not valid JSON")
+
+        if data.get("version") != 1:
+            raise ShardManifestError(path, "unsupported version")
+
+        manifests[data["index"]] = data
+        counts.add(data["count"])
+
+    if not manifests:
+        raise ShardManifestError(directory, "no shard manifests found")
+
+    if len(counts) > 1:
+        raise ShardManifestError(
+            directory,
+            f"manifests of different amounts of shards ({', '.join(map(str, sorted(counts)))})",
+        )
+
+    count = counts.pop()
+
+    # Every complete shard counted the files of all shards; they agree if all shards walked the same input tree
+    expected = next(
+        (data["counts"] for data in manifests.values() if data["complete"]), None
+    )
+
+    shards = {}
+    items: dict[str, dict[str, dict]] = {}
+    missing = 0
+    for index in range(1, count + 1):
+        data = manifests.get(index, {})
+        shard_items = data.get("items", {})
+        shards[index] = {
+            "host": data.get("host"),
+            "complete": data.get("complete", False),
+            "expected": (
+                sum(batch_counts[index - 1] for batch_counts in expected.values())
+                if expected is not None
+                else None
+            ),
+            "items": sum(len(batch_items) for batch_items in shard_items.values()),
+            "seconds": round(
+                sum(
+                    item["seconds"]
+                    for batch_items in shard_items.values()
+                    for item in batch_items.values()
+                ),
+                6,
+            ),
+        }
+
+        for batch, batch_items in shard_items.items():
+            for relative_path, item in batch_items.items():
+                items.setdefault(batch, {})[relative_path] = {**item, "shard": index}
+
+        # Compare per batch, so results of one batch do not make up for missing results of another
+        if expected is not None:
+            missing += sum(
+                max(batch_counts[index - 1] - len(shard_items.get(batch, {})), 0)
+                for batch, batch_counts in expected.items()
+            )
+
+    return {
+        "count": count,
+        "shards": shards,
+        "missing_shards": [index for index in shards if index not in manifests],
+        "incomplete_shards": [
+            index
+            for index, shard in shards.items()
+            if index in manifests and not shard["complete"]
+        ],
+        "missing": missing if expected is not None else None,
+        "failed": [
+            {"batch": int(batch), "path": relative_path, "error": item["error"]}
+            for batch, batch_items in items.items()
+            for relative_path, item in batch_items.items()
+            if item["status"] == "failed"
+        ],
+        "items": items,
+    }
@@ -0,0 +1,103 @@
+import json
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from lowpoly.cache import StageCache
+from lowpoly.profiler import Profiler
+
+
+class StageGraph:
+    """
+    Memoises the results of pipeline stages.
+
+    Every stage result is keyed by the stage name and the parameters it depends on, including the
+    parameters of its upstream stages, so each stage runs only once per unique key. Results of
+    persistent stages are also stored in the optional on-disk cache, to be reused by later runs.
+    """
+
+    def __init__(
+        self, cache: StageCache | None = None, profiler: Profiler | None = None
+    ):
+        self.cache = cache
+        self.profiler = profiler
+        self.results: dict[tuple[str, str], Any] = {}
+
+    def run(
+        self,
+        stage: str,
+        key: Any,
+        function: Callable[[], Any],
+        persistent: bool = False,
+        counts: Callable[[Any], dict] | None = None,
+    ) -> Any:
+        """
+        Run stage or return the result of an earlier run with the same key.
+
+        The stage function takes no arguments and resolves its upstream stages itself, so upstream
+        stages only run when the result of this stage is not available yet. The optional counts
+        function returns the amounts (e.g. points) to add to the profile of this stage.
+        """
+
+        stage_key = (stage, self.key(key))
+        if stage_key in self.results:
+            return self.results[stage_key]
+
+        cache = self.cache if persistent else None
+        cached_arrays = None
+        if cache is not None:
+            cache_key = cache.key(stage, key)
+            cached_arrays = cache.load(cache_key)
+
+        if cached_arrays is not None:
+            result = self._measure(
+                stage, lambda: self._from_arrays(cached_arrays), None, True
+            )
+        else:
+            result = self._measure(stage, function, counts, False)
+            if cache is not None:
+                cache.store(cache_key, self._to_arrays(result))
+
+        self.results[stage_key] = result
+
+        return result
+
+    def provide(self, stage: str, key: Any, result: Any) -> None:
+        """Provide result of stage that was computed outside of the graph"""
+
+        self.results[(stage, self.key(key))] = result
+
+    def key(self, key: Any) -> str:
+        """Serialize key parameters"""
+
+        return json.dumps(key, sort_keys=True, default=str)
+
+    def clear(self) -> None:
+        self.results.clear()
+
+    def _measure(
+        self,
+        stage: str,
+        function: Callable[[], Any],
+        counts: Callable[[Any], dict] | None,
+        cached: bool,
+    ) -> Any:
+        if self.profiler is None:
+            return function()
+
+        return self.profiler.measure(stage, function, counts, cached)
+
+    def _to_arrays(self, result) -> dict[str, np.ndarray]:
+        """Persistent stage results are either an array or a dictionary of arrays"""
+
+        if isinstance(result, dict):
+            return result
+
+        return {"array": result}
+
+    def _from_arrays(self, arrays: dict[str, np.ndarray]):
+        if list(arrays) == ["array"]:
+            return arrays["array"]
+
+        return arrays
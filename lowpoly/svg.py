@@ -3,10 +3,10 @@ import datetime
 import json
 from pathlib import Path
 
-from cairocffi import CairoError  # type: ignore[import-untyped]
-from cairosvg import svg2png  # type: ignore[import-untyped]
+import numpy as np
 
 from lowpoly.exception import InvalidViewBoxError, SvgToPngImageError
+from lowpoly.helper import flatten_polygons, get_output_scale, get_svg_precision
 
 
 def _get_formatted_datetime():
@@ -23,6 +23,10 @@ class SVGmaker:
 
     svg_description = "Rendered with LowPoly | https://github.com/ToshY/lowpoly"
 
+    polygon_chunk_size = 5000
+
+    write_buffer_size = 1024 * 1024
+
     def __init__(
         self,
         user_preset: dict,
@@ -34,26 +38,13 @@ class SVGmaker:
             json.dumps(self.preset).encode("utf-8")
         ).decode("utf-8")
 
+        # Amount of decimals for polygon coordinates; None keeps the coordinates as is
+        self.precision = get_svg_precision(user_preset)
+
         # Initial image dimensions
         self.width, self.height = image_dimensions
 
-        # The "resolution" denotes max pixels the width OR height of output image can be and the scale
-        # for both width and height will be calculated and applied based on this setting.
-        self.scale = user_preset.get("output", {}).get("resolution", 1)
-        if self.scale != 1:
-            self.scale = self.scale / max(image_dimensions)
-
-        # Check scale does not exceed constraint and solve if needed
-        user_mega_pixel_constraint = user_preset.get("output", {}).get(
-            "mega_pixel_constraint", None
-        )
-        if user_mega_pixel_constraint is not None:
-            mega_pixel_constraint = ((self.width * self.height) * self.scale**2) / 1e6
-            if mega_pixel_constraint >= user_mega_pixel_constraint:
-                self.scale = (
-                    (round(user_mega_pixel_constraint) * 1e6)
-                    / (self.width * self.height)
-                ) ** (1 / 2)
+        self.scale = get_output_scale(user_preset, image_dimensions)
 
         # Viewbox
         self.view_box = self._check_viewbox_dimensions(image_view_box)
@@ -68,6 +59,9 @@ class SVGmaker:
     def xml_initialise(
         self,
     ) -> str:
+        return self.xml_header() + self.poly_placeholder + self.xml_footer()
+
+    def xml_header(self) -> str:
         xml_string = '<?xml version="1.0" encoding="UTF-8"?>\r\n'
         xml_string += '<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">\r\n'
         xml_string += (
@@ -93,8 +87,11 @@ class SVGmaker:
             .get("shape-rendering", "geometricPrecision")
             + ';">\r\n'
         )
-        xml_string += self.poly_placeholder
-        xml_string += "</g>\r\n"
+
+        return xml_string
+
+    def xml_footer(self) -> str:
+        xml_string = "</g>\r\n"
         xml_string += (
             "<desc>"
             + self.svg_description
@@ -108,44 +105,73 @@ class SVGmaker:
 
         return xml_string
 
-    def xml_polygon_points(self, polygon, colours):
+    def xml_polygon_points(self, polygon, colours, offsets=None):
         """Create polygon segments"""
 
-        # Loop over points and format to svg polygon
-        xml_polygon_string = ""
-        for idx, (polygon_element, colour_element) in enumerate(zip(polygon, colours)):
-            joined_svg_polygon_points = ""
-            for p in polygon_element:
-                joined_svg_polygon_points = " ".join(
-                    [joined_svg_polygon_points, ",".join(str(e) for e in p)]
-                )
+        return "".join(self.xml_polygon_chunks(polygon, colours, offsets))
+
+    def xml_polygon_chunks(self, polygon, colours, offsets=None, chunk_size=None):
+        """Create polygon segments in chunks of polygons"""
 
-            # Strip leading whitespace
-            joined_svg_polygon_points = joined_svg_polygon_points.strip()
+        if chunk_size is None:
+            chunk_size = self.polygon_chunk_size
 
-            # Get HEX colours
-            polygon_hexadecimal_colours = self.rgb_to_hexadecimal_notation(
-                colour_element[2], colour_element[1], colour_element[0]
+        coordinates, offsets = flatten_polygons(polygon, offsets)
+        coordinates = self._round_coordinates(coordinates)
+
+        # Clip to RGB boundaries and reorder BGR to RGB for the HEX colours
+        colours = np.clip(np.asarray(colours), 0, 255).astype(np.uint8)[:, ::-1]
+
+        amount_of_polygons = offsets.size - 1
+        for chunk_start in range(0, amount_of_polygons, chunk_size):
+            chunk_stop = min(chunk_start + chunk_size, amount_of_polygons)
+            yield self._xml_polygon_chunk(
+                coordinates,
+                offsets[chunk_start : chunk_stop + 1],
+                colours[chunk_start:chunk_stop],
             )
-            # Append
-            xml_polygon_string += (
+
+    def _xml_polygon_chunk(self, coordinates, offsets, colours):
+        """Create polygon segments for a single chunk"""
+
+        # Format all polygons with the same amount of points in one go
+        amount_of_points = np.diff(offsets)
+        xml_polygons = [""] * amount_of_points.size
+        for points in np.unique(amount_of_points).tolist():
+            selection = np.flatnonzero(amount_of_points == points)
+            points_index = offsets[selection][:, np.newaxis] + np.arange(points)
+            polygon_points = coordinates[points_index].reshape(selection.size, -1)
+
+            polygon_template = (
                 '<polygon points="'
-                + joined_svg_polygon_points
-                + '" style="fill:'
-                + polygon_hexadecimal_colours
-                + ';"/>'
+                + " ".join(["%s,%s"] * points)
+                + '" style="fill:#%02x%02x%02x;"/>'
             )
+            for idx, polygon_element, colour_element in zip(
+                selection.tolist(),
+                polygon_points.tolist(),
+                colours[selection].tolist(),
+            ):
+                xml_polygons[idx] = polygon_template % (
+                    *polygon_element,
+                    *colour_element,
+                )
 
-        return xml_polygon_string
+        return "".join(xml_polygons)
 
     def xml_result(self, polygon_output) -> str:
-        svg_str = self.xml_initialise()
-        svg_poly = self.xml_polygon_points(
-            polygon_output["polygons"], polygon_output["colours"]
+        return "".join(
+            [
+                self.xml_header(),
+                self.xml_polygon_points(
+                    polygon_output["polygons"],
+                    polygon_output["colours"],
+                    polygon_output.get("offsets"),
+                ),
+                self.xml_footer(),
+            ]
         )
 
-        return svg_str.replace(self.poly_placeholder, svg_poly)
-
     def prepare_output_path(
         self,
         input_file,
@@ -175,16 +201,43 @@ class SVGmaker:
         return output_file
 
     def save_svg(self, content, output_path: Path) -> None:
-        text_file = open(str(output_path), "wt")
-        text_file.write(content)
-        text_file.close()
+        with open(str(output_path), "wt") as text_file:
+            text_file.write(content)
+
+    def write_svg(self, polygon_output, output_path: Path) -> None:
+        """Write SVG to disk while creating the polygon segments"""
+
+        with open(
+            str(output_path), "wt", buffering=self.write_buffer_size
+        ) as text_file:
+            text_file.write(self.xml_header())
+            text_file.writelines(
+                self.xml_polygon_chunks(
+                    polygon_output["polygons"],
+                    polygon_output["colours"],
+                    polygon_output.get("offsets"),
+                )
+            )
+            text_file.write(self.xml_footer())
 
     def save_png(self, content, output_path: Path) -> None:
+        from cairocffi import CairoError  # type: ignore[import-untyped]
+        from cairosvg import svg2png  # type: ignore[import-untyped]
+
         try:
             svg2png(bytestring=content, write_to=str(output_path))
         except CairoError as e:
             raise SvgToPngImageError(str(e))
 
+    def render_png(self, content) -> bytes:
+        from cairocffi import CairoError  # type: ignore[import-untyped]
+        from cairosvg import svg2png  # type: ignore[import-untyped]
+
+        try:
+            return svg2png(bytestring=content)
+        except CairoError as e:
+            raise SvgToPngImageError(str(e))
+
     def _join_view_box_list(self, x, current_delimiter=" "):
         """Join lists/tuples to string"""
 
@@ -202,6 +255,17 @@ class SVGmaker:
 
         return max(0, min(integer_value, 255))
 
+    def _round_coordinates(self, coordinates):
+        """Round coordinates to the preset precision"""
+
+        if self.precision is None or not np.issubdtype(coordinates.dtype, np.floating):
+            return coordinates
+
+        if self.precision == 0:
+            return np.round(coordinates).astype(np.int64)
+
+        return np.round(coordinates, self.precision)
+
     def _check_viewbox_dimensions(self, view_box_dimensions):
         """Check viewbox numerical values"""
 
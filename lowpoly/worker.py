@@ -0,0 +1,514 @@
+import collections
+import itertools
+import time
+import traceback
+from collections.abc import Generator, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import cv2
+from loguru import logger
+
+from lowpoly.cache import StageCache
+from lowpoly.exception import InvalidImageArrayError, InvalidImageError
+from lowpoly.helper import mark_first_last
+from lowpoly.pipeline import CONVERSION_ERRORS, Pipeline, process_file
+from lowpoly.processing import ImageProcessing
+from lowpoly.profiler import Profiler
+from lowpoly.sequence import SequencePoints, read_frames
+from lowpoly.stage import StageGraph
+from lowpoly.writer import OutputWriter
+
+
+def process_unit(
+    unit: dict,
+    stage_graph: StageGraph | None = None,
+    writer: OutputWriter | None = None,
+) -> dict:
+    """
+    Processes a single unit of work and captures its failure instead of raising it.
+
+    Conversion errors (see `CONVERSION_ERRORS`) are returned as text, so results can always be sent back from a
+    worker process.
+
+    Parameters:
+        unit (dict): The keyword arguments for `process_file`.
+        stage_graph (StageGraph, optional): Stage results to share with other units of the same file.
+        writer (OutputWriter, optional): Writes the outputs in the background; see `finish_unit`.
+
+    Returns:
+        dict: The written output files, the conversion time in seconds, and the error message and traceback if the
+            unit failed.
+    """
+
+    if writer is not None:
+        writer.futures = []
+
+    start = time.perf_counter()
+    result: dict[str, Any]
+    try:
+        result = {
+            "outputs": process_file(**unit, stage_graph=stage_graph, writer=writer),
+            "error": None,
+            "traceback": None,
+        }
+    except CONVERSION_ERRORS as e:
+        result = {
+            "outputs": [],
+            "error": f"{type(e).__name__}: {e}",
+            "traceback": "".join(traceback.format_exception(e)),
+        }
+
+    result["seconds"] = time.perf_counter() - start
+    if writer is not None:
+        result["writes"] = writer.futures
+
+    return result
+
+
+def finish_unit(result: dict) -> dict:
+    """
+    Waits until the outputs of a unit that were written in the background are written.
+
+    Parameters:
+        result (dict): The result of `process_unit`.
+
+    Returns:
+        dict: The result with only the output files that were written, and the first failed write as error.
+    """
+
+    writes: list[Future] = result.pop("writes", [])
+    if not writes:
+        return result
+
+    outputs = []
+    for write in writes:
+        try:
+            outputs.append(write.result())
+        except CONVERSION_ERRORS as e:
+            if result["error"] is None:
+                result["error"] = f"{type(e).__name__}: {e}"
+                result["traceback"] = "".join(traceback.format_exception(e))
+
+    result["outputs"] = outputs
+
+    return result
+
+
+def process_units(
+    units: list[dict],
+    cache: StageCache | None = None,
+    profile: bool = False,
+    writer: OutputWriter | None = None,
+    image: ImageProcessing | None = None,
+    image_records: list[dict] | None = None,
+    trace_memory: bool = False,
+) -> list[dict]:
+    """
+    Processes units of work for the same input file with a shared stage graph.
+
+    Parameters:
+        units (list[dict]): The keyword arguments for `process_file`, one dictionary per unit.
+        cache (StageCache, optional): The on-disk cache for stage results.
+        profile (bool, optional): Whether to add the profile records of the stages to the results.
+        writer (OutputWriter, optional): Writes the outputs in the background; see `finish_unit`.
+        image (ImageProcessing, optional): The input file if it was already decoded.
+        image_records (list[dict], optional): The profile records of decoding the input file ahead.
+        trace_memory (bool, optional): Whether to trace allocations for the peak memory of the stages; see `Profiler`.
+
+    Returns:
+        list[dict]: The result of `process_unit` for each unit.
+    """
+
+    profiler = Profiler(trace_memory) if profile else None
+    stage_graph = StageGraph(cache, profiler)
+    if image is not None:
+        Pipeline(stage_graph).provide_image(units[0]["file_path"], image)
+
+    results = []
+    for unit in units:
+        if profiler is None:
+            results.append(process_unit(unit, stage_graph, writer))
+            continue
+
+        profiler.file = str(unit["file_path"])
+        profiler.records = [] if results or image_records is None else image_records
+        result = process_unit(unit, stage_graph, writer)
+        result["profile"] = profiler.records
+        results.append(result)
+
+    return results
+
+
+def process_group(
+    units: list[dict],
+    cache: StageCache | None = None,
+    profile: bool = False,
+    writers: int = 0,
+    write_queue: int = 4,
+    trace_memory: bool = False,
+) -> list[dict]:
+    """
+    Processes units of work for the same input file in a worker process.
+
+    Parameters:
+        units (list[dict]): The keyword arguments for `process_file`, one dictionary per unit.
+        cache (StageCache, optional): The on-disk cache for stage results.
+        profile (bool, optional): Whether to add the profile records of the stages to the results.
+        writers (int, optional): The amount of background writer threads. Defaults to 0 (no background writes).
+        write_queue (int, optional): The amount of outputs that may wait for a writer thread.
+        trace_memory (bool, optional): Whether to trace allocations for the peak memory of the stages.
+
+    Returns:
+        list[dict]: The result of `process_unit` for each unit, after all outputs are written.
+    """
+
+    writer = _output_writer(trace_memory, writers, write_queue)
+    try:
+        return [
+            finish_unit(result)
+            for result in process_units(
+                units, cache, profile, writer, trace_memory=trace_memory
+            )
+        ]
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def prefetch_image(
+    file_path: Path, cache: StageCache | None = None, profile: bool = False
+) -> tuple[ImageProcessing | None, list[dict]]:
+    """
+    Reads and decodes an input file ahead of its conversion.
+
+    Files that cannot be read or decoded are left to the conversion of the file to report; other errors are raised.
+
+    Parameters:
+        file_path (Path): The path to the input image.
+        cache (StageCache, optional): The on-disk cache, for which the content hash of the file is computed as well.
+        profile (bool, optional): Whether to measure decoding as the decode stage.
+
+    Returns:
+        tuple[ImageProcessing | None, list[dict]]: The decoded image, or None if it could not be decoded, and the
+            profile record of decoding it.
+    """
+
+    profiler = Profiler() if profile else None
+    try:
+        if cache is not None:
+            cache.file_hash(file_path)
+
+        if profiler is None:
+            return ImageProcessing(file_path), []
+
+        profiler.file = str(file_path)
+        return profiler.measure("decode", lambda: ImageProcessing(file_path)), (
+            profiler.records
+        )
+    except (InvalidImageArrayError, InvalidImageError, OSError, cv2.error):
+        return None, []
+
+
+def execute_units(
+    units: Iterable[dict],
+    workers: int = 1,
+    cache: StageCache | None = None,
+    profile: bool = False,
+    prefetch: int = 0,
+    writers: int = 0,
+    write_queue: int = 4,
+    trace_memory: bool = False,
+) -> Generator[dict, None, None]:
+    """
+    Executes units of work, either in-process or in a pool of worker processes.
+
+    Units are consumed while executing, unless they are given as a sequence; see `group_units`. Units for the same
+    input file are executed together, so they share the results of the stages
+    they have in common. Results are yielded in the same order as the units were given, regardless
+    of the order in which the workers finish. Closing the iterator early cancels all units that have
+    not started yet. When a worker process stops, e.g. because it ran out of memory, the units in flight
+    fail with a `BrokenProcessPool` error and the pool is restarted for the remaining units.
+
+    In-process, the next input files are decoded in background threads while the current file is
+    converted, and the outputs are written in background threads while the next file is converted.
+
+    Parameters:
+        units (Iterable[dict]): The keyword arguments for `process_file`, one dictionary per unit.
+        workers (int, optional): The amount of worker processes. Defaults to 1 (in-process).
+        cache (StageCache, optional): The on-disk cache for stage results.
+        profile (bool, optional): Whether to add the profile records of the stages to the results.
+        prefetch (int, optional): The amount of input files to decode ahead. Defaults to 0 (no prefetching).
+        writers (int, optional): The amount of background writer threads. Defaults to 0 (no background writes).
+        write_queue (int, optional): The amount of outputs that may wait for a writer thread.
+        trace_memory (bool, optional): Whether to trace allocations for the peak memory of the stages; files are then
+            decoded and written in the foreground, so the peak memory of every stage is its own.
+
+    Returns:
+        Generator[dict, None, None]: The result of `process_unit` for each unit.
+    """
+
+    groups = group_units(units)
+    if workers == 1:
+        yield from _execute_in_process(
+            groups, cache, profile, prefetch, writers, write_queue, trace_memory
+        )
+        return
+
+    results: dict[int, dict] = {}
+    next_index = 0
+    executor = ProcessPoolExecutor(max_workers=workers)
+    futures: collections.deque[tuple[list[int], ProcessPoolExecutor, Future]] = (
+        collections.deque()
+    )
+
+    def restart_pool(broken_executor: ProcessPoolExecutor) -> None:
+        """Replace a pool of which a worker process stopped, e.g. when it ran out of memory, unless it was replaced"""
+
+        nonlocal executor
+        if executor is broken_executor:
+            logger.warning("Restarting LowPoly worker processes.")
+            broken_executor.shutdown(wait=False)
+            executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(units_of_group: list[dict]) -> tuple[ProcessPoolExecutor, Future]:
+        job = partial(
+            process_group,
+            units_of_group,
+            cache,
+            profile,
+            writers,
+            write_queue,
+            trace_memory,
+        )
+        try:
+            return executor, executor.submit(job)
+        except BrokenProcessPool:
+            # The pool broke while earlier groups were still in flight
+            restart_pool(executor)
+            return executor, executor.submit(job)
+
+    def collect_oldest() -> Generator[dict, None, None]:
+        nonlocal next_index
+        indices, submitted_executor, future = futures.popleft()
+        try:
+            group_results = future.result()
+        except BrokenProcessPool as e:
+            # Every unit in flight fails with the pool, as it is unknown which unit stopped the worker process
+            restart_pool(submitted_executor)
+            group_results = [
+                {
+                    "outputs": [],
+                    "error": f"{type(e).__name__}: {e}",
+                    "traceback": "".join(traceback.format_exception(e)),
+                    "seconds": 0.0,
+                }
+                for _ in indices
+            ]
+
+        results.update(zip(indices, group_results))
+        while next_index in results:
+            yield results.pop(next_index)
+            next_index += 1
+
+    try:
+        # Submit a bounded amount of files ahead, so units are consumed as the workers progress
+        for indices, units_of_group in groups:
+            while len(futures) >= 2 * workers:
+                yield from collect_oldest()
+
+            futures.append((indices, *submit(units_of_group)))
+
+        while futures:
+            yield from collect_oldest()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def execute_sequence(
+    units: Iterable[dict],
+    profile: bool = False,
+    writers: int = 0,
+    write_queue: int = 4,
+    trace_memory: bool = False,
+) -> Generator[dict, None, None]:
+    """
+    Executes the units of work of a sequence of frames in order, in-process.
+
+    Every unit is either a frame, or a video of which every frame is converted. Points and triangulation are reused
+    from the previous frame where the edges did not change; see `SequencePoints`. As every frame depends on the
+    previous frames, stage results are not cached. The outputs of a frame are written in background threads while the
+    next frame is converted.
+
+    Parameters:
+        units (Iterable[dict]): The keyword arguments for `process_file`, one dictionary per unit, with the same preset.
+        profile (bool, optional): Whether to add the profile records of the stages to the results.
+        writers (int, optional): The amount of background writer threads. Defaults to 0 (no background writes).
+        write_queue (int, optional): The amount of outputs that may wait for a writer thread.
+        trace_memory (bool, optional): Whether to trace allocations for the peak memory of the stages.
+
+    Returns:
+        Generator[dict, None, None]: The result of `process_unit` for each frame, with the index of its unit as `unit`,
+            and the path of the frame and whether it is the first and last frame of its unit as `frame`.
+    """
+
+    writer = _output_writer(trace_memory, writers, write_queue)
+    sequence = None
+    previous_result = None
+    try:
+        for index, unit in enumerate(units):
+            if sequence is None:
+                sequence = SequencePoints(unit["preset"])
+
+            for first, last, (frame_path, image) in mark_first_last(
+                read_frames(Path(unit["file_path"]))
+            ):
+                (result,) = process_units(
+                    [{**unit, "file_path": frame_path, "sequence": sequence}],
+                    None,
+                    profile,
+                    writer,
+                    image,
+                    trace_memory=trace_memory,
+                )
+                result["unit"] = index
+                result["frame"] = {
+                    "file_path": frame_path,
+                    "first": first,
+                    "last": last,
+                }
+
+                # Outputs of the previous frame were written while the current frame was converted
+                if previous_result is not None:
+                    yield finish_unit(previous_result)
+                previous_result = result
+
+        if previous_result is not None:
+            yield finish_unit(previous_result)
+    finally:
+        if writer is not None:
+            writer.close(cancel=True)
+
+
+def group_units(units: Iterable[dict]) -> Iterator[tuple[list[int], list[dict]]]:
+    """
+    Groups units of work by input file, in order of the first unit of each file.
+
+    Sequences are grouped as a whole, so all units of a file are grouped, even if the file occurs in several batches.
+    Other iterables are consumed while grouping, and only adjacent units of the same file are grouped.
+
+    Parameters:
+        units (Iterable[dict]): The keyword arguments for `process_file`, one dictionary per unit.
+
+    Returns:
+        Iterator[tuple[list[int], list[dict]]]: The indices of the units in the group and the units.
+    """
+
+    if isinstance(units, Sequence):
+        groups: dict[str, list[int]] = {}
+        for index, unit in enumerate(units):
+            groups.setdefault(str(unit["file_path"]), []).append(index)
+
+        for indices in groups.values():
+            yield indices, [units[index] for index in indices]
+        return
+
+    index = 0
+    for _, adjacent_units in itertools.groupby(
+        units, key=lambda unit: str(unit["file_path"])
+    ):
+        units_of_group = list(adjacent_units)
+        yield list(range(index, index + len(units_of_group))), units_of_group
+        index += len(units_of_group)
+
+
+def _execute_in_process(
+    groups: Iterator[tuple[list[int], list[dict]]],
+    cache: StageCache | None,
+    profile: bool,
+    prefetch: int,
+    writers: int,
+    write_queue: int,
+    trace_memory: bool,
+) -> Generator[dict, None, None]:
+    # Files are decoded in the foreground when tracing memory, as traced memory is not attributed to threads
+    if trace_memory:
+        prefetch = 0
+
+    decoder = ThreadPoolExecutor(max_workers=prefetch) if prefetch else None
+    writer = _output_writer(trace_memory, writers, write_queue)
+    upcoming: collections.deque[tuple[list[int], list[dict], Future | None]] = (
+        collections.deque()
+    )
+    results: dict[int, dict] = {}
+    next_index = 0
+    try:
+        while True:
+            # Decode the next files ahead
+            while len(upcoming) < prefetch + 1:
+                group = next(groups, None)
+                if group is None:
+                    break
+
+                indices, units_of_group = group
+                image = None
+                if decoder is not None:
+                    image = decoder.submit(
+                        prefetch_image, units_of_group[0]["file_path"], cache, profile
+                    )
+                upcoming.append((indices, units_of_group, image))
+
+            if not upcoming:
+                break
+
+            indices, units_of_group, image = upcoming.popleft()
+            decoded_image, image_records = (
+                image.result() if image is not None else (None, None)
+            )
+            results.update(
+                zip(
+                    indices,
+                    process_units(
+                        units_of_group,
+                        cache,
+                        profile,
+                        writer,
+                        decoded_image,
+                        image_records,
+                        trace_memory,
+                    ),
+                )
+            )
+
+            # Outputs of earlier files were written while the current file was converted
+            while next_index in results and (
+                next_index not in indices
+                or all(write.done() for write in results[next_index].get("writes", []))
+            ):
+                yield finish_unit(results.pop(next_index))
+                next_index += 1
+
+        while next_index in results:
+            yield finish_unit(results.pop(next_index))
+            next_index += 1
+    finally:
+        for _, _, image in upcoming:
+            if image is not None:
+                image.cancel()
+        if decoder is not None:
+            decoder.shutdown(wait=True, cancel_futures=True)
+        if writer is not None:
+            writer.close(cancel=True)
+
+
+def _output_writer(
+    trace_memory: bool, writers: int, write_queue: int
+) -> OutputWriter | None:
+    # Outputs are written in the foreground when tracing memory, as traced memory is not attributed to threads
+    if trace_memory or not writers:
+        return None
+
+    return OutputWriter(writers, write_queue)
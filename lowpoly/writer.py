@@ -0,0 +1,40 @@
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+
+class OutputWriter:
+    """
+    Writes outputs in background threads, so encoding and writing overlap with the conversion of the next file.
+
+    The amount of outputs that are being written or waiting to be written is bounded; submitting more outputs
+    blocks until earlier outputs are written, which keeps memory bounded when writing is slower than converting.
+    """
+
+    def __init__(self, writers: int = 1, queue_size: int = 4):
+        self.executor = ThreadPoolExecutor(
+            max_workers=writers, thread_name_prefix="lowpoly-writer"
+        )
+        self.slots = threading.BoundedSemaphore(writers + queue_size)
+        self.futures: list[Future] = []
+
+    def submit(self, function: Callable[..., Any], *args) -> Future:
+        """Write output in the background; the future is also added to `futures`"""
+
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(function, *args)
+        except Exception:
+            self.slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures.append(future)
+
+        return future
+
+    def close(self, cancel: bool = False) -> None:
+        """Wait for outputs being written, and optionally cancel outputs that are waiting"""
+
+        self.executor.shutdown(wait=True, cancel_futures=cancel)
@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from lowpoly.helper import read_json
+
+PRESET_PATH = Path(__file__).parent.parent.joinpath("preset", "default.json")
+
+
+def synthetic_image(width: int = 180, height: int = 120, seed: int = 42):
+    """BGR image with random shapes on a gradient background, so it has edges to sample"""
+
+    generator = np.random.default_rng(seed)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[..., 0] = np.linspace(0, 255, width, dtype=np.uint8)
+    image[..., 1] = np.linspace(255, 0, width, dtype=np.uint8)
+    image[..., 2] = 128
+    for _ in range(12):
+        centre = generator.integers(0, [width, height]).tolist()
+        radius = int(generator.integers(4, min(width, height) // 4))
+        colour = generator.integers(0, 256, size=3).tolist()
+        cv2.circle(image, centre, radius, colour, -1)
+
+    return image
+
+
+@pytest.fixture
+def image():
+    return synthetic_image()
+
+
+@pytest.fixture
+def large_image():
+    return synthetic_image(width=400, height=300)
+
+
+@pytest.fixture
+def input_directory(tmp_path):
+    directory = tmp_path.joinpath("input")
+    directory.mkdir()
+    for index in range(3):
+        cv2.imwrite(
+            str(directory.joinpath(f"image_{index}.png")), synthetic_image(seed=index)
+        )
+
+    return directory
+
+
+@pytest.fixture
+def preset():
+    """Default preset with fewer random points and a small output resolution"""
+
+    user_preset = read_json(PRESET_PATH)
+    user_preset["points"]["add"]["factor"] = 200
+    user_preset["output"]["resolution"] = 360
+
+    return user_preset
+
+
+@pytest.fixture
+def preset_path(tmp_path, preset):
+    path = tmp_path.joinpath("preset.json")
+    path.write_text(json.dumps(preset))
+
+    return path
@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+import pytest
+
+import lowpoly
+from lowpoly.exception import InvalidImageArrayError
+
+
+def test_convert_array_and_encoded_image(image, preset):
+    preset["output"]["png"] = {"backend": "opencv"}
+    encoded_image = cv2.imencode(".png", image)[1].tobytes()
+
+    results = lowpoly.convert(image, preset, svg=True, png=True)
+    encoded_results = lowpoly.convert(encoded_image, preset)
+
+    assert sorted(results) == sorted(preset["type"])
+    for polygon_type, result in results.items():
+        assert (result["width"], result["height"]) == (180, 120)
+        assert result["offsets"][-1] == len(result["polygons"])
+        assert len(result["colours"]) == len(result["offsets"]) - 1
+        assert result["svg"].startswith(b"<?xml")
+        png_image = cv2.imdecode(
+            np.frombuffer(result["png"], np.uint8), cv2.IMREAD_UNCHANGED
+        )
+        assert png_image.shape == (240, 360, 4)
+
+        encoded_result = encoded_results[polygon_type]
+        assert "svg" not in encoded_result and "png" not in encoded_result
+        for key in ["polygons", "offsets", "colours"]:
+            np.testing.assert_array_equal(encoded_result[key], result[key])
+
+
+@pytest.mark.parametrize(
+    "array",
+    [
+        np.zeros((120, 180, 3), dtype=np.float32),
+        np.zeros((120, 180, 3), dtype=np.uint16),
+        np.zeros((120, 180, 2), dtype=np.uint8),
+        np.zeros((2, 120, 180, 3), dtype=np.uint8),
+        np.zeros((0, 180, 3), dtype=np.uint8),
+    ],
+)
+def test_invalid_array_is_rejected(preset, array):
+    with pytest.raises(InvalidImageArrayError):
+        lowpoly.convert(array, preset)
+
+
+def test_grayscale_and_bgra_arrays_are_converted(image, preset):
+    grayscale_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    bgra_image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+
+    for array in [grayscale_image, bgra_image]:
+        for result in lowpoly.convert(array, preset).values():
+            assert (result["width"], result["height"]) == (180, 120)
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+
+from lowpoly.cache import StageCache
+
+
+def store_entries(cache, amount, size=1000):
+    cache_keys = []
+    for index in range(amount):
+        cache_key = cache.key("points", index)
+        cache.store(cache_key, {"points": np.zeros(size, dtype=np.uint8)})
+        # Distinct modification times, from least to most recently used
+        entry = cache._entry_path(cache_key)
+        os.utime(entry, (index, index))
+        cache_keys.append(cache_key)
+
+    return cache_keys
+
+
+def test_store_and_load(tmp_path):
+    cache = StageCache(tmp_path)
+    cache_key = cache.key("points", ["file", 1])
+    cache.store(cache_key, {"points": np.arange(6).reshape(3, 2)})
+
+    arrays = cache.load(cache_key)
+
+    assert arrays is not None
+    np.testing.assert_array_equal(arrays["points"], np.arange(6).reshape(3, 2))
+    assert cache.load(cache.key("points", ["other", 1])) is None
+
+
+def test_evicts_least_recently_used_entries_to_target(tmp_path):
+    entry_size = 1000 + 128
+    cache = StageCache(tmp_path, max_size=10 * entry_size)
+
+    # The eleventh entry exceeds the maximum size
+    cache_keys = store_entries(cache, 11)
+
+    remaining = [cache_key for cache_key in cache_keys if cache.load(cache_key)]
+    assert remaining == cache_keys[-len(remaining) :]
+    assert len(remaining) * entry_size <= cache.max_size * cache.eviction_target
+    assert cache._total_size == len(remaining) * entry_size
+
+
+def test_only_scans_when_full(tmp_path, monkeypatch):
+    cache = StageCache(tmp_path, max_size=1024 * 1024)
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: scans.append(1) or evict())
+
+    store_entries(cache, 50)
+
+    # Only the first store scans the cache directory, to learn its size
+    assert len(scans) == 1
+
+
+def test_counts_entries_of_existing_cache(tmp_path):
+    store_entries(StageCache(tmp_path), 5)
+    cache = StageCache(tmp_path)
+
+    cache.evict()
+
+    assert cache._total_size == sum(
+        file.stat().st_size for file in tmp_path.rglob("*.npy")
+    )
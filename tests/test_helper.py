@@ -0,0 +1,57 @@
+import pytest
+
+from lowpoly.helper import files_in_dir
+
+
+@pytest.fixture
+def input_tree(tmp_path):
+    for relative_path in [
+        "b.png",
+        "a.jpg",
+        "notes.txt",
+        "raw/c.png",
+        "raw/d.npy",
+        "sub/e.png",
+        "sub/deeper/f.png",
+    ]:
+        tmp_path.joinpath(relative_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.joinpath(relative_path).write_bytes(b"")
+
+    return tmp_path
+
+
+def relative_files(directory, **options):
+    return [
+        path.relative_to(directory).as_posix()
+        for path in files_in_dir(directory, **options)
+    ]
+
+
+@pytest.mark.parametrize(
+    "options, expected",
+    [
+        ({}, ["a.jpg", "b.png", "raw/c.png", "sub/e.png", "sub/deeper/f.png"]),
+        ({"max_depth": 0}, ["a.jpg", "b.png"]),
+        ({"max_depth": 1}, ["a.jpg", "b.png", "raw/c.png", "sub/e.png"]),
+        (
+            {"include": ["*.png"]},
+            ["b.png", "raw/c.png", "sub/e.png", "sub/deeper/f.png"],
+        ),
+        ({"include": ["sub/*"]}, ["sub/e.png", "sub/deeper/f.png"]),
+        ({"exclude": ["raw"]}, ["a.jpg", "b.png", "sub/e.png", "sub/deeper/f.png"]),
+        ({"exclude": ["sub/deeper", "*.jpg"]}, ["b.png", "raw/c.png", "sub/e.png"]),
+    ],
+)
+def test_files_in_dir(input_tree, options, expected):
+    assert relative_files(input_tree, **options) == expected
+
+
+def test_patterns_are_case_insensitive(tmp_path):
+    for relative_path in ["A.JPG", "b.jpg", "Thumbnails/c.jpg", "thumbnails/d.Jpg"]:
+        tmp_path.joinpath(relative_path).parent.mkdir(exist_ok=True)
+        tmp_path.joinpath(relative_path).write_bytes(b"")
+
+    assert relative_files(tmp_path, include=["*.jpg"], exclude=["THUMBNAILS"]) == [
+        "A.JPG",
+        "b.jpg",
+    ]
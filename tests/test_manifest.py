@@ -0,0 +1,72 @@
+import os
+
+from click.testing import CliRunner
+
+from lowpoly.cli import cli
+from lowpoly.manifest import Manifest
+
+
+def test_up_to_date_until_input_or_outputs_change(tmp_path):
+    input_file = tmp_path.joinpath("input.png")
+    input_file.write_bytes(b"image")
+    output_file = tmp_path.joinpath("output.svg")
+    output_file.write_text("svg")
+    preset = {"type": ["voronoi"]}
+
+    manifest = Manifest(tmp_path)
+    assert not manifest.is_up_to_date(input_file, preset, ["svg"])
+
+    manifest.record(input_file, preset, ["svg"], [output_file])
+    manifest.save()
+    manifest = Manifest(tmp_path)
+    assert manifest.is_up_to_date(input_file, preset, ["svg"])
+    assert not manifest.is_up_to_date(input_file, preset, ["svg", "png"])
+    assert not manifest.is_up_to_date(input_file, {"type": ["delaunay"]}, ["svg"])
+
+    # Same content with a new modification time
+    os.utime(input_file, ns=(0, 0))
+    assert manifest.is_up_to_date(input_file, preset, ["svg"])
+
+    input_file.write_bytes(b"other")
+    assert not manifest.is_up_to_date(input_file, preset, ["svg"])
+
+    manifest.record(input_file, preset, ["svg"], [output_file])
+    output_file.unlink()
+    assert not manifest.is_up_to_date(input_file, preset, ["svg"])
+
+
+def test_incremental_conversion_only_converts_changed_inputs(
+    tmp_path, input_directory, preset_path
+):
+    output_directory = tmp_path.joinpath("output")
+    output_directory.mkdir()
+    arguments = [
+        "convert",
+        "-i",
+        str(input_directory),
+        "-o",
+        str(output_directory),
+        "-p",
+        str(preset_path),
+        "-e",
+        '["svg"]',
+        "--no-unique-filename",
+        "--incremental",
+    ]
+
+    result = CliRunner().invoke(cli, arguments)
+    assert result.exit_code == 0, result.output
+    modification_times = {
+        path.name: path.stat().st_mtime_ns for path in output_directory.glob("*.svg")
+    }
+    assert len(modification_times) == 6
+
+    changed_input = input_directory.joinpath("image_0.png")
+    changed_input.write_bytes(input_directory.joinpath("image_1.png").read_bytes())
+    result = CliRunner().invoke(cli, arguments)
+    assert result.exit_code == 0, result.output
+
+    for path in output_directory.glob("*.svg"):
+        assert (path.stat().st_mtime_ns == modification_times[path.name]) == (
+            not path.name.startswith("image_0")
+        )
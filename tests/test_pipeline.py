@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import lowpoly
+from lowpoly.exception import InvalidAnalysisResolutionError
+from lowpoly.pipeline import Pipeline
+from lowpoly.processing import ImageProcessing
+
+SOURCE = Path("image.png")
+
+
+@pytest.fixture
+def pipeline(image):
+    pipeline = Pipeline()
+    pipeline.provide_image(SOURCE, ImageProcessing(image))
+
+    return pipeline
+
+
+@pytest.mark.parametrize(
+    "analysis_resolution, output_resolution, expected",
+    [
+        (None, 90, None),
+        (90, 360, [90, 60]),
+        (1000, 360, None),
+        ("auto", 90, [90, 60]),
+        ("auto", 360, None),
+    ],
+)
+def test_analysis_dimensions(
+    pipeline, preset, analysis_resolution, output_resolution, expected
+):
+    preset["analysis"] = {"resolution": analysis_resolution}
+    preset["output"]["resolution"] = output_resolution
+
+    assert pipeline.analysis_dimensions(SOURCE, preset) == expected
+
+
+@pytest.mark.parametrize("analysis_resolution", ["90", True, 0, -90])
+def test_invalid_analysis_resolution(pipeline, preset, analysis_resolution):
+    preset["analysis"] = {"resolution": analysis_resolution}
+
+    with pytest.raises(InvalidAnalysisResolutionError):
+        pipeline.analysis_dimensions(SOURCE, preset)
+
+
+def test_polygons_of_downscaled_analysis_cover_input_image(image, preset):
+    preset["analysis"] = {"resolution": 60}
+
+    for result in lowpoly.convert(image, preset).values():
+        coordinates = result["polygons"]
+        assert coordinates.min(axis=0) == pytest.approx([0, 0], abs=1)
+        assert coordinates.max(axis=0) == pytest.approx([179, 119], abs=1)
+
+
+@pytest.mark.parametrize("tile_height", [1, 4, 64])
+def test_tiled_edge_points_are_not_lost_to_rounding_per_strip(
+    large_image, preset, monkeypatch, tile_height
+):
+    pipeline = Pipeline()
+    pipeline.provide_image(SOURCE, ImageProcessing(large_image))
+    edges_reduction_factor = pipeline.edges_reduction_factor(SOURCE, preset)
+
+    amount_of_edges = 0
+    sample_edge_points = pipeline.polygon_maker.sample_edge_points
+
+    def count_edges(binary_image, *arguments):
+        nonlocal amount_of_edges
+        amount_of_edges += np.count_nonzero(binary_image)
+        return sample_edge_points(binary_image, *arguments)
+
+    monkeypatch.setattr(pipeline.polygon_maker, "sample_edge_points", count_edges)
+    edge_points = pipeline._tiled_edge_points(
+        SOURCE, preset, tile_height, edges_reduction_factor, np.random.default_rng(42)
+    )
+
+    assert len(edge_points) == round(amount_of_edges / edges_reduction_factor)
+    assert len(np.unique(edge_points, axis=0)) == len(edge_points)
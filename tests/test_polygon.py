@@ -0,0 +1,146 @@
+import itertools
+
+import numpy as np
+import pytest
+import shapely  # type: ignore[import-untyped]
+
+from lowpoly.edgedetection import EdgeDetection
+from lowpoly.polygon import PolygonMaker
+from lowpoly.processing import ImageProcessing
+
+
+@pytest.fixture
+def image_processing(image):
+    return ImageProcessing(image)
+
+
+@pytest.fixture
+def points(image_processing):
+    edge_detection = EdgeDetection()
+    grayscale_image = image_processing.colour_2_grayscale(image_processing.user_image)
+    binary_image = edge_detection.edge_gray_threshold(
+        edge_detection.canny(grayscale_image, 20, 100), grayscale_image, 0, 255
+    )
+
+    return PolygonMaker().add_additional_points_to_polygon(binary_image, 200, 5, 42)
+
+
+def clipped_polygons(polygon_maker, voronoi, width, height):
+    coordinates, offsets = polygon_maker._clip_polygons(
+        *polygon_maker._get_voronoi_finite_polygons(voronoi), width, height
+    )
+
+    return [
+        shapely.Polygon(coordinates[start:stop])
+        for start, stop in itertools.pairwise(offsets)
+    ]
+
+
+@pytest.mark.parametrize("grid", [False, True])
+def test_voronoi_from_delaunay_matches_qhull(points, grid):
+    polygon_maker = PolygonMaker()
+    width, height = 180, 120
+    if grid:
+        # Cocircular points, of which triangles share their circumcenters
+        x, y = np.meshgrid(np.arange(0, width, 12), np.arange(0, height, 12))
+        points = np.column_stack((x.ravel(), y.ravel()))
+
+    from_delaunay = clipped_polygons(
+        polygon_maker,
+        polygon_maker._get_voronoi_from_delaunay(polygon_maker.triangulation(points)),
+        width,
+        height,
+    )
+    from_qhull = clipped_polygons(
+        polygon_maker, polygon_maker._get_voronoi_from_qhull(points), width, height
+    )
+
+    assert len(from_delaunay) == len(points)
+    for polygon, expected in zip(from_delaunay, from_qhull):
+        assert shapely.symmetric_difference(polygon, expected).area < 1e-6
+    assert sum(polygon.area for polygon in from_delaunay) == pytest.approx(
+        width * height
+    )
+
+
+@pytest.mark.parametrize("polygon_type", ["delaunay", "voronoi"])
+@pytest.mark.parametrize("colour_mode", ["mean", "median"])
+@pytest.mark.parametrize("tile_height", [1, 7, 32, 500])
+def test_tiled_colours_match_single_label_image(
+    image_processing, points, polygon_type, colour_mode, tile_height
+):
+    polygon_maker = PolygonMaker()
+    triangulation = polygon_maker.triangulation(points)
+    polygon_function = getattr(polygon_maker, polygon_type)
+
+    expected = polygon_function(
+        points, image_processing, triangulation, colour_mode=colour_mode
+    )
+    tiled = polygon_function(
+        points,
+        image_processing,
+        triangulation,
+        colour_mode=colour_mode,
+        tile_height=tile_height,
+    )
+
+    np.testing.assert_array_equal(tiled["colours"], expected["colours"])
+
+
+@pytest.mark.parametrize("tile_height", [None, 3])
+def test_median_is_lower_middle_value(image, tile_height):
+    polygon_maker = PolygonMaker()
+    image[:, :] = 0
+    image[:, 45:, 0] = 200
+    # Covers the pixel centres of columns 0 to 89, of which half have value 200
+    coordinates = np.array([[0, 0], [89, 0], [89, 10], [0, 10]], dtype=float)
+    offsets = np.array([0, 4])
+    fallback = np.zeros((1, 3), np.uint8)
+
+    mean = polygon_maker._get_polygon_colours(
+        image, coordinates, offsets, "mean", fallback, tile_height
+    )
+    median = polygon_maker._get_polygon_colours(
+        image, coordinates, offsets, "median", fallback, tile_height
+    )
+
+    assert mean.tolist() == [[100, 0, 0]]
+    assert median.tolist() == [[0, 0, 0]]
+
+
+@pytest.mark.parametrize("edges_reduction_factor", [1, 3, 1000])
+def test_sampled_edge_points_are_distinct_edge_pixels(edges_reduction_factor):
+    binary_image = np.zeros((40, 60), dtype=np.uint8)
+    binary_image[::3, 5:50] = 255
+    edge_pixels = {(x, y) for y, x in zip(*np.nonzero(binary_image))}
+
+    sampled_points = PolygonMaker().sample_edge_points(
+        binary_image, edges_reduction_factor, np.random.default_rng(42)
+    )
+
+    assert sampled_points.dtype == np.int32
+    assert sampled_points.shape == (
+        round(len(edge_pixels) / edges_reduction_factor),
+        2,
+    )
+    sampled_pixels = {tuple(point) for point in sampled_points.tolist()}
+    assert len(sampled_pixels) == len(sampled_points)
+    assert sampled_pixels <= edge_pixels
+
+
+def test_polygon_centres_match_shapely_centroids():
+    generator = np.random.default_rng(3)
+    polygons = [
+        shapely.convex_hull(shapely.MultiPoint(generator.uniform(0, 100, (points, 2))))
+        for points in generator.integers(3, 12, size=40)
+    ]
+    rings = [np.asarray(polygon.exterior.coords)[:-1] for polygon in polygons]
+    offsets = np.cumsum([0] + [len(ring) for ring in rings])
+
+    centres = PolygonMaker()._get_polygon_centres(
+        np.concatenate(rings), offsets, rounded=False
+    )
+
+    np.testing.assert_allclose(
+        centres, [(polygon.centroid.x, polygon.centroid.y) for polygon in polygons]
+    )
@@ -0,0 +1,69 @@
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from lowpoly.profiler import Profiler, summarize_profile
+
+
+def test_does_not_trace_allocations_by_default():
+    tracemalloc.stop()
+    profiler = Profiler()
+    profiler.file = "image.png"
+
+    profiler.measure("decode", lambda: np.ones(10_000_000, dtype=np.uint8).sum())
+
+    assert not tracemalloc.is_tracing()
+    (record,) = profiler.records
+    assert record["file"] == "image.png"
+    assert record["stage"] == "decode"
+    assert record["peak_memory"] >= 0
+
+
+def test_nested_stage_times_are_exclusive():
+    profiler = Profiler()
+
+    def outer():
+        profiler.measure("inner", lambda: time.sleep(0.05))
+        time.sleep(0.01)
+
+    profiler.measure("outer", outer)
+
+    inner, outer_record = profiler.records
+    assert inner["wall_time"] >= 0.05
+    assert outer_record["wall_time"] < 0.05
+
+
+def test_traces_peak_memory_of_stage():
+    profiler = Profiler(trace_memory=True)
+    try:
+        profiler.measure("points", lambda: np.ones(8_000_000, dtype=np.uint8).sum())
+    finally:
+        tracemalloc.stop()
+
+    assert profiler.records[0]["peak_memory"] >= 8_000_000
+
+
+def test_records_stages_of_other_threads_for_their_file():
+    profiler = Profiler()
+    profiler.file = "first.png"
+    first_records = profiler.records
+    thread = threading.Thread(
+        target=profiler.measure,
+        args=("render:svg", lambda: time.sleep(0.01), None, False, "first.png"),
+        kwargs={"records": first_records},
+    )
+
+    thread.start()
+    profiler.file = "second.png"
+    profiler.records = []
+    profiler.measure("decode", lambda: time.sleep(0.01))
+    thread.join()
+
+    assert [record["file"] for record in first_records] == ["first.png"]
+    assert [record["file"] for record in profiler.records] == ["second.png"]
+    assert [line.split()[0] for line in summarize_profile(first_records)] == [
+        "Stage",
+        "render:svg",
+    ]
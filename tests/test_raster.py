@@ -0,0 +1,59 @@
+import copy
+
+import cv2
+import numpy as np
+import pytest
+
+from lowpoly.polygon import PolygonMaker
+from lowpoly.processing import ImageProcessing
+from lowpoly.raster import RasterMaker
+
+
+def polygon_output(image, polygon_type):
+    image_processing = ImageProcessing(image)
+    generator = np.random.default_rng(42)
+    points = PolygonMaker().complete_points(
+        np.column_stack(
+            (generator.integers(0, 180, 300), generator.integers(0, 120, 300))
+        ),
+        image_processing.width,
+        image_processing.height,
+        50,
+        generator,
+    )
+
+    return getattr(PolygonMaker(), polygon_type)(points, image_processing)
+
+
+def decode_png(png_bytes):
+    return cv2.imdecode(np.frombuffer(png_bytes, np.uint8), cv2.IMREAD_UNCHANGED)
+
+
+@pytest.mark.parametrize("polygon_type", ["delaunay", "voronoi"])
+@pytest.mark.parametrize("shape_rendering", ["crispEdges", "geometricPrecision"])
+@pytest.mark.parametrize("tile_height", [1, 16, 100, 1000])
+def test_tiled_png_matches_whole_image(
+    image, preset, polygon_type, shape_rendering, tile_height
+):
+    preset["output"]["svg"]["style"]["shape-rendering"] = shape_rendering
+    tiled_preset = copy.deepcopy(preset)
+    tiled_preset["output"]["png"] = {"tile_height": tile_height}
+    output = polygon_output(image, polygon_type)
+
+    expected = decode_png(RasterMaker(preset, [180, 120]).render_png(output))
+    tiled = decode_png(RasterMaker(tiled_preset, [180, 120]).render_png(output))
+
+    assert expected.shape == (240, 360, 4)
+    np.testing.assert_array_equal(tiled, expected)
+
+
+def test_saved_tiled_png_matches_rendered_png(tmp_path, image, preset):
+    preset["output"]["png"] = {"tile_height": 16}
+    output = polygon_output(image, "voronoi")
+    raster_maker = RasterMaker(preset, [180, 120])
+
+    raster_maker.save_png(output, tmp_path.joinpath("output.png"))
+
+    assert tmp_path.joinpath("output.png").read_bytes() == raster_maker.render_png(
+        output
+    )
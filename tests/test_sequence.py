@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from lowpoly.cli import cli
+from lowpoly.pipeline import Pipeline
+from lowpoly.processing import ImageProcessing
+from lowpoly.sequence import SequencePoints, read_frames
+
+
+def frame_points(sequence_points, pipeline, preset, index, frame):
+    file_path = Path(f"frame_{index}.png")
+    pipeline.provide_image(file_path, ImageProcessing(frame))
+
+    return sequence_points.points(pipeline, file_path, preset)
+
+
+def test_points_are_reused_where_edges_did_not_change(image, preset):
+    pipeline = Pipeline()
+    sequence_points = SequencePoints(preset)
+    first_points = frame_points(sequence_points, pipeline, preset, 0, image)
+
+    np.testing.assert_array_equal(
+        frame_points(sequence_points, pipeline, preset, 1, image.copy()),
+        first_points,
+    )
+
+    changed_image = image.copy()
+    cv2.rectangle(changed_image, (130, 70), (170, 110), (255, 255, 255), 3)
+    changed_points = frame_points(sequence_points, pipeline, preset, 2, changed_image)
+
+    # New points are added to the triangulation, and points of unchanged cells stay current
+    np.testing.assert_array_equal(changed_points[: len(first_points)], first_points)
+    assert len(changed_points) > len(first_points)
+    kept_points = first_points[sequence_points.current[: len(first_points)]]
+    assert np.count_nonzero((kept_points < [96, 64]).all(axis=1)) == np.count_nonzero(
+        (first_points < [96, 64]).all(axis=1)
+    )
+
+
+def test_read_frames_of_video(tmp_path, image):
+    video_path = tmp_path.joinpath("video.avi")
+    video_writer = cv2.VideoWriter(
+        str(video_path), cv2.VideoWriter_fourcc(*"MJPG"), 5, (180, 120)
+    )
+    if not video_writer.isOpened():
+        pytest.skip("OpenCV cannot write MJPG videos")
+    for _ in range(3):
+        video_writer.write(image)
+    video_writer.release()
+
+    frames = list(read_frames(video_path))
+
+    assert [frame_path.name for frame_path, _ in frames] == [
+        "video_000000.avi",
+        "video_000001.avi",
+        "video_000002.avi",
+    ]
+    assert all(frame.width == 180 and frame.height == 120 for _, frame in frames)
+
+
+def test_sequence_converts_frames_in_order(tmp_path, input_directory, preset_path):
+    output_directory = tmp_path.joinpath("output")
+    output_directory.mkdir()
+
+    result = CliRunner().invoke(
+        cli,
+        [
+            "convert",
+            "-i",
+            str(input_directory),
+            "-o",
+            str(output_directory),
+            "-p",
+            str(preset_path),
+            "-e",
+            '["svg"]',
+            "--no-unique-filename",
+            "--sequence",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert sorted(path.name for path in output_directory.glob("*.svg")) == sorted(
+        f"{path.stem}_{polygon_type}.svg"
+        for path in input_directory.iterdir()
+        for polygon_type in ["delaunay", "voronoi"]
+    )
@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import numpy as np
+import pytest
+
+from lowpoly.client import LowpolyClient
+from lowpoly.exception import ServerResponseError
+from lowpoly.server import RenderServer
+
+
+@pytest.fixture
+def server(preset):
+    preset["output"]["png"] = {"backend": "opencv"}
+    render_server = RenderServer({"default": preset}, workers=1, queue_size=2)
+    yield render_server
+    render_server.executor.shutdown(wait=True, cancel_futures=True)
+
+
+@pytest.fixture
+def encoded_image(image):
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+def break_pool(server):
+    """Stop the worker process, as e.g. the OOM killer would"""
+
+    executor, future = server._submit(os._exit, 1)
+    with pytest.raises(BrokenProcessPool):
+        future.result(timeout=30)
+
+    return executor
+
+
+def test_convert(server, encoded_image):
+    status, content_type, body = server.convert(encoded_image, {"type": "voronoi"})
+
+    assert status == 200
+    assert content_type == "image/svg+xml"
+    assert body.startswith(b"<?xml")
+
+
+def test_invalid_image_is_bad_request(server):
+    status, _, body = server.convert(b"not an image", {})
+
+    assert status == 400
+    assert "error" in json.loads(body)
+
+
+def test_restarts_broken_pool_once(server, encoded_image):
+    broken_executor = break_pool(server)
+
+    # Every request of the broken pool tries to restart it, but only the first one does
+    executors = []
+    threads = [
+        threading.Thread(
+            target=lambda: executors.append(server._restart_pool(broken_executor))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert server.executor is not broken_executor
+    assert all(executor is server.executor for executor in executors)
+    assert server.convert(encoded_image, {})[0] == 200
+
+
+def test_convert_after_worker_stopped(server, encoded_image):
+    broken_executor = break_pool(server)
+
+    status, _, _ = server.convert(encoded_image, {})
+
+    # The pool is restarted on submit, or the request fails and the next one is served by the new pool
+    assert server.executor is not broken_executor
+    if status != 200:
+        assert status == 500
+        assert server.convert(encoded_image, {})[0] == 200
+
+
+@pytest.fixture(params=["tcp", "unix"])
+def client(request, tmp_path, server):
+    if request.param == "unix":
+        http_server, _ = server._bind("", 0, tmp_path.joinpath("lowpoly.sock"))
+        lowpoly_client = LowpolyClient(
+            socket_path=str(tmp_path.joinpath("lowpoly.sock")), timeout=30
+        )
+    else:
+        http_server, address = server._bind("127.0.0.1", 0, None)
+        lowpoly_client = LowpolyClient(address, timeout=30)
+
+    thread = threading.Thread(target=http_server.serve_forever)
+    thread.start()
+    yield lowpoly_client
+    http_server.shutdown()
+    http_server.server_close()
+    thread.join()
+
+
+def test_client_converts_through_server(client, encoded_image):
+    svg = client.convert(encoded_image, "delaunay")
+    png = client.convert(encoded_image, "voronoi", "png")
+
+    assert svg.startswith(b"<?xml")
+    assert cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_UNCHANGED).shape == (
+        240,
+        360,
+        4,
+    )
+    assert client.health()["status"] == "ok"
+    assert 'lowpoly_responses_total{status="200"} 2' in client.metrics()
+
+    with pytest.raises(ServerResponseError) as error:
+        client.convert(b"not an image")
+    assert error.value.status == 400
+    with pytest.raises(ServerResponseError) as error:
+        client.convert(encoded_image, preset="missing")
+    assert error.value.status == 404
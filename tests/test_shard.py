@@ -0,0 +1,96 @@
+import pytest
+
+from lowpoly.exception import ShardManifestError
+from lowpoly.shard import ShardManifest, merge_shard_manifests, shard_of
+
+RELATIVE_PATHS = [f"photos/image_{index}.jpg" for index in range(20)]
+
+
+def convert_shard(directory, index, count, batches):
+    """Assign the same inputs in every batch, as the CLI does, and record the results of the own shard"""
+
+    shard_manifest = ShardManifest(directory, index, count)
+    for batch in batches:
+        for relative_path in RELATIVE_PATHS:
+            if shard_manifest.assign(batch, relative_path):
+                shard_manifest.record(
+                    batch,
+                    relative_path,
+                    directory.joinpath(relative_path),
+                    {"outputs": [f"{batch}/{relative_path}.svg"], "seconds": 0.5},
+                )
+
+    return shard_manifest
+
+
+def test_shard_of_is_stable_and_in_range():
+    shards = [shard_of(relative_path, 3) for relative_path in RELATIVE_PATHS]
+
+    assert shards == [shard_of(relative_path, 3) for relative_path in RELATIVE_PATHS]
+    assert set(shards) <= {1, 2, 3}
+
+
+def test_merge_records_every_batch_of_same_input(tmp_path):
+    for index in (1, 2):
+        convert_shard(tmp_path, index, 2, [1, 2]).save(complete=True)
+
+    merged = merge_shard_manifests(tmp_path)
+
+    assert merged["missing"] == 0
+    assert merged["missing_shards"] == []
+    assert merged["incomplete_shards"] == []
+    assert set(merged["items"]) == {"1", "2"}
+    for batch in ("1", "2"):
+        assert set(merged["items"][batch]) == set(RELATIVE_PATHS)
+    assert sum(shard["expected"] for shard in merged["shards"].values()) == 2 * len(
+        RELATIVE_PATHS
+    )
+
+
+def test_merge_counts_missing_results_per_batch(tmp_path):
+    convert_shard(tmp_path, 1, 2, [1, 2]).save(complete=True)
+
+    # Second shard only converted the first batch before it stopped
+    convert_shard(tmp_path, 2, 2, [1]).save(complete=False)
+
+    merged = merge_shard_manifests(tmp_path)
+
+    assert merged["incomplete_shards"] == [2]
+    assert merged["missing"] == sum(
+        shard_of(relative_path, 2) == 2 for relative_path in RELATIVE_PATHS
+    )
+
+
+def test_merge_reports_missing_shard_and_failures(tmp_path):
+    shard_manifest = ShardManifest(tmp_path, 1, 2)
+    for batch in (1, 2):
+        for relative_path in RELATIVE_PATHS:
+            if shard_manifest.assign(batch, relative_path):
+                shard_manifest.record(
+                    batch,
+                    relative_path,
+                    tmp_path.joinpath(relative_path),
+                    {"outputs": [], "seconds": 0.1, "error": "ValueError: broken"},
+                )
+    shard_manifest.save(complete=True)
+
+    merged = merge_shard_manifests(tmp_path)
+    own_paths = [
+        relative_path
+        for relative_path in RELATIVE_PATHS
+        if shard_of(relative_path, 2) == 1
+    ]
+
+    assert merged["missing_shards"] == [2]
+    assert merged["missing"] == 2 * (len(RELATIVE_PATHS) - len(own_paths))
+    assert sorted((item["batch"], item["path"]) for item in merged["failed"]) == sorted(
+        (batch, relative_path) for batch in (1, 2) for relative_path in own_paths
+    )
+
+
+def test_merge_rejects_different_shard_counts(tmp_path):
+    ShardManifest(tmp_path, 1, 2).save(complete=True)
+    ShardManifest(tmp_path, 1, 3).save(complete=True)
+
+    with pytest.raises(ShardManifestError):
+        merge_shard_manifests(tmp_path)
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from lowpoly.api import convert
+from lowpoly.exception import InvalidSvgPrecisionError
+from lowpoly.svg import SVGmaker
+
+
+@pytest.mark.parametrize("precision", ["2", 1.5, True, -1])
+def test_invalid_precision_is_rejected(preset, precision):
+    preset["output"]["svg"]["precision"] = precision
+
+    with pytest.raises(InvalidSvgPrecisionError):
+        SVGmaker(preset, [180, 120])
+
+
+def test_invalid_precision_is_rejected_before_converting(image, preset, monkeypatch):
+    preset["output"]["svg"]["precision"] = True
+    monkeypatch.setattr(
+        "lowpoly.pipeline.Pipeline.triangulate",
+        lambda *arguments: pytest.fail("converted with an invalid precision"),
+    )
+
+    with pytest.raises(InvalidSvgPrecisionError):
+        convert(image, preset, svg=True)
+
+
+def reference_polygon_points(svg_maker, polygons, colours):
+    """Polygon elements formatted one polygon at a time"""
+
+    xml_polygons = []
+    for polygon, colour in zip(polygons, colours):
+        points = " ".join(",".join(str(value) for value in point) for point in polygon)
+        hexadecimal_colour = svg_maker.rgb_to_hexadecimal_notation(*colour[::-1])
+        xml_polygons.append(
+            f'<polygon points="{points}" style="fill:{hexadecimal_colour};"/>'
+        )
+
+    return "".join(xml_polygons)
+
+
+def flatten_polygons(polygons):
+    """Flat coordinates and offsets of polygons with different amounts of points"""
+
+    offsets = np.cumsum([0] + [len(polygon) for polygon in polygons])
+
+    return np.concatenate(polygons), offsets
+
+
+@pytest.fixture
+def polygons():
+    generator = np.random.default_rng(7)
+
+    return [
+        generator.uniform(0, 180, size=(points, 2))
+        for points in generator.integers(3, 9, size=50)
+    ]
+
+
+@pytest.fixture
+def colours(polygons):
+    return np.random.default_rng(8).integers(-20, 280, size=(len(polygons), 3))
+
+
+def test_polygon_points_match_reference(preset, polygons, colours):
+    svg_maker = SVGmaker(preset, [180, 120])
+    coordinates, offsets = flatten_polygons(polygons)
+
+    assert svg_maker.xml_polygon_points(
+        coordinates, colours, offsets
+    ) == reference_polygon_points(svg_maker, polygons, colours)
+
+
+@pytest.mark.parametrize("precision", [0, 2])
+def test_polygon_points_are_rounded_to_precision(preset, polygons, colours, precision):
+    preset["output"]["svg"]["precision"] = precision
+    svg_maker = SVGmaker(preset, [180, 120])
+    rounded_polygons = [
+        np.round(polygon, precision).astype(int if precision == 0 else float)
+        for polygon in polygons
+    ]
+    coordinates, offsets = flatten_polygons(polygons)
+
+    assert svg_maker.xml_polygon_points(
+        coordinates, colours, offsets
+    ) == reference_polygon_points(svg_maker, rounded_polygons, colours)
+
+
+@pytest.mark.parametrize("polygon_chunk_size", [1, 7, 5000])
+def test_written_svg_matches_result(
+    tmp_path, preset, polygons, colours, monkeypatch, polygon_chunk_size
+):
+    monkeypatch.setattr("lowpoly.svg._get_formatted_datetime", lambda: "now")
+    svg_maker = SVGmaker(preset, [180, 120])
+    svg_maker.polygon_chunk_size = polygon_chunk_size
+    coordinates, offsets = flatten_polygons(polygons)
+    polygon_output = {"polygons": coordinates, "offsets": offsets, "colours": colours}
+    output_file = tmp_path.joinpath("output.svg")
+
+    svg_maker.write_svg(polygon_output, output_file)
+
+    with open(output_file, newline="") as text_file:
+        assert text_file.read() == svg_maker.xml_result(polygon_output)
@@ -0,0 +1,137 @@
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from lowpoly import worker
+from lowpoly.cli import cli
+from lowpoly.worker import execute_units, finish_unit, process_group, process_unit
+
+
+def stop_on_crash_file(units, *arguments):
+    if units[0]["file_path"].stem == "crash":
+        os._exit(1)
+    return process_group(units, *arguments)
+
+
+@pytest.mark.parametrize("profile_memory", [False, True])
+# Worker processes do not decode files ahead
+@pytest.mark.parametrize("workers, prefetch", [(1, 0), (1, 2), (2, 0)])
+def test_profile_records_every_stage_with_prefetch(
+    tmp_path, input_directory, preset_path, prefetch, workers, profile_memory
+):
+    output_directory = tmp_path.joinpath("output")
+    output_directory.mkdir()
+    profile = tmp_path.joinpath("profile.json")
+
+    result = CliRunner().invoke(
+        cli,
+        [
+            "convert",
+            "-i",
+            str(input_directory),
+            "-o",
+            str(output_directory),
+            "-p",
+            str(preset_path),
+            "-e",
+            '["svg"]',
+            "--workers",
+            str(workers),
+            "--prefetch",
+            str(prefetch),
+            "--profile",
+            str(profile),
+            "--profile-memory" if profile_memory else "--no-profile-memory",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    records = json.loads(profile.read_text())
+    input_files = sorted(str(path) for path in input_directory.iterdir())
+    # Stages shared by both polygon types run once per file
+    for stage, runs in [("decode", 1), ("canny", 1), ("points", 1), ("render:svg", 2)]:
+        assert sorted(
+            record["file"] for record in records if record["stage"] == stage
+        ) == sorted(input_files * runs)
+    assert len(list(output_directory.glob("*.svg"))) == 2 * len(input_files)
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        (["--profile-memory"], "--profile"),
+        (["--workers", "2", "--prefetch", "4"], "--prefetch"),
+        (["--workers", "2", "--sequence"], "--workers 1"),
+    ],
+)
+def test_ignored_options_are_rejected(
+    tmp_path, input_directory, preset_path, options, message
+):
+    result = CliRunner().invoke(
+        cli,
+        [
+            "convert",
+            "-i",
+            str(input_directory),
+            "-o",
+            str(tmp_path),
+            "-p",
+            str(preset_path),
+            *options,
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert message in result.output
+
+
+def test_failed_unit_is_returned_as_error(tmp_path, preset):
+    input_file = tmp_path.joinpath("broken.png")
+    input_file.write_bytes(b"not an image")
+
+    result = finish_unit(
+        process_unit(
+            {
+                "file_path": input_file,
+                "preset": preset,
+                "output_path": tmp_path,
+                "extensions": ["svg"],
+                "unique_filename": False,
+            }
+        )
+    )
+
+    assert result["outputs"] == []
+    assert result["error"].startswith("InvalidImageError")
+
+
+def test_stopped_worker_fails_units_in_flight_only(
+    tmp_path, input_directory, preset, monkeypatch
+):
+    monkeypatch.setattr(worker, "process_group", stop_on_crash_file)
+    input_files = [tmp_path.joinpath("crash.png")]
+    input_files[0].write_bytes(b"")
+    for index, image_file in enumerate(sorted(input_directory.iterdir()) * 2):
+        input_files.append(tmp_path.joinpath(f"{index}_{image_file.name}"))
+        input_files[-1].write_bytes(image_file.read_bytes())
+    units = [
+        {
+            "file_path": input_file,
+            "preset": preset,
+            "output_path": tmp_path.joinpath(f"output_{index}"),
+            "extensions": ["svg"],
+            "unique_filename": False,
+        }
+        for index, input_file in enumerate(input_files)
+    ]
+    for unit in units:
+        unit["output_path"].mkdir()
+
+    results = list(execute_units(units, workers=2))
+
+    assert len(results) == len(units)
+    assert results[0]["error"].startswith("BrokenProcessPool")
+    # Units submitted after the restart run in the new pool
+    assert all(result["error"] is None for result in results[2 * 2 + 1 :])